@@ -0,0 +1,46 @@
+"""
+Alembic environment. Uses the application's engine and SQLModel metadata,
+so migrations always target settings.DATABASE_URL.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlmodel import SQLModel
+
+from app.core.database import engine
+from app.core.config import settings
+import app.models  # noqa: F401  (registers every table on SQLModel.metadata)
+
+config = context.config
+
+# Skip logging setup when invoked from the app (it would replace the app's handlers)
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+
+def run_migrations_offline():
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        # Batch mode: SQLite cannot ALTER most constraints in place
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,95 @@
+"""Unique normalized Document.url plus lookup indexes
+
+Merges duplicate Document rows (same normalized URL, keeping the most
+recently updated one, filling its missing product_id and content_hash from
+the newest duplicate that has them, and repointing their media), then adds:
+- unique ix_document_url
+- ix_document_brand_id_id, ix_document_content_hash
+- ix_media_url, ix_product_family_id_name
+
+Idempotent: databases created by create_all already have these indexes.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+import logging
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.document_registry import normalize_url
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+INDEXES = [
+    ("ix_document_url", "document", ["url"], True),
+    ("ix_document_brand_id_id", "document", ["brand_id", "id"], False),
+    ("ix_document_content_hash", "document", ["content_hash"], False),
+    ("ix_media_url", "media", ["url"], False),
+    ("ix_product_family_id_name", "product", ["family_id", "name"], False),
+]
+
+
+def _dedupe_documents(bind):
+    rows = bind.execute(sa.text("SELECT id, url, last_updated, product_id, content_hash FROM document")).all()
+    groups = defaultdict(list)
+    for doc_id, url, last_updated, product_id, content_hash in rows:
+        groups[normalize_url(url)].append((str(last_updated or ""), doc_id, url, product_id, content_hash))
+
+    merged = 0
+    for url, docs in groups.items():
+        docs.sort(key=lambda doc: doc[:2])
+        _, keep_id, keep_url, _, _ = docs[-1]
+        if len(docs) > 1:
+            # Newest non-empty value of each column, so the merge doesn't drop a product link or hash
+            product_id = next((doc[3] for doc in reversed(docs) if doc[3] is not None), None)
+            content_hash = next((doc[4] for doc in reversed(docs) if doc[4]), None)
+            bind.execute(
+                sa.text(
+                    "UPDATE document SET product_id = COALESCE(product_id, :product_id), "
+                    "content_hash = COALESCE(content_hash, :content_hash) WHERE id = :id"
+                ),
+                {"product_id": product_id, "content_hash": content_hash, "id": keep_id},
+            )
+        for _, doc_id, _, _, _ in docs[:-1]:
+            bind.execute(sa.text("UPDATE media SET document_id = :keep WHERE document_id = :old"), {"keep": keep_id, "old": doc_id})
+            bind.execute(sa.text("DELETE FROM document WHERE id = :old"), {"old": doc_id})
+            merged += 1
+        if keep_url != url:
+            bind.execute(sa.text("UPDATE document SET url = :url WHERE id = :id"), {"url": url, "id": keep_id})
+    if merged:
+        logger.info(f"0001: merged {merged} duplicate document rows")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("document"):
+        # Fresh database: create_all builds the tables with these indexes
+        return
+
+    _dedupe_documents(bind)
+
+    for name, table, columns, unique in INDEXES:
+        if not inspector.has_table(table):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, _, _ in reversed(INDEXES):
+        if name == "ix_media_url":
+            continue  # Declared on the model since before this migration
+        if inspector.has_table(table) and name in {index["name"] for index in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+"""Index Media.document_id for per-document media lookups
+
+Page images and PDFs now live in the media table keyed by document
+(services.document_media) instead of JSON in every chunk's metadata.
+Existing chunk media is moved over by scripts/backfill_document_media.py.
+
+Idempotent: databases created by create_all already have this index.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEX = "ix_media_document_id"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("media"):
+        return
+    if INDEX not in {index["name"] for index in inspector.get_indexes("media")}:
+        op.create_index(INDEX, "media", ["document_id"])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("media") and INDEX in {index["name"] for index in inspector.get_indexes("media")}:
+        op.drop_index(INDEX, table_name="media")
@@ -0,0 +1,46 @@
+"""Normalize PageSnapshot.url
+
+The page archive now keys snapshots by the normalized URL, as the
+document registry keys Document.url, so index rebuilds find a document's
+archived page. Rewrites snapshots stored under the raw fetched URL.
+
+Idempotent: normalized URLs are left as they are.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.document_registry import normalize_url
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("page_snapshots"):
+        return
+    urls = [url for (url,) in bind.execute(sa.text("SELECT DISTINCT url FROM page_snapshots")).all()]
+    renamed = 0
+    for url in urls:
+        normalized = normalize_url(url)
+        if normalized != url:
+            bind.execute(sa.text("UPDATE page_snapshots SET url = :new WHERE url = :old"), {"new": normalized, "old": url})
+            renamed += 1
+    if renamed:
+        logger.info(f"0003: normalized {renamed} page snapshot URLs")
+
+
+def downgrade():
+    # Raw URLs are not recorded; normalized keys still work with older code for most pages
+    pass
@@ -0,0 +1,95 @@
+"""Unique product family and product names
+
+The catalog writer inserts families and products with INSERT ... ON
+CONFLICT DO NOTHING, which only deduplicates against a unique index.
+Merges duplicate rows (keeping the oldest and repointing its products,
+documents, media and page snapshots), then adds:
+- unique ix_productfamily_brand_id_name
+- ix_product_family_id_name, recreated as unique
+Chunks already stored with a merged product's id keep it until their page
+is re-ingested.
+
+Idempotent: databases created by create_all already have these indexes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+import logging
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+INDEXES = [
+    ("ix_productfamily_brand_id_name", "productfamily", ["brand_id", "name"]),
+    ("ix_product_family_id_name", "product", ["family_id", "name"]),
+]
+# Tables with a product_id column pointing at product.id
+PRODUCT_REFERENCES = ["document", "media", "page_snapshots"]
+
+
+def _merge(bind, table, group_column, references):
+    """Keep the oldest row per (group_column, name); repoint `references` (table, column) at it."""
+    rows = bind.execute(sa.text(f"SELECT id, {group_column}, name FROM {table} ORDER BY id")).all()
+    groups = defaultdict(list)
+    for row_id, group, name in rows:
+        groups[(group, name)].append(row_id)
+
+    merged = 0
+    for ids in groups.values():
+        keep_id = ids[0]
+        for old_id in ids[1:]:
+            for ref_table, ref_column in references:
+                bind.execute(
+                    sa.text(f"UPDATE {ref_table} SET {ref_column} = :keep WHERE {ref_column} = :old"),
+                    {"keep": keep_id, "old": old_id},
+                )
+            bind.execute(sa.text(f"DELETE FROM {table} WHERE id = :old"), {"old": old_id})
+            merged += 1
+    if merged:
+        logger.info(f"0004: merged {merged} duplicate {table} rows")
+
+
+def _unique_indexes(inspector, table):
+    return {index["name"]: bool(index.get("unique")) for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not (inspector.has_table("productfamily") and inspector.has_table("product")):
+        # Fresh database: create_all builds the tables with these indexes
+        return
+
+    product_references = [(table, "product_id") for table in PRODUCT_REFERENCES if inspector.has_table(table)]
+    _merge(bind, "productfamily", "brand_id", [("product", "family_id")])
+    # Families merged above can leave two products of the same name in one family
+    _merge(bind, "product", "family_id", product_references)
+
+    for name, table, columns in INDEXES:
+        existing = _unique_indexes(inspector, table)
+        if existing.get(name):
+            continue
+        if name in existing:
+            op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns, unique=True)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in reversed(INDEXES):
+        if not inspector.has_table(table) or name not in _unique_indexes(inspector, table):
+            continue
+        op.drop_index(name, table_name=table)
+        if name == "ix_product_family_id_name":
+            # Non-unique before this revision (0001)
+            op.create_index(name, table, columns)
@@ -0,0 +1,69 @@
+"""Exact-text and facts fingerprints on chunk signatures
+
+Near-duplicate detection at 0.85 estimated Jaccard merged sibling products'
+spec chunks (same text, other model name and numbers), so one product's
+chunk was served as another's. A chunk is now only a duplicate when its
+normalized text hash matches, or when it is similar and has the same
+numbers and model names. Adds to chunk_signatures:
+- text_hash (indexed) and facts_hash; existing rows keep them empty and
+  are never matched
+Existing chunk_references were made under the old rule and can't be told
+apart, so they are dropped and their documents' content_hash is cleared:
+the next crawl re-embeds those pages instead of skipping them as unchanged.
+
+Idempotent: databases created by create_all already have the columns.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+INDEX = "ix_chunk_signatures_text_hash"
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table("chunk_signatures"):
+        columns = {column["name"] for column in inspector.get_columns("chunk_signatures")}
+        with op.batch_alter_table("chunk_signatures") as batch:
+            for name in ("text_hash", "facts_hash"):
+                if name not in columns:
+                    batch.add_column(sa.Column(name, sa.String(), nullable=False, server_default=""))
+        if INDEX not in {index["name"] for index in inspector.get_indexes("chunk_signatures")}:
+            op.create_index(INDEX, "chunk_signatures", ["text_hash"])
+
+    if inspector.has_table("chunk_references"):
+        if inspector.has_table("document"):
+            reset = bind.execute(sa.text(
+                "UPDATE document SET content_hash = NULL "
+                "WHERE id IN (SELECT doc_id FROM chunk_references WHERE doc_id IS NOT NULL)"
+            )).rowcount
+            logger.info(f"Cleared content_hash of {reset} documents with near-duplicate references")
+        removed = bind.execute(sa.text("DELETE FROM chunk_references")).rowcount
+        logger.info(f"Dropped {removed} near-duplicate references made under the old threshold")
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("chunk_signatures"):
+        return
+    if INDEX in {index["name"] for index in inspector.get_indexes("chunk_signatures")}:
+        op.drop_index(INDEX, table_name="chunk_signatures")
+    columns = {column["name"] for column in inspector.get_columns("chunk_signatures")}
+    with op.batch_alter_table("chunk_signatures") as batch:
+        for name in ("facts_hash", "text_hash"):
+            if name in columns:
+                batch.drop_column(name)
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
-from ..core.database import get_session
+from ..core.database import get_session, get_async_session
 from ..models.sql_models import Brand, Product, ProductFamily, Document
 from ..models.ingestion_status import IngestionStatus
 
@@ -34,17 +35,17 @@ def create_brand(brand: Brand, session: Session = Depends(get_session)):
     return brand
 
 @router.get("/stats", response_model=List[BrandWithStats])
-def read_brands_stats(session: Session = Depends(get_session)):
-    brands = session.exec(select(Brand)).all()
+async def read_brands_stats(session: AsyncSession = Depends(get_async_session)):
+    brands = (await session.exec(select(Brand))).all()
     stats = []
     
     # Pre-fetch ingestion statuses
-    ingestion_statuses = session.exec(select(IngestionStatus)).all()
+    ingestion_statuses = (await session.exec(select(IngestionStatus))).all()
     status_map = {s.brand_id: s for s in ingestion_statuses}
     
     for brand in brands:
         # Get real counts
-        total_docs = session.exec(select(func.count(Document.id)).where(Document.brand_id == brand.id)).one()
+        total_docs = (await session.exec(select(func.count(Document.id)).where(Document.brand_id == brand.id))).one()
         
         # Calculate coverage
         # If we have ingestion status with discovered URLs, use that as target
@@ -68,31 +69,31 @@ def read_brands_stats(session: Session = Depends(get_session)):
         coverage = (total_docs / target) * 100 if target > 0 else 0
         
         # 1. Total products
-        total_products = session.exec(
+        total_products = (await session.exec(
             select(func.count(Product.id))
             .join(ProductFamily)
             .where(ProductFamily.brand_id == brand.id)
-        ).one()
+        )).one()
         
         # 2. Covered products
-        covered_products = session.exec(
+        covered_products = (await session.exec(
             select(func.count(func.distinct(Product.id)))
             .join(ProductFamily)
             .join(Document, Product.id == Document.product_id)
             .where(ProductFamily.brand_id == brand.id)
-        ).one()
+        )).one()
         
         # 3. Total documents (real data!)
-        total_documents = session.exec(
+        total_documents = (await session.exec(
             select(func.count(Document.id))
             .where(Document.brand_id == brand.id)
-        ).one()
+        )).one()
         
         # 4. Last ingestion
-        last_ingestion = session.exec(
+        last_ingestion = (await session.exec(
             select(func.max(Document.last_updated))
             .where(Document.brand_id == brand.id)
-        ).one()
+        )).one()
         
         # Product-based coverage (legacy, might be 0 if no products)
         coverage_percentage = (covered_products / total_products * 100) if total_products > 0 else 0.0
@@ -124,59 +125,59 @@ def read_brands_stats(session: Session = Depends(get_session)):
     return stats
 
 @router.get("", response_model=List[Brand])
-def read_brands(skip: int = 0, limit: int = 100, session: Session = Depends(get_session)):
-    brands = session.exec(select(Brand).offset(skip).limit(limit)).all()
+async def read_brands(skip: int = 0, limit: int = 100, session: AsyncSession = Depends(get_async_session)):
+    brands = (await session.exec(select(Brand).offset(skip).limit(limit))).all()
     return brands
 
 @router.get("/{brand_id}/products", response_model=List[Product])
-def read_brand_products(brand_id: int, session: Session = Depends(get_session)):
+async def read_brand_products(brand_id: int, session: AsyncSession = Depends(get_async_session)):
     # Get all products belonging to families of this brand
-    products = session.exec(
+    products = (await session.exec(
         select(Product)
         .join(ProductFamily)
         .where(ProductFamily.brand_id == brand_id)
-    ).all()
+    )).all()
     return products
 
 @router.get("/{brand_id}", response_model=BrandWithStats)
-def read_brand(brand_id: int, session: Session = Depends(get_session)):
-    brand = session.get(Brand, brand_id)
+async def read_brand(brand_id: int, session: AsyncSession = Depends(get_async_session)):
+    brand = await session.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="Brand not found")
     
     # 1. Total products
-    total_products = session.exec(
+    total_products = (await session.exec(
         select(func.count(Product.id))
         .join(ProductFamily)
         .where(ProductFamily.brand_id == brand_id)
-    ).one()
+    )).one()
     
     # 2. Covered products (products with at least one document)
-    covered_products = session.exec(
+    covered_products = (await session.exec(
         select(func.count(func.distinct(Product.id)))
         .join(ProductFamily)
         .join(Document, Product.id == Document.product_id)
         .where(ProductFamily.brand_id == brand_id)
-    ).one()
+    )).one()
     
     # 3. Total documents (REAL DATA!)
-    total_documents = session.exec(
+    total_documents = (await session.exec(
         select(func.count(Document.id))
         .where(Document.brand_id == brand_id)
-    ).one()
+    )).one()
     
     # 4. Last ingestion
-    last_ingestion = session.exec(
+    last_ingestion = (await session.exec(
         select(func.max(Document.last_updated))
         .where(Document.brand_id == brand_id)
-    ).one()
+    )).one()
     
     # Product-based coverage (legacy)
     coverage_percentage = (covered_products / total_products * 100) if total_products > 0 else 0.0
     
     # Document-based coverage (REAL DATA)
     # Get ingestion status for dynamic target
-    status = session.exec(select(IngestionStatus).where(IngestionStatus.brand_id == brand_id)).first()
+    status = (await session.exec(select(IngestionStatus).where(IngestionStatus.brand_id == brand_id))).first()
     
     target_docs = 0
     if status and status.urls_discovered > 0:
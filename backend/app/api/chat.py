@@ -10,6 +10,7 @@ class ChatRequest(BaseModel):
     product_id: int | None = None
     is_first_message: bool = False
     history: list[dict] = []
+    vector_backend: str | None = None  # "chroma" or "compact"; default from settings
 
 class ChatResponse(BaseModel):
     answer: str
@@ -26,6 +27,7 @@ async def chat(request: ChatRequest):
         request.brand_id, 
         request.is_first_message,
         request.history,
-        request.product_id
+        request.product_id,
+        request.vector_backend
     )
     return response
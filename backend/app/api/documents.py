@@ -2,10 +2,11 @@
 Documents API - Real-time document feed
 """
 from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.core.database import get_session
+from app.core.database import get_async_session
 from app.models.sql_models import Document, Brand
 from pydantic import BaseModel
 
@@ -28,10 +29,10 @@ class RecentDocumentsResponse(BaseModel):
     last_updated: datetime
 
 @router.get("/recent", response_model=RecentDocumentsResponse)
-def get_recent_documents(
+async def get_recent_documents(
     limit: int = Query(default=20, le=100),
     brand_id: Optional[int] = None,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Get recently added/updated documents"""
     
@@ -48,7 +49,7 @@ def get_recent_documents(
     query = query.limit(limit)
     
     # Execute query
-    results = session.exec(query).all()
+    results = (await session.exec(query)).all()
     
     documents = [
         DocumentItem(
@@ -66,7 +67,7 @@ def get_recent_documents(
     total_query = select(func.count(Document.id))
     if brand_id:
         total_query = total_query.where(Document.brand_id == brand_id)
-    total = session.exec(total_query).one()
+    total = (await session.exec(total_query)).one()
     
     return RecentDocumentsResponse(
         total=total,
@@ -75,13 +76,13 @@ def get_recent_documents(
     )
 
 @router.get("/stats")
-def get_document_stats(session: Session = Depends(get_session)):
+async def get_document_stats(session: AsyncSession = Depends(get_async_session)):
     """Get global document statistics"""
     
-    total_docs = session.exec(select(func.count(Document.id))).one()
+    total_docs = (await session.exec(select(func.count(Document.id)))).one()
     
     # Docs per brand
-    brand_stats = session.exec(
+    brand_stats = (await session.exec(
         select(
             Brand.name,
             func.count(Document.id).label('doc_count')
@@ -89,7 +90,7 @@ def get_document_stats(session: Session = Depends(get_session)):
         .join(Document, Brand.id == Document.brand_id, isouter=True)
         .group_by(Brand.name)
         .order_by(func.count(Document.id).desc())
-    ).all()
+    )).all()
     
     return {
         "total_documents": total_docs,
@@ -9,11 +9,18 @@ import json
 import asyncio
 import logging
 from pathlib import Path
-from sqlmodel import Session, select, func
-from app.core.database import get_session
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.database import get_async_session
+from app.core.db_writer import db_writer
 from app.models.ingestion_status import IngestionStatus as DBIngestionStatus
 from app.services.ingestion_tracker import tracker, INGESTION_STATUS_FILE
 from app.services.pa_brands_scraper import PABrandsScraper
+from app.services.ingestion_pipeline import ingestion_pipeline
+from app.services.catalog_writer import catalog_writer
+from app.services.index_rebuilder import index_rebuilder
+from app.services.near_duplicates import near_duplicates
+from app.services.boilerplate import boilerplate
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +48,9 @@ class StartIngestionRequest(BaseModel):
     brand_name: Optional[str] = None
     force_rescan: bool = False
 
+class ReindexRequest(BaseModel):
+    brand_id: Optional[int] = None
+
 async def run_ingestion_task(brand_name: Optional[str], force_rescan: bool):
     """Background task to run ingestion"""
     scraper = PABrandsScraper(force_rescan=force_rescan)
@@ -57,16 +67,16 @@ async def run_ingestion_task(brand_name: Optional[str], force_rescan: bool):
     await scraper.run()
 
 @router.post("/start")
-async def start_ingestion(request: StartIngestionRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def start_ingestion(request: StartIngestionRequest, background_tasks: BackgroundTasks, session: AsyncSession = Depends(get_async_session)):
     """Start ingestion process"""
-    status = get_ingestion_status(session)
+    status = await get_ingestion_status(session)
     if status.get("is_running"):
         raise HTTPException(status_code=400, detail="Ingestion is already running")
     
     background_tasks.add_task(run_ingestion_task, request.brand_name, request.force_rescan)
     return {"message": f"Ingestion started for {request.brand_name or 'all brands'}"}
 
-def get_ingestion_status(session: Session) -> dict:
+async def get_ingestion_status(session: AsyncSession) -> dict:
     """Read current ingestion status combining Tracker (Real-time) and DB (Historical)"""
     try:
         from app.models.sql_models import Brand, Document
@@ -85,10 +95,10 @@ def get_ingestion_status(session: Session) -> dict:
 
         # 2. Get Accurate Document Counts from DB
         # This is the source of truth for HOW MUCH data we have
-        total_docs = session.exec(select(func.count(Document.id))).one()
+        total_docs = (await session.exec(select(func.count(Document.id)))).one()
         
         # Get all brand statuses from database for historical context
-        db_statuses = session.exec(select(DBIngestionStatus)).all()
+        db_statuses = (await session.exec(select(DBIngestionStatus))).all()
         
         # 3. Merge Data
         # Start with tracker status as base
@@ -101,7 +111,7 @@ def get_ingestion_status(session: Session) -> dict:
             final_status["brand_progress"] = {}
             
         # Get all brands to map IDs
-        brands = session.exec(select(Brand)).all()
+        brands = (await session.exec(select(Brand))).all()
         brand_map = {b.name: b.id for b in brands}
         
         # Add current brand stats
@@ -111,7 +121,7 @@ def get_ingestion_status(session: Session) -> dict:
             if cb_id:
                 # Use discovered URLs as target if available, otherwise fallback to 0
                 discovered = final_status.get("urls_discovered", 0)
-                current_docs = session.exec(select(func.count(Document.id)).where(Document.brand_id == cb_id)).one()
+                current_docs = (await session.exec(select(func.count(Document.id)).where(Document.brand_id == cb_id))).one()
                 
                 # Self-validating: Target cannot be less than what we already have
                 if discovered < current_docs:
@@ -133,7 +143,7 @@ def get_ingestion_status(session: Session) -> dict:
         for brand_name in final_status.get("brand_progress", {}):
             brand_id = brand_map.get(brand_name)
             if brand_id:
-                count = session.exec(select(func.count(Document.id)).where(Document.brand_id == brand_id)).one()
+                count = (await session.exec(select(func.count(Document.id)).where(Document.brand_id == brand_id))).one()
                 final_status["brand_progress"][brand_name]["documents_ingested"] = count
                 # Ensure urls_discovered is at least the document count
                 if final_status["brand_progress"][brand_name].get("urls_discovered", 0) < count:
@@ -143,7 +153,7 @@ def get_ingestion_status(session: Session) -> dict:
         for status in db_statuses:
             if status.brand_name not in final_status["brand_progress"]:
                 brand_id = status.brand_id
-                count = session.exec(select(func.count(Document.id)).where(Document.brand_id == brand_id)).one()
+                count = (await session.exec(select(func.count(Document.id)).where(Document.brand_id == brand_id))).one()
                 
                 # Fix for 0 URLs discovered
                 urls_discovered = status.urls_discovered
@@ -165,10 +175,10 @@ def get_ingestion_status(session: Session) -> dict:
         return tracker.status
 
 @router.get("/status", response_model=IngestionStatus)
-async def get_status(session: Session = Depends(get_session)):
+async def get_status(session: AsyncSession = Depends(get_async_session)):
     """Get current ingestion status"""
     try:
-        status = get_ingestion_status(session)
+        status = await get_ingestion_status(session)
         return IngestionStatus(**status)
     except Exception as e:
         logger.error(f"Error getting ingestion status: {e}")
@@ -215,9 +225,9 @@ async def reset_ingestion():
     return {"message": "Ingestion tracker reset"}
 
 @router.get("/stats")
-async def get_stats(session: Session = Depends(get_session)):
+async def get_stats(session: AsyncSession = Depends(get_async_session)):
     """Get ingestion statistics"""
-    status = get_ingestion_status(session)
+    status = await get_ingestion_status(session)
     
     return {
         "total_documents": status.get("total_documents", 0),
@@ -227,3 +237,40 @@ async def get_stats(session: Session = Depends(get_session)):
         "errors_count": len(status.get("errors", [])),
         "brand_count": len(status.get("documents_by_brand", {}))
     }
+
+@router.get("/pipeline")
+async def get_pipeline_stats():
+    """Queue depth, throughput and latency per ingestion pipeline stage"""
+    return ingestion_pipeline.get_stats()
+
+@router.get("/boilerplate")
+async def get_boilerplate_stats():
+    """Learned boilerplate per domain: pages learned from, lines stripped and share of text removed"""
+    return boilerplate.get_stats()
+
+@router.get("/duplicates")
+async def get_duplicate_stats():
+    """Near-duplicate chunks per brand: stored vs. referenced copies and the duplicate rate"""
+    return {"brands": await asyncio.to_thread(near_duplicates.report), "runtime": near_duplicates.get_stats()}
+
+@router.get("/catalog")
+async def get_catalog_writer_stats():
+    """Identity-map hit rate and batched flush metrics of the catalog writer"""
+    return catalog_writer.get_stats()
+
+@router.get("/db")
+async def get_db_writer_stats():
+    """Write queue depth, transaction latency, lock waits and WAL checkpoints"""
+    return db_writer.get_stats()
+
+@router.post("/reindex")
+async def start_reindex(request: ReindexRequest):
+    """Rebuild vector collections in the background; queries keep using the current ones until the swap"""
+    if not index_rebuilder.start([request.brand_id] if request.brand_id else None):
+        raise HTTPException(status_code=400, detail="An index rebuild is already running")
+    return {"message": f"Index rebuild started for {'brand ' + str(request.brand_id) if request.brand_id else 'all brands'}"}
+
+@router.get("/reindex")
+async def get_reindex_status():
+    """Progress of the current or last index rebuild"""
+    return index_rebuilder.get_status()
@@ -4,6 +4,35 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Halilit Support Center"
     DATABASE_URL: str = "sqlite:///./support_center.db"
     GEMINI_API_KEY: str = ""
+    # SQLite locking and WAL checkpoint policy
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_WAL_AUTOCHECKPOINT: int = 1000  # Pages; 0 leaves checkpoints to the writer
+    SQLITE_CHECKPOINT_INTERVAL_SECONDS: int = 300  # Writer checkpoints when idle this long after writes
+    SQLITE_CHECKPOINT_MODE: str = "PASSIVE"  # PASSIVE, FULL, RESTART or TRUNCATE
+    DB_WRITER_MAX_BATCH: int = 50  # Queued write jobs committed per transaction
+    CHROMA_PATH: str = "./chroma_db"
+    # Vector store service (vector_server.py): "auto" uses it when its socket answers, "server" requires it, "local" opens CHROMA_PATH directly
+    VECTOR_STORE_MODE: str = "auto"
+    VECTOR_STORE_SOCKET: str = "data/vector_store.sock"
+    VECTOR_STORE_MAX_BATCH: int = 512  # Chunks per coalesced upsert
+    VECTOR_STORE_BATCH_WAIT_MS: int = 5  # Writer waits this long to coalesce concurrent upserts
+    # Vector search for brand-scoped questions: "chroma" or "compact" (data/compact_index, Chroma fallback)
+    VECTOR_BACKEND: str = "chroma"
+    # Chunking (services.chunking): "flat" 1500-char chunks, "hierarchical" 300-char children of 1500-char parents,
+    # or "structured" heading/table-aligned chunks of up to CHUNK_TOKEN_BUDGET tokens
+    CHUNKING_MODE: str = "flat"
+    CHUNK_TOKEN_BUDGET: int = 384  # Estimated at 4 characters per token: 1,536, about a flat chunk
+    # Hierarchical chunks at query time: expand the top N parents, each in full ("parent") or only around the matched children ("window")
+    CHUNK_CONTEXT_PARENTS: int = 4
+    CHUNK_CONTEXT_EXPANSION: str = "parent"
+    # Vector/SQL reconciler (services.vector_reconciler): chunks checked per scheduled step in the worker; 0 disables
+    VECTOR_RECONCILE_STEP_CHUNKS: int = 20000
+    # Near-duplicate chunks (services.near_duplicates): estimated Jaccard at which a chunk with the same numbers and model
+    # names reuses its brand's stored copy (identical text always does); 0 disables
+    NEAR_DUPLICATE_THRESHOLD: float = 0.95
+    # Learned boilerplate (services.boilerplate): strip lines found on this share of a domain's pages once it has MIN_PAGES; 0 disables
+    BOILERPLATE_SHARE: float = 0.5
+    BOILERPLATE_MIN_PAGES: int = 20
     
     class Config:
         env_file = ".env"
@@ -1,6 +1,9 @@
+from pathlib import Path
 from sqlmodel import SQLModel, create_engine, Session
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import settings
 
 # Create engine with connection pooling and performance settings
@@ -23,13 +26,61 @@ def set_sqlite_pragma(dbapi_conn, connection_record):
     cursor.execute("PRAGMA synchronous=NORMAL")
     # Increase cache size (10000 pages ~= 40MB)
     cursor.execute("PRAGMA cache_size=10000")
+    # Wait for other processes' write locks instead of failing with "database is locked"
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA wal_autocheckpoint={settings.SQLITE_WAL_AUTOCHECKPOINT}")
     # Enable foreign key constraints
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
+# Read-only pool for API handlers: WAL readers never block (or take) the write lock
+read_engine = create_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    connect_args={"check_same_thread": False},
+    pool_size=20,
+    max_overflow=30
+)
+
+@event.listens_for(read_engine, "connect")
+def set_query_only(dbapi_conn, connection_record):
+    """Reject writes on read pool connections"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+# Async read-only pool (aiosqlite) for `async def` endpoints and the chat path:
+# queries are awaited instead of blocking the event loop, so a slow catalog or
+# status query doesn't stall other in-flight requests on the same worker
+async_engine = create_async_engine(
+    settings.DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+    echo=False,
+    pool_size=20,
+    max_overflow=30
+)
+
+event.listen(async_engine.sync_engine, "connect", set_query_only)
+
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    """AsyncSession on the async read-only pool, for `async def` endpoints."""
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+def run_migrations():
+    """Upgrade the database to the latest Alembic revision (backend/alembic)."""
+    from alembic import command
+    from alembic.config import Config
+
+    backend_dir = Path(__file__).resolve().parents[2]
+    config = Config(str(backend_dir / "alembic.ini"))
+    config.set_main_option("script_location", str(backend_dir / "alembic"))
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    run_migrations()
@@ -0,0 +1,230 @@
+"""
+Single-writer queue for SQLite.
+One thread owns the only write connection in this process and commits queued
+write jobs in batched `BEGIN IMMEDIATE` transactions (each job in its own
+savepoint), so API reads on the read pool never wait behind ingestion writes
+and in-process writers never fight each other for the lock. Idle time is
+used for WAL checkpoints.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlmodel import Session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# The writer's own engine: one connection, transactions begun explicitly
+write_engine = create_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    connect_args={"check_same_thread": False},
+    pool_size=1,
+    max_overflow=0,
+)
+
+
+@event.listens_for(write_engine, "connect")
+def _disable_implicit_begin(dbapi_conn, connection_record):
+    # Let SQLAlchemy emit BEGIN itself (pysqlite would defer it to the first DML)
+    dbapi_conn.isolation_level = None
+
+
+@event.listens_for(write_engine, "begin")
+def _begin_immediate(conn):
+    # Take the write lock up front; time spent here is lock wait (other processes)
+    started = time.perf_counter()
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+    db_writer.record_lock_wait(time.perf_counter() - started)
+
+
+class DBWriter:
+    """
+    Usage:
+        doc_id = db_writer.run(lambda session: upsert(session, ...))   # from any thread
+        doc_id = await db_writer.run_async(lambda session: ...)         # from the event loop
+
+    Jobs are sync callables taking a Session; they must not commit.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = settings.DB_WRITER_MAX_BATCH,
+        checkpoint_interval: int = settings.SQLITE_CHECKPOINT_INTERVAL_SECONDS,
+        checkpoint_mode: str = settings.SQLITE_CHECKPOINT_MODE,
+    ):
+        self.max_batch = max_batch
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_mode = checkpoint_mode.upper()
+        self._queue: "queue.Queue[Tuple[Callable[[Session], Any], Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._session: Optional[Session] = None
+        self._writes_since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        self.stats = {
+            "jobs": 0,
+            "failed_jobs": 0,
+            "transactions": 0,
+            "failed_transactions": 0,
+            "transaction_seconds": 0.0,
+            "max_transaction_seconds": 0.0,
+            "lock_waits": 0,
+            "lock_wait_seconds": 0.0,
+            "max_lock_wait_seconds": 0.0,
+            "checkpoints": 0,
+            "checkpoint_busy": 0,
+            "last_checkpoint_frames": 0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, job: Callable[[Session], Any]) -> Future:
+        """Queue a write job; the future resolves to its return value once committed."""
+        future: Future = Future()
+        if threading.current_thread() is self._thread:
+            # Nested call from inside a job: run in the current transaction
+            try:
+                future.set_result(job(self._session))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._ensure_started()
+        self._queue.put((job, future))
+        return future
+
+    def run(self, job: Callable[[Session], Any]) -> Any:
+        """Run a write job and wait for its commit."""
+        return self.submit(job).result()
+
+    async def run_async(self, job: Callable[[Session], Any]) -> Any:
+        return await asyncio.wrap_future(self.submit(job))
+
+    def record_lock_wait(self, seconds: float):
+        self.stats["lock_waits"] += 1
+        self.stats["lock_wait_seconds"] += seconds
+        self.stats["max_lock_wait_seconds"] = max(self.stats["max_lock_wait_seconds"], seconds)
+
+    def _run(self):
+        while not self._stopping.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                self._maybe_checkpoint()
+                continue
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._execute(batch)
+
+    def _execute(self, batch: List[Tuple[Callable[[Session], Any], Future]]):
+        started = time.perf_counter()
+        results: List[Tuple[Future, bool, Any]] = []
+        try:
+            with Session(write_engine, expire_on_commit=False) as session:
+                self._session = session
+                for job, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        # A failing job only rolls back its own savepoint
+                        with session.begin_nested():
+                            value = job(session)
+                        # Only once the savepoint is released: its flush can still fail
+                        results.append((future, True, value))
+                    except Exception as e:
+                        self.stats["failed_jobs"] += 1
+                        results.append((future, False, e))
+                session.commit()
+        except Exception as e:
+            self.stats["failed_transactions"] += 1
+            logger.error(f"DB writer transaction of {len(batch)} jobs failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._session = None
+            elapsed = time.perf_counter() - started
+            self.stats["transaction_seconds"] += elapsed
+            self.stats["max_transaction_seconds"] = max(self.stats["max_transaction_seconds"], elapsed)
+
+        self.stats["transactions"] += 1
+        self.stats["jobs"] += len(results)
+        self._writes_since_checkpoint += 1
+        for future, ok, value in results:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _maybe_checkpoint(self):
+        if not self._writes_since_checkpoint or not settings.DATABASE_URL.startswith("sqlite"):
+            return
+        if time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+            return
+        self.checkpoint()
+
+    def checkpoint(self) -> Optional[Tuple[int, int, int]]:
+        """Run a WAL checkpoint. Returns SQLite's (busy, log frames, checkpointed frames)."""
+        raw = write_engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(f"PRAGMA wal_checkpoint({self.checkpoint_mode})")
+            busy, frames, checkpointed = cursor.fetchone()
+            cursor.close()
+        except Exception as e:
+            logger.warning(f"WAL checkpoint failed: {e}")
+            return None
+        finally:
+            raw.close()
+        self._last_checkpoint = time.monotonic()
+        self._writes_since_checkpoint = 0
+        self.stats["checkpoints"] += 1
+        self.stats["checkpoint_busy"] += int(bool(busy))
+        self.stats["last_checkpoint_frames"] = frames
+        logger.debug(f"WAL checkpoint ({self.checkpoint_mode}): {checkpointed}/{frames} frames, busy={busy}")
+        return busy, frames, checkpointed
+
+    def stop(self, timeout: float = 30.0):
+        """Commit everything queued, then stop the writer thread."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        transactions = self.stats["transactions"] + self.stats["failed_transactions"]
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_jobs_per_transaction"] = round(self.stats["jobs"] / self.stats["transactions"], 2) if self.stats["transactions"] else 0.0
+        stats["avg_transaction_ms"] = round(1000 * self.stats["transaction_seconds"] / transactions, 2) if transactions else 0.0
+        stats["max_transaction_ms"] = round(1000 * self.stats["max_transaction_seconds"], 2)
+        stats["avg_lock_wait_ms"] = round(1000 * self.stats["lock_wait_seconds"] / self.stats["lock_waits"], 2) if self.stats["lock_waits"] else 0.0
+        stats["max_lock_wait_ms"] = round(1000 * self.stats["max_lock_wait_seconds"], 2)
+        for key in ("transaction_seconds", "max_transaction_seconds", "lock_wait_seconds", "max_lock_wait_seconds"):
+            stats.pop(key)
+        return stats
+
+
+# Global writer (thread starts on first submit)
+db_writer = DBWriter()
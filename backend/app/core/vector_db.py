@@ -1,10 +1,112 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
 import chromadb
 from chromadb.config import Settings
+from chromadb.utils import embedding_functions
+
+from .config import settings
+from .vector_store_client import RemoteEmbeddingFunction, VectorStoreClient
+
+CHROMA_PATH = settings.CHROMA_PATH
+
+def _connect():
+    """
+    Client and embedding function for this process: the vector store service
+    (vector_server.py) when it's running, so only that process opens
+    CHROMA_PATH; otherwise a local persistent client.
+    """
+    mode = settings.VECTOR_STORE_MODE
+    if mode == "server" or (mode == "auto" and os.path.exists(settings.VECTOR_STORE_SOCKET)):
+        remote = VectorStoreClient(settings.VECTOR_STORE_SOCKET)
+        if mode == "server" or remote.ping():
+            return remote, RemoteEmbeddingFunction(remote)
+    # For development, we use a local persistent directory.
+    return chromadb.PersistentClient(path=CHROMA_PATH), embedding_functions.DefaultEmbeddingFunction()
+
+# `embedding_function` is shared by every collection, so a query can be
+# embedded once and searched against any number of partitions
+client, embedding_function = _connect()
+
+# Shared (unpartitioned) collection; holds chunks with no known brand
+DEFAULT_COLLECTION = "support_docs"
+# Per-brand partitions: brand_<id>
+BRAND_COLLECTION_PREFIX = "brand_"
+# Rebuilt collections are named <logical>__<version> and served through an alias
+VERSION_SEPARATOR = "__"
+# Logical name -> physical collection, shared by every process using this store
+ALIASES_FILE = Path(CHROMA_PATH) / "aliases.json"
+# flock'ed around alias updates; aliases.json itself is replaced on every write
+ALIASES_LOCK_FILE = Path(CHROMA_PATH) / "aliases.lock"
+
+_aliases: dict = {}
+_aliases_mtime = None
+_aliases_lock = threading.RLock()
+
+def get_aliases() -> dict:
+    """Current alias map, reloaded when another process swaps an alias."""
+    global _aliases, _aliases_mtime
+    try:
+        mtime = ALIASES_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if mtime != _aliases_mtime:
+        with _aliases_lock:
+            _aliases = json.loads(ALIASES_FILE.read_text())
+            _aliases_mtime = mtime
+    return _aliases
+
+def resolve_collection_name(name: str) -> str:
+    return get_aliases().get(name, name)
+
+def set_alias(name: str, physical_name: str):
+    """
+    Point a logical collection name at a physical collection. The file is
+    re-read and rewritten under an exclusive lock, so concurrent swaps from
+    other processes aren't lost, and replaced atomically for readers.
+    """
+    ALIASES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with _aliases_lock, open(ALIASES_LOCK_FILE, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                aliases = json.loads(ALIASES_FILE.read_text())
+            except FileNotFoundError:
+                aliases = {}
+            aliases[name] = physical_name
+            with tempfile.NamedTemporaryFile("w", dir=ALIASES_FILE.parent, prefix="aliases.", suffix=".tmp", delete=False) as tmp:
+                json.dump(aliases, tmp, indent=2, sort_keys=True)
+            try:
+                os.replace(tmp.name, ALIASES_FILE)
+            except OSError:
+                os.unlink(tmp.name)
+                raise
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def get_collection(name: str = DEFAULT_COLLECTION):
+    return client.get_or_create_collection(name=resolve_collection_name(name), embedding_function=embedding_function)
+
+def brand_collection_name(brand_id: int) -> str:
+    return f"{BRAND_COLLECTION_PREFIX}{int(brand_id)}"
+
+def get_brand_collection(brand_id: int):
+    return get_collection(brand_collection_name(brand_id))
 
-# Initialize ChromaDB client
-# For development, we use a local persistent directory.
-# In production, this might connect to a server.
-client = chromadb.PersistentClient(path="./chroma_db")
+def list_collection_names() -> list[str]:
+    # Older clients return Collection objects, newer ones names
+    return [getattr(collection, "name", collection) for collection in client.list_collections()]
 
-def get_collection(name: str = "support_docs"):
-    return client.get_or_create_collection(name=name)
+def list_brand_ids() -> list[int]:
+    """Brand ids that have a partition on disk (directly or through an alias)."""
+    brand_ids = set()
+    for name in list_collection_names() + list(get_aliases()):
+        logical = name.split(VERSION_SEPARATOR)[0]
+        suffix = logical[len(BRAND_COLLECTION_PREFIX):]
+        if logical.startswith(BRAND_COLLECTION_PREFIX) and suffix.isdigit():
+            brand_ids.add(int(suffix))
+    return sorted(brand_ids)
@@ -0,0 +1,113 @@
+"""
+Client shim for the vector store service (vector_server.py).
+Mirrors the subset of the chromadb client / Collection API this codebase
+uses, so `get_collection()` can hand out a `RemoteCollection` and callers
+don't change. Talks HTTP over the service's Unix socket.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+def _plain(value):
+    """JSON-safe copy (numpy arrays -> lists)."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+class VectorStoreError(RuntimeError):
+    pass
+
+
+class RemoteCollection:
+    def __init__(self, client: "VectorStoreClient", name: str):
+        self._client = client
+        self.name = name
+
+    def _call(self, op: str, **payload) -> Any:
+        payload = {k: _plain(v) for k, v in payload.items() if v is not None}
+        return self._client.request("POST", f"/collections/{self.name}/{op}", payload)
+
+    def count(self) -> int:
+        return self._call("count")
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None) -> Dict[str, Any]:
+        return self._call("get", ids=ids, where=where, limit=limit, offset=offset, include=include)
+
+    def query(self, query_embeddings=None, query_texts=None, n_results: int = 10, where=None, include=None, ids=None) -> Dict[str, Any]:
+        return self._call("query", query_embeddings=query_embeddings, query_texts=query_texts, n_results=n_results, where=where, include=include, ids=ids)
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        """Queued on the service's single writer; returns once written."""
+        self._call("upsert", ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def delete(self, ids=None, where=None):
+        self._call("delete", ids=ids, where=where)
+
+
+class VectorStoreClient:
+    """
+    Usage:
+        client = VectorStoreClient("data/vector_store.sock")
+        collection = client.get_or_create_collection("brand_3")
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 120.0):
+        self.socket_path = socket_path
+        # trust_env=False: proxy settings must not hijack a local socket
+        self._http = httpx.Client(transport=httpx.HTTPTransport(uds=socket_path), base_url="http://vector-store", timeout=timeout, trust_env=False)
+
+    def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Any:
+        response = self._http.request(method, path, json=payload)
+        if response.status_code == 404:
+            raise ValueError(response.json().get("error", f"Not found: {path}"))
+        if response.status_code >= 400:
+            raise VectorStoreError(response.json().get("error", response.text))
+        return response.json()["result"]
+
+    def ping(self) -> bool:
+        try:
+            self.request("GET", "/stats")
+            return True
+        except Exception:
+            return False
+
+    def get_or_create_collection(self, name: str, embedding_function=None, **kwargs) -> RemoteCollection:
+        # Embedding happens in the service, with its own model instance
+        self.request("POST", f"/collections/{name}")
+        return RemoteCollection(self, name)
+
+    def create_collection(self, name: str, embedding_function=None, **kwargs) -> RemoteCollection:
+        return self.get_or_create_collection(name)
+
+    def get_collection(self, name: str, embedding_function=None, **kwargs) -> RemoteCollection:
+        self.request("GET", f"/collections/{name}")
+        return RemoteCollection(self, name)
+
+    def delete_collection(self, name: str):
+        self.request("DELETE", f"/collections/{name}")
+
+    def list_collections(self) -> List[str]:
+        return self.request("GET", "/collections")
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.request("POST", "/embed", {"texts": list(texts)})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.request("GET", "/stats")
+
+
+class RemoteEmbeddingFunction:
+    """Embeds through the service, so the model is loaded once per host."""
+
+    def __init__(self, client: VectorStoreClient):
+        self._client = client
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self._client.embed(input)
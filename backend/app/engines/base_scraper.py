@@ -3,6 +3,7 @@ import random
 import logging
 from typing import Optional, Dict, Any
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from .browser_pool import BrowserPool
 
 # Fix for playwright_stealth import
 try:
@@ -14,14 +15,20 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class BaseScraper:
-    def __init__(self, headless: bool = True, user_agent: Optional[str] = None):
+    def __init__(self, headless: bool = True, user_agent: Optional[str] = None, pool: Optional[BrowserPool] = None):
         self.headless = headless
+        # Optional shared pool. Pooled pages have their cookies reset on release,
+        # so scrapers relying on a persistent Cloudflare session keep their own browser.
+        self.pool = pool
         self.user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.playwright = None
 
     async def start(self):
+        if self.pool:
+            await self.pool.start()
+            return
         self.playwright = await async_playwright().start()
         try:
             self.browser = await self.playwright.chromium.launch(headless=self.headless)
@@ -35,16 +42,25 @@ class BaseScraper:
         )
 
     async def stop(self):
+        # A shared pool is stopped by whoever owns it
         if self.browser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
 
     async def get_page(self) -> Page:
+        if self.pool:
+            return await self.pool.acquire()
         page = await self.context.new_page()
         await stealth_async(page)
         return page
 
+    async def release_page(self, page: Page):
+        if self.pool:
+            await self.pool.release(page)
+        else:
+            await page.close()
+
     async def establish_session(self, base_url: str):
         logger.info(f"Establishing session by visiting {base_url}")
         page = await self.get_page()
@@ -54,7 +70,7 @@ class BaseScraper:
         except Exception as e:
             logger.warning(f"Failed to establish session: {e}")
         finally:
-            await page.close()
+            await self.release_page(page)
 
     async def safe_goto(self, page: Page, url: str, retries: int = 3) -> bool:
         for i in range(retries):
@@ -88,9 +104,11 @@ class BaseScraper:
 
     async def scrape_url(self, url: str) -> Optional[str]:
         page = await self.get_page()
-        success = await self.safe_goto(page, url)
-        content = None
-        if success:
-            content = await page.content()
-        await page.close()
+        try:
+            success = await self.safe_goto(page, url)
+            content = None
+            if success:
+                content = await page.content()
+        finally:
+            await self.release_page(page)
         return content
@@ -0,0 +1,319 @@
+"""
+Shared Playwright browser pool.
+Keeps a few warm browsers with recycled contexts so scrapers lease pages
+instead of launching Chromium per product. Pages are reset between leases,
+browsers are restarted on crash or after a page budget, and pages that are
+held too long (never released) are reported as leaks.
+"""
+
+import asyncio
+import logging
+import time
+import traceback
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+DEFAULT_EXTRA_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+async def _apply_stealth(page: Page):
+    """Apply playwright_stealth if installed (both the old and new APIs are in use in this repo)."""
+    try:
+        from playwright_stealth import Stealth
+        await Stealth().apply_stealth_async(page)
+        return
+    except ImportError:
+        pass
+    try:
+        from playwright_stealth import stealth_async
+        await stealth_async(page)
+    except ImportError:
+        pass
+
+
+def _caller() -> str:
+    """Location of the code that leased a page, skipping pool and contextlib frames."""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename != __file__ and not frame.filename.endswith("contextlib.py"):
+            return f"{frame.filename}:{frame.lineno}"
+    return "unknown"
+
+
+@dataclass
+class _BrowserHandle:
+    index: int
+    browser: Optional[Browser] = None
+    generation: int = 0
+    pages_served: int = 0
+    leased: int = 0
+    restarts: int = 0
+
+
+@dataclass
+class _Slot:
+    handle: _BrowserHandle
+    context: Optional[BrowserContext] = None
+    page: Optional[Page] = None
+    generation: int = -1
+    pages_served: int = 0
+
+
+@dataclass
+class _Lease:
+    slot: _Slot
+    acquired_at: float
+    caller: str
+    warned: bool = False
+
+
+class BrowserPool:
+    """
+    Pool of warm browsers, each with a few reusable context/page slots.
+
+    Usage:
+        async with browser_pool.page() as page:
+            await page.goto(url)
+
+    The pool is bound to the event loop it was started on; call `stop()` at
+    the end of a script run.
+    """
+
+    def __init__(
+        self,
+        browsers: int = 2,
+        contexts_per_browser: int = 2,
+        max_pages_per_browser: int = 200,
+        max_pages_per_context: int = 50,
+        leak_timeout: float = 1800,
+        headless: bool = True,
+        user_agent: Optional[str] = None,
+        context_options: Optional[Dict[str, Any]] = None,
+        stealth: bool = True,
+    ):
+        self.browsers = browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_pages_per_context = max_pages_per_context
+        self.leak_timeout = leak_timeout
+        self.headless = headless
+        self.stealth = stealth
+        self.context_options = {
+            "user_agent": user_agent or DEFAULT_USER_AGENT,
+            "viewport": {"width": 1920, "height": 1080},
+            "extra_http_headers": DEFAULT_EXTRA_HEADERS,
+        }
+        self.context_options.update(context_options or {})
+
+        self.playwright = None
+        self._handles: List[_BrowserHandle] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._leases: Dict[int, _Lease] = {}
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._leak_task: Optional[asyncio.Task] = None
+        self.stats = {"pages_served": 0, "browser_launches": 0, "browser_restarts": 0, "context_recycles": 0, "leaks": 0}
+
+    @property
+    def started(self) -> bool:
+        return self.playwright is not None
+
+    async def start(self):
+        """Start Playwright and launch the warm browsers (idempotent)."""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.started:
+                return
+            self.playwright = await async_playwright().start()
+            self._idle = asyncio.Queue()
+            self._handles = [_BrowserHandle(index=i) for i in range(self.browsers)]
+            for handle in self._handles:
+                await self._launch(handle)
+                for _ in range(self.contexts_per_browser):
+                    self._idle.put_nowait(_Slot(handle=handle))
+            self._leak_task = asyncio.create_task(self._leak_watchdog())
+            logger.info(f"Browser pool started: {self.browsers} browsers x {self.contexts_per_browser} contexts")
+
+    async def stop(self):
+        """Report outstanding leases as leaks, then close every browser."""
+        if not self.started:
+            return
+        if self._leak_task:
+            self._leak_task.cancel()
+            await asyncio.gather(self._leak_task, return_exceptions=True)
+            self._leak_task = None
+
+        for lease in list(self._leases.values()):
+            self.stats["leaks"] += 1
+            logger.warning(f"Browser pool: page acquired at {lease.caller} was never released")
+        self._leases.clear()
+
+        for handle in self._handles:
+            if handle.browser:
+                try:
+                    await handle.browser.close()
+                except Exception:
+                    pass  # Browser may already be gone
+                handle.browser = None
+        try:
+            await self.playwright.stop()
+        finally:
+            self.playwright = None
+            self._handles = []
+            self._idle = None
+        logger.info(f"Browser pool stopped: {self.stats}")
+
+    async def _launch(self, handle: _BrowserHandle):
+        launch_options = {
+            "headless": self.headless,
+            "args": ["--disable-blink-features=AutomationControlled", "--disable-dev-shm-usage"],
+        }
+        try:
+            handle.browser = await self.playwright.chromium.launch(**launch_options)
+        except Exception as e:
+            logger.warning(f"Failed to launch chromium: {e}. Trying firefox...")
+            handle.browser = await self.playwright.firefox.launch(headless=self.headless)
+        handle.generation += 1
+        handle.pages_served = 0
+        self.stats["browser_launches"] += 1
+
+    async def _restart(self, handle: _BrowserHandle, reason: str):
+        logger.info(f"Browser pool: restarting browser {handle.index} ({reason})")
+        if handle.browser:
+            try:
+                await handle.browser.close()
+            except Exception:
+                pass  # Crashed browsers cannot be closed cleanly
+        handle.restarts += 1
+        self.stats["browser_restarts"] += 1
+        await self._launch(handle)
+
+    async def _open_slot(self, slot: _Slot):
+        """(Re)create the slot's context and page on its browser."""
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass  # Context died with its browser
+        slot.context = await slot.handle.browser.new_context(**self.context_options)
+        slot.page = await slot.context.new_page()
+        if self.stealth:
+            await _apply_stealth(slot.page)
+        slot.generation = slot.handle.generation
+        slot.pages_served = 0
+
+    async def acquire(self) -> Page:
+        """Lease a page. Prefer the `page()` context manager, which always releases."""
+        if not self.started:
+            await self.start()
+        slot: _Slot = await self._idle.get()
+        handle = slot.handle
+        try:
+            if handle.browser is None or not handle.browser.is_connected():
+                await self._restart(handle, "browser crashed or disconnected")
+            elif handle.pages_served >= self.max_pages_per_browser and handle.leased == 0:
+                await self._restart(handle, f"recycled after {handle.pages_served} pages")
+
+            if slot.generation != handle.generation:
+                await self._open_slot(slot)
+            elif slot.pages_served >= self.max_pages_per_context:
+                self.stats["context_recycles"] += 1
+                await self._open_slot(slot)
+            elif slot.page is None or slot.page.is_closed():
+                slot.page = await slot.context.new_page()
+                if self.stealth:
+                    await _apply_stealth(slot.page)
+        except Exception:
+            # Force a fresh context next time and keep the slot in rotation
+            slot.generation = -1
+            self._idle.put_nowait(slot)
+            raise
+
+        handle.leased += 1
+        handle.pages_served += 1
+        slot.pages_served += 1
+        self.stats["pages_served"] += 1
+
+        self._leases[id(slot.page)] = _Lease(slot=slot, acquired_at=time.monotonic(), caller=_caller())
+        return slot.page
+
+    async def release(self, page: Page):
+        """Return a leased page: clear its storage and cookies and put the slot back."""
+        if not self.started:
+            # stop() already reported the lease; nothing to return the slot to
+            await self._close_page(page)
+            return
+        lease = self._leases.pop(id(page), None)
+        if lease is None:
+            logger.warning("Browser pool: release() called for a page that was not leased from the pool")
+            return
+        idle = self._idle
+        slot = lease.slot
+        slot.handle.leased -= 1
+        try:
+            if page.is_closed():
+                # Caller closed it (e.g. the old per-product page pattern); reopen on next lease
+                slot.page = None
+            else:
+                await page.evaluate("() => { try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} }")
+                await page.goto("about:blank")
+                await slot.context.clear_cookies()
+        except Exception as e:
+            logger.debug(f"Browser pool: page reset failed, recycling context: {e}")
+            slot.generation = -1
+        if self._idle is not idle:
+            # The pool was stopped (or restarted) while the page was being reset
+            await self._close_page(page)
+            return
+        idle.put_nowait(slot)
+
+    async def _close_page(self, page: Page):
+        try:
+            await page.close()
+        except Exception:
+            pass  # Closed with its browser
+
+    @asynccontextmanager
+    async def page(self):
+        page = await self.acquire()
+        try:
+            yield page
+        finally:
+            await self.release(page)
+
+    def check_leaks(self) -> List[str]:
+        """Log and return pages held longer than `leak_timeout` seconds."""
+        now = time.monotonic()
+        leaks = []
+        for lease in self._leases.values():
+            held = now - lease.acquired_at
+            if held > self.leak_timeout:
+                leaks.append(lease.caller)
+                if not lease.warned:
+                    lease.warned = True
+                    self.stats["leaks"] += 1
+                    logger.warning(f"Browser pool: page acquired at {lease.caller} held for {held:.0f}s (possible leak)")
+        return leaks
+
+    async def _leak_watchdog(self):
+        while True:
+            await asyncio.sleep(60)
+            self.check_leaks()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["leased_pages"] = len(self._leases)
+        stats["idle_slots"] = self._idle.qsize() if self._idle else 0
+        return stats
+
+
+# Global pool shared by ingestion scripts and engines
+browser_pool = BrowserPool()
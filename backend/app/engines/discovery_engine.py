@@ -1,15 +1,16 @@
 import asyncio
 import logging
-import re
 import json
 import os
+from datetime import datetime
 from typing import List, Set, Dict, Optional
 from .base_scraper import BaseScraper
+from .sitemap_reader import SitemapReader
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from sqlmodel import Session, select
 from app.core.database import engine
-from app.models.sql_models import Product, Brand, ProductFamily
+from app.models.sql_models import Product, Brand, ProductFamily, Document
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,8 @@ class DiscoveryEngine:
         self.brand_name = brand_name
         self.base_url = base_url
         self.discovered_urls: Set[str] = set()
+        # lastmod per URL as advertised by the sitemap (None when absent)
+        self.lastmods: Dict[str, Optional[datetime]] = {}
         self.patterns: List[str] = []
         self.knowledge_base_path = f"/workspaces/Support-Center-/backend/data/knowledge_{brand_name.lower().replace(' ', '_')}.json"
         self.load_knowledge()
@@ -41,14 +44,43 @@ class DiscoveryEngine:
         with open(self.knowledge_base_path, 'w') as f:
             json.dump({"patterns": self.patterns}, f, indent=4)
 
-    async def discover_via_sitemap(self, sitemap_url: str):
-        logger.info(f"Attempting sitemap discovery: {sitemap_url}")
-        content = await self.scraper.scrape_url(sitemap_url)
-        if content:
-            urls = re.findall(r'<loc>(.*?)</loc>', content)
-            for url in urls:
-                self.discovered_urls.add(url.rstrip('/'))
-            logger.info(f"Found {len(urls)} URLs in sitemap")
+    async def discover_via_sitemap(self, *sitemap_urls: str):
+        """Stream sitemaps (and sitemap indexes) over HTTP, recording lastmod per URL."""
+        logger.info(f"Attempting sitemap discovery: {', '.join(sitemap_urls)}")
+        reader = SitemapReader()
+        count = 0
+        async for entry in reader.iter_entries(sitemap_urls):
+            url = entry.url.rstrip('/')
+            self.discovered_urls.add(url)
+            previous = self.lastmods.get(url)
+            if previous is None or (entry.lastmod and entry.lastmod > previous):
+                self.lastmods[url] = entry.lastmod
+            count += 1
+        logger.info(f"Found {count} URLs in {reader.sitemaps_fetched} sitemaps ({reader.sitemaps_failed} failed)")
+
+    def filter_stale_urls(self, urls: List[str]) -> List[str]:
+        """
+        Keep only URLs that need (re)scraping: unknown URLs, URLs without a
+        sitemap lastmod, and URLs whose lastmod is newer than Document.last_updated.
+        """
+        with Session(engine) as session:
+            brand = session.exec(select(Brand).where(Brand.name == self.brand_name)).first()
+            if not brand:
+                return urls
+            rows = session.exec(
+                select(Document.url, Document.last_updated).where(Document.brand_id == brand.id)
+            ).all()
+
+        stored = {url.rstrip('/'): last_updated for url, last_updated in rows}
+        stale = []
+        for url in urls:
+            last_updated = stored.get(url)
+            lastmod = self.lastmods.get(url)
+            if last_updated is None or lastmod is None or lastmod > last_updated:
+                stale.append(url)
+
+        logger.info(f"Incremental refresh: {len(stale)}/{len(urls)} URLs changed since last ingestion")
+        return stale
 
     async def discover_via_local_cache(self, cache_path: str):
         logger.info(f"Attempting discovery via local cache: {cache_path}")
@@ -87,7 +119,7 @@ class DiscoveryEngine:
                 for url in potential_urls:
                     self.discovered_urls.add(url.rstrip('/'))
 
-    async def run_discovery(self, strategies: List[str]):
+    async def run_discovery(self, strategies: List[str], incremental: bool = False):
         if "local" in strategies:
             # Try common local cache files
             cache_files = [
@@ -103,14 +135,16 @@ class DiscoveryEngine:
                 urljoin(self.base_url, "sitemap_index.xml"),
                 urljoin(self.base_url, "sitemap-pt-product-p1.xml")
             ]
-            for sm in sitemaps:
-                await self.discover_via_sitemap(sm)
+            await self.discover_via_sitemap(*sitemaps)
         
         if "guessing" in strategies:
             await self.discover_via_guessing()
 
         logger.info(f"Discovery complete. Total URLs found: {len(self.discovered_urls)}")
-        return list(self.discovered_urls)
+        urls = list(self.discovered_urls)
+        if incremental:
+            urls = self.filter_stale_urls(urls)
+        return urls
 
     def learn_pattern(self, successful_urls: List[str]):
         if not successful_urls: return
@@ -2,95 +2,195 @@ import asyncio
 import logging
 import hashlib
 import random
-from typing import List, Optional, Any
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 from .base_scraper import BaseScraper
 from bs4 import BeautifulSoup
-from sqlmodel import Session, select
-from app.core.database import engine
-from app.models.sql_models import Document, Product, Brand
-from app.services.rag_service import ingest_document
+from app.services.ingestion_pipeline import PipelineItem, ingestion_pipeline
+from app.services.crawl_frontier import frontier
+from app.services.page_archive import page_archive
+from app.services.document_registry import document_registry
+from app.services.near_duplicates import near_duplicates
+from app.services.boilerplate import boilerplate, page_headings
 
 logger = logging.getLogger(__name__)
 
+def extract_text(html: str, url: Optional[str] = None, learn: bool = False) -> Tuple[str, str]:
+    """
+    Title and visible text of a page. Module-level so reprocessing can run it in worker processes.
+    With `url`, the domain's learned boilerplate is stripped; `learn` counts the page towards it.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Basic extraction - can be refined per brand
+    title = soup.title.string if soup.title and soup.title.string else ""
+    # Remove scripts and styles
+    for script in soup(["script", "style"]):
+        script.decompose()
+    lines = list(soup.stripped_strings)
+    if url:
+        lines = boilerplate.clean(url, lines, page_headings(soup), learn=learn)
+    return title, ' '.join(lines)
+
+def extract_archived_page(sha256: str, url: Optional[str] = None) -> Tuple[str, str]:
+    """Load an archived page and extract it (runs in reprocessing worker processes)."""
+    return extract_text(page_archive.load(sha256), url)
+
 class IngestionEngine:
-    def __init__(self, scraper: BaseScraper):
+    def __init__(self, scraper: Optional[BaseScraper] = None):
+        # The scraper is only needed for fetching; offline reprocessing runs without one
         self.scraper = scraper
 
     def get_content_hash(self, text: str) -> str:
         return hashlib.md5(text.encode()).hexdigest()
 
-    async def process_url(self, url: str, brand_id: int, product_id: Optional[int] = None):
+    async def fetch_page(self, url: str, brand_id: int, product_id: Optional[int] = None) -> Optional[str]:
+        """Fetch stage: scrape and archive one page."""
         logger.info(f"Processing URL: {url}")
-        
         content = await self.scraper.scrape_url(url)
         if not content:
             logger.warning(f"Failed to get content for {url}")
+            return None
+        # Keep the raw HTML so extraction changes can be replayed without re-crawling
+        await asyncio.to_thread(page_archive.store, url, content, brand_id, product_id)
+        return content
+
+    async def process_url(self, url: str, brand_id: int, product_id: Optional[int] = None):
+        """Fetch one page and hand it to the ingestion pipeline for extraction and storage."""
+        content = await self.fetch_page(url, brand_id, product_id)
+        if not content:
             return False
+        item = self.build_item(url, brand_id, product_id)
+        item.html = content
+        await ingestion_pipeline.submit(item, stage="extract")
+        return True
+
+    def build_item(
+        self,
+        url: str,
+        brand_id: int,
+        product_id: Optional[int] = None,
+        force: bool = False,
+        fetched_at: Optional[datetime] = None,
+    ) -> PipelineItem:
+        """Pipeline item that extracts with `extract_text` and persists via `persist_extracted`."""
+        return PipelineItem(
+            url=url,
+            metadata={
+                "source": url,
+                "brand_id": int(brand_id),
+                "product_id": int(product_id) if product_id else 0,
+            },
+            extract=lambda html: extract_text(html, url, learn=True),
+            persist=lambda item: self.persist_extracted(
+                url, item.title or url, item.text, brand_id, product_id, force=force, fetched_at=fetched_at
+            ),
+        )
 
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Basic extraction - can be refined per brand
-        title = soup.title.string if soup.title else url
-        # Remove scripts and styles
-        for script in soup(["script", "style"]):
-            script.decompose()
-        text = soup.get_text(separator=' ', strip=True)
-        
-        content_hash = self.get_content_hash(text)
+    async def save_extracted(
+        self,
+        url: str,
+        title: str,
+        text: str,
+        brand_id: int,
+        product_id: Optional[int] = None,
+        force: bool = False,
+        fetched_at: Optional[datetime] = None,
+    ) -> bool:
+        """
+        Queue already-extracted page text for persisting and chunking.
+        Returns once the pipeline accepted it; `ingestion_pipeline.drain()`
+        waits for it to be stored.
+        """
+        item = self.build_item(url, brand_id, product_id, force=force, fetched_at=fetched_at)
+        item.title = title
+        item.text = text
+        await ingestion_pipeline.submit(item, stage="persist")
+        return True
 
-        with Session(engine) as session:
-            # Check if document already exists and hasn't changed
-            existing_doc = session.exec(
-                select(Document).where(Document.url == url)
-            ).first()
+    def persist_extracted(
+        self,
+        url: str,
+        title: str,
+        text: str,
+        brand_id: int,
+        product_id: Optional[int] = None,
+        force: bool = False,
+        fetched_at: Optional[datetime] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Persist stage: upsert the Document row for extracted page text.
+        With `force`, chunks are rebuilt even when the content hash is unchanged
+        (e.g. after a chunking change). `fetched_at` dates archived content.
+        Returns chunk metadata for the embed stage, or None when unchanged.
+        """
+        # An unchanged page only gets `last_updated` refreshed, so sitemap
+        # lastmod comparisons see a fresh timestamp
+        result = document_registry.upsert(
+            url,
+            title,
+            brand_id,
+            product_id=product_id,
+            content_hash=self.get_content_hash(text),
+            last_updated=fetched_at or datetime.utcnow(),
+            force=force,
+        )
+        if not result.changed:
+            logger.info(f"Document {url} is up to date.")
+            return None
+        logger.info(f"{result.status.capitalize()} document: {url}")
+        return {"title": str(title), "doc_id": int(result.id)}
 
-            if existing_doc and existing_doc.content_hash == content_hash:
-                logger.info(f"Document {url} is up to date.")
-                return True
+    async def run_ingestion(self, urls: List[str], brand_id: int, batch_size: int = 10) -> List[str]:
+        """
+        Queue URLs in the persistent frontier and feed leased batches through
+        the ingestion pipeline until the brand has nothing eligible left.
+        Fetching continues while earlier pages are still being embedded.
+        Returns the URLs ingested successfully.
+        """
+        # Resume an unfinished run as-is; otherwise start a new cycle over finished URLs too
+        requeue_done = not await asyncio.to_thread(frontier.has_pending, brand_id)
+        await asyncio.to_thread(frontier.enqueue, brand_id, urls, requeue_done=requeue_done)
+        logger.info(f"Starting ingestion for brand {brand_id}: {await asyncio.to_thread(frontier.stats, brand_id)}")
+        successful = []
 
-            if existing_doc:
-                logger.info(f"Updating document: {url}")
-                existing_doc.title = title
-                existing_doc.content_hash = content_hash
-                doc = existing_doc
+        async def on_complete(item: PipelineItem, error: Optional[str]):
+            if error:
+                await asyncio.to_thread(frontier.fail, item.url, error)
             else:
-                logger.info(f"Creating new document: {url}")
-                doc = Document(
-                    title=title,
-                    url=url,
-                    content_hash=content_hash,
-                    brand_id=brand_id,
-                    product_id=product_id
-                )
-                session.add(doc)
-            
-            session.commit()
-            session.refresh(doc)
+                await asyncio.to_thread(frontier.complete, item.url)
+                successful.append(item.url)
 
-            # Update Vector DB
+        async def fetch(url: str) -> Optional[str]:
             try:
-                await ingest_document(
-                    text=text,
-                    metadata={
-                        "source": url,
-                        "title": str(title),
-                        "brand_id": int(brand_id),
-                        "product_id": int(product_id) if product_id else 0,
-                        "doc_id": int(doc.id)
-                    }
-                )
-                logger.info(f"Ingested {url} into Vector DB")
-            except Exception as e:
-                logger.error(f"Failed to ingest into Vector DB: {e}")
-
-        return True
+                return await self.fetch_page(url, brand_id)
+            finally:
+                # Adaptive delay, per fetch worker
+                await asyncio.sleep(random.uniform(5, 15))
 
-    async def run_ingestion(self, urls: List[str], brand_id: int):
-        logger.info(f"Starting ingestion for {len(urls)} URLs")
-        results = []
-        for url in urls:
-            success = await self.process_url(url, brand_id)
-            results.append(success)
-            # Adaptive delay
-            await asyncio.sleep(random.uniform(5, 15))
-        return results
+        try:
+            while True:
+                batch = await asyncio.to_thread(frontier.lease, brand_id, limit=batch_size)
+                if not batch:
+                    # Let in-flight pages finish; failures may be eligible again
+                    await ingestion_pipeline.drain()
+                    batch = await asyncio.to_thread(frontier.lease, brand_id, limit=batch_size)
+                    if not batch:
+                        break
+                for url in batch:
+                    item = self.build_item(url, brand_id)
+                    item.fetch = fetch
+                    item.on_complete = on_complete
+                    # Waits while the fetch queue is full
+                    await ingestion_pipeline.submit(item, stage="fetch")
+        finally:
+            await asyncio.to_thread(frontier.release, brand_id)
+            boilerplate.flush()
+        logger.info(f"Pipeline stats for brand {brand_id}: {ingestion_pipeline.get_stats()}")
+        duplicates = near_duplicates.get_stats()["brands"].get(brand_id)
+        if duplicates:
+            logger.info(
+                f"Near-duplicate chunks for brand {brand_id}: {duplicates['duplicates']}/{duplicates['chunks']} "
+                f"({duplicates['duplicate_rate']:.1%}) referenced instead of embedded"
+            )
+        return successful
@@ -34,7 +34,7 @@ class LearningEngine:
             brand = session.exec(select(Brand).where(Brand.name == brand_name)).first()
             return brand
 
-    async def process_brand(self, brand_name: str, base_url: str, strategies: List[str] = ["sitemap", "guessing"]):
+    async def process_brand(self, brand_name: str, base_url: str, strategies: List[str] = ["sitemap", "guessing"], incremental: bool = False):
         logger.info(f"--- Starting Learning Process for {brand_name} ---")
         brand = self.get_brand_info(brand_name)
         if not brand:
@@ -48,7 +48,7 @@ class LearningEngine:
 
         # 1. Discovery Phase
         logger.info(f"Phase 1: Discovery (Strategies: {strategies})")
-        discovered_urls = await discovery.run_discovery(strategies=strategies)
+        discovered_urls = await discovery.run_discovery(strategies=strategies, incremental=incremental)
         
         if not discovered_urls:
             logger.warning("No URLs discovered.")
@@ -56,13 +56,12 @@ class LearningEngine:
 
         # 2. Ingestion Phase
         logger.info(f"Phase 2: Ingestion ({len(discovered_urls)} URLs)")
-        # Filter out URLs that are already in the DB if needed, 
-        # but IngestionEngine handles hash checks.
-        results = await ingestion.run_ingestion(discovered_urls, brand.id)
+        # URLs are persisted in the crawl frontier (IngestionEngine handles hash checks),
+        # so an interrupted run resumes where it stopped.
+        successful_urls = await ingestion.run_ingestion(discovered_urls, brand.id)
         
         # 3. Learning Phase
         logger.info("Phase 3: Learning and Refinement")
-        successful_urls = [url for url, success in zip(discovered_urls, results) if success]
         discovery.learn_pattern(successful_urls)
         
         # Store summary
@@ -88,6 +87,7 @@ async def run_cli():
     parser.add_argument("--url", help="Base URL for the brand")
     parser.add_argument("--headless", action="store_true", default=True, help="Run in headless mode")
     parser.add_argument("--strategies", nargs="+", default=["sitemap", "guessing"], help="Discovery strategies")
+    parser.add_argument("--incremental", action="store_true", help="Only ingest URLs whose sitemap lastmod is newer than the stored document")
     
     args = parser.parse_args()
     
@@ -98,7 +98,7 @@ async def run_cli():
     engine = LearningEngine(headless=args.headless)
     await engine.start()
     try:
-        await engine.process_brand(args.brand, args.url, strategies=args.strategies)
+        await engine.process_brand(args.brand, args.url, strategies=args.strategies, incremental=args.incremental)
     finally:
         await engine.stop()
 
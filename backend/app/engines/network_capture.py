@@ -0,0 +1,344 @@
+"""
+Network-capture catalogue discovery.
+JS product grids are filled from JSON listing endpoints. Instead of scrolling
+and scraping anchors, listen to `page.on("response")`, parse product records
+(name, URL, image, PDFs) straight from matching JSON payloads, then page
+through the API directly with the browser's request context.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from playwright.async_api import Page
+
+from .readiness import goto_ready
+
+logger = logging.getLogger(__name__)
+
+NAME_KEYS = ("name", "title", "productName", "product_name", "displayName", "label")
+URL_KEYS = ("url", "link", "href", "permalink", "productUrl", "product_url", "path", "slug")
+IMAGE_KEYS = ("image", "imageUrl", "image_url", "img", "thumbnail", "thumb", "picture", "photo", "images", "media")
+PAGE_KEYS = ("page", "p", "pageNumber", "page_number", "pageIndex", "currentPage", "pg")
+OFFSET_KEYS = ("offset", "start", "skip", "from")
+SIZE_KEYS = ("limit", "pageSize", "page_size", "per_page", "perPage", "size", "rows")
+TOTAL_PAGES_KEYS = ("totalPages", "total_pages", "pageCount", "page_count", "lastPage", "last_page")
+
+MAX_WALK_DEPTH = 6
+
+
+@dataclass
+class CaptureProfile:
+    """Where a site's listing API lives and how its product URLs look."""
+    base_url: str
+    url_patterns: List[str]
+    product_url_filter: Optional[str] = None
+    # Used when records carry an id/slug but no URL, e.g. "https://example.com/items/{id}"
+    url_template: Optional[str] = None
+    max_pages: int = 50
+
+
+CAPTURE_PROFILES: Dict[str, CaptureProfile] = {
+    "halilit": CaptureProfile(
+        base_url="https://www.halilit.com",
+        url_patterns=[r"/api/", r"items", r"search", r"products?"],
+        product_url_filter=r"/items/",
+    ),
+    "rcf": CaptureProfile(
+        base_url="https://www.rcf.it",
+        url_patterns=[r"/api/", r"ajax", r"products?", r"\.json"],
+        product_url_filter=r"/product-detail/",
+    ),
+}
+
+
+@dataclass
+class ProductRecord:
+    name: str
+    url: str
+    image_url: Optional[str] = None
+    pdfs: List[Dict[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class CapturedListing:
+    url: str
+    method: str
+    post_data: Optional[str]
+    payload: Any
+    record_count: int
+
+
+def _first_string(data: Dict[str, Any], keys) -> Optional[str]:
+    for key in keys:
+        value = data.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def _image_from(value: Any) -> Optional[str]:
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    if isinstance(value, dict):
+        return _first_string(value, ("url", "src", "href", "large", "medium", "original"))
+    if isinstance(value, list) and value:
+        return _image_from(value[0])
+    return None
+
+
+def _collect_pdfs(value: Any, base_url: str, found: Dict[str, str], title: str = "", depth: int = 0):
+    if depth > MAX_WALK_DEPTH:
+        return
+    if isinstance(value, str):
+        if value.lower().split("?")[0].endswith(".pdf"):
+            found.setdefault(urljoin(base_url, value.strip()), title or "PDF Document")
+    elif isinstance(value, dict):
+        own_title = _first_string(value, NAME_KEYS) or title
+        for item in value.values():
+            _collect_pdfs(item, base_url, found, own_title, depth + 1)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_pdfs(item, base_url, found, title, depth + 1)
+
+
+def record_from_dict(data: Dict[str, Any], profile: CaptureProfile) -> Optional[ProductRecord]:
+    """Build a ProductRecord from one JSON object, or None if it does not look like a product."""
+    name = _first_string(data, NAME_KEYS)
+    url = _first_string(data, URL_KEYS)
+    if not url and profile.url_template:
+        try:
+            url = profile.url_template.format(**data)
+        except (KeyError, IndexError, ValueError):
+            url = None
+    if not name or not url:
+        return None
+
+    url = urljoin(profile.base_url + "/", url)
+    if profile.product_url_filter and not re.search(profile.product_url_filter, url):
+        return None
+
+    image_url = None
+    for key in IMAGE_KEYS:
+        image_url = _image_from(data.get(key))
+        if image_url:
+            image_url = urljoin(profile.base_url + "/", image_url)
+            break
+
+    pdfs: Dict[str, str] = {}
+    _collect_pdfs(data, profile.base_url + "/", pdfs, name)
+    return ProductRecord(
+        name=name,
+        url=url,
+        image_url=image_url,
+        pdfs=[{"url": pdf_url, "title": title} for pdf_url, title in pdfs.items()],
+    )
+
+
+def extract_records(payload: Any, profile: CaptureProfile, depth: int = 0) -> List[ProductRecord]:
+    """Find every list of product-like objects anywhere in a JSON payload."""
+    records: List[ProductRecord] = []
+    if depth > MAX_WALK_DEPTH:
+        return records
+    if isinstance(payload, list):
+        for item in payload:
+            if isinstance(item, dict):
+                record = record_from_dict(item, profile)
+                if record:
+                    records.append(record)
+                    continue
+            records.extend(extract_records(item, profile, depth + 1))
+    elif isinstance(payload, dict):
+        for value in payload.values():
+            if isinstance(value, (list, dict)):
+                records.extend(extract_records(value, profile, depth + 1))
+    return records
+
+
+def _total_pages(payload: Any, depth: int = 0) -> Optional[int]:
+    if not isinstance(payload, dict) or depth > 2:
+        return None
+    for key in TOTAL_PAGES_KEYS:
+        value = payload.get(key)
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            return int(value)
+    for value in payload.values():
+        found = _total_pages(value, depth + 1)
+        if found:
+            return found
+    return None
+
+
+@dataclass
+class _Pager:
+    key: str
+    in_body: bool
+    start: int
+    step: int
+
+
+def _find_pager(listing: CapturedListing) -> Optional[_Pager]:
+    """Locate the page/offset parameter in the captured request's query string or JSON body."""
+    params: Dict[str, Any] = dict(parse_qsl(urlsplit(listing.url).query))
+    in_body = False
+    if listing.method.upper() == "POST" and listing.post_data:
+        try:
+            body = json.loads(listing.post_data)
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            params, in_body = body, True
+
+    def as_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    for key in PAGE_KEYS:
+        if as_int(params.get(key)) is not None:
+            return _Pager(key=key, in_body=in_body, start=as_int(params[key]), step=1)
+    for key in OFFSET_KEYS:
+        if as_int(params.get(key)) is not None:
+            size = next((as_int(params[k]) for k in SIZE_KEYS if as_int(params.get(k))), None)
+            return _Pager(key=key, in_body=in_body, start=as_int(params[key]), step=size or listing.record_count)
+    # No explicit parameter: most listing APIs accept ?page=N with page 1 as the default
+    if not in_body:
+        return _Pager(key="page", in_body=False, start=1, step=1)
+    return None
+
+
+class NetworkCapture:
+    """Collects product records from JSON responses while a page loads."""
+
+    def __init__(self, page: Page, profile: CaptureProfile):
+        self.page = page
+        self.profile = profile
+        self.patterns = [re.compile(p, re.IGNORECASE) for p in profile.url_patterns]
+        self.listings: List[CapturedListing] = []
+        self.records: Dict[str, ProductRecord] = {}
+        self._tasks = set()
+
+    def attach(self):
+        self.page.on("response", self._listener)
+
+    def detach(self):
+        try:
+            self.page.remove_listener("response", self._listener)
+        except Exception:
+            pass  # Page already closed
+
+    def _listener(self, response):
+        task = asyncio.ensure_future(self._on_response(response))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def settle(self):
+        """Wait for in-flight response handlers to finish parsing."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _on_response(self, response):
+        try:
+            if response.request.resource_type not in ("xhr", "fetch"):
+                return
+            if not any(p.search(response.url) for p in self.patterns):
+                return
+            if "json" not in (response.headers.get("content-type") or ""):
+                return
+            payload = await response.json()
+        except Exception as e:
+            logger.debug(f"Network capture: could not read {response.url}: {e}")
+            return
+
+        records = extract_records(payload, self.profile)
+        if not records:
+            return
+        self.listings.append(CapturedListing(
+            url=response.url,
+            method=response.request.method,
+            post_data=response.request.post_data,
+            payload=payload,
+            record_count=len(records),
+        ))
+        added = self.add_records(records)
+        logger.info(f"Network capture: {len(records)} products ({added} new) from {response.url}")
+
+    def add_records(self, records: List[ProductRecord]) -> int:
+        added = 0
+        for record in records:
+            if record.url not in self.records:
+                self.records[record.url] = record
+                added += 1
+        return added
+
+    async def _fetch_page(self, listing: CapturedListing, pager: _Pager, value: int) -> Any:
+        if pager.in_body:
+            body = json.loads(listing.post_data)
+            body[pager.key] = value
+            response = await self.page.request.post(listing.url, data=body)
+        else:
+            parts = urlsplit(listing.url)
+            query = dict(parse_qsl(parts.query))
+            query[pager.key] = str(value)
+            url = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+            response = await self.page.request.get(url)
+        if not response.ok:
+            raise RuntimeError(f"status {response.status}")
+        return await response.json()
+
+    async def paginate(self) -> int:
+        """Page through the richest captured listing API until it runs dry. Returns pages fetched."""
+        if not self.listings:
+            return 0
+        listing = max(self.listings, key=lambda l: l.record_count)
+        pager = _find_pager(listing)
+        if pager is None:
+            return 0
+
+        total_pages = _total_pages(listing.payload)
+        fetched = 0
+        value = pager.start
+        while fetched < self.profile.max_pages:
+            value += pager.step
+            if total_pages and pager.step == 1 and value > total_pages:
+                break
+            try:
+                payload = await self._fetch_page(listing, pager, value)
+            except Exception as e:
+                logger.info(f"Network capture: pagination stopped at {pager.key}={value}: {e}")
+                break
+            fetched += 1
+            if self.add_records(extract_records(payload, self.profile)) == 0:
+                break
+        logger.info(f"Network capture: paged {fetched} extra pages via {pager.key}, {len(self.records)} products total")
+        return fetched
+
+
+async def capture_catalogue(
+    page: Page,
+    url: str,
+    profile: str,
+    readiness_profile: str = "json_catalogue",
+    paginate: bool = True,
+) -> List[ProductRecord]:
+    """
+    Load a catalogue page and return product records captured from its JSON API.
+    Returns an empty list when no listing endpoint was seen, so callers can
+    fall back to DOM scraping.
+    """
+    capture = NetworkCapture(page, CAPTURE_PROFILES[profile])
+    capture.attach()
+    try:
+        await goto_ready(page, url, readiness_profile)
+        await capture.settle()
+        if paginate:
+            await capture.paginate()
+    finally:
+        capture.detach()
+        await capture.settle()
+    return list(capture.records.values())
@@ -0,0 +1,242 @@
+"""
+Single-roundtrip product page extraction.
+One `page.evaluate` collects images, links, labelled sections, language and
+title as a compact JSON payload; filtering and classification happen in Python
+so a link-heavy page costs one CDP call instead of thousands.
+Static HTML cleanup (`html_to_text`) is cached by content hash; learned
+per-domain boilerplate is stripped after the cache.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from playwright.async_api import Page
+
+from ..services.boilerplate import boilerplate, page_headings
+from ..services.extraction_cache import extraction_cache, sha256_bytes
+
+logger = logging.getLogger(__name__)
+
+# Bump when html_to_text output changes, to invalidate cached text
+HTML_EXTRACTOR_VERSION = "html-v2"
+HTML_NOISE_TAGS = ["script", "style", "nav", "footer", "header"]
+
+# Labelled sections looked up by common classes/IDs, in output order
+SECTION_SELECTORS = [
+    ("FEATURES", ".product-features, .features, #features, .features-list"),
+    ("SPECIFICATIONS", ".product-specs, .specs, #specs, .specifications, .technical-specs, #technical-specifications"),
+    ("OVERVIEW", ".product-description, .description, #description, .overview, .product-overview"),
+]
+
+# Fallback when no selector matches: parent of the first heading mentioning the keyword
+SECTION_KEYWORDS = [("FEATURES", "Features"), ("SPECIFICATIONS", "Specifications"), ("OVERVIEW", "Overview")]
+
+MIN_SECTION_LENGTH = 50
+MAX_LINK_TEXT = 300
+
+IMAGE_KEYWORDS = ["product", "hero", "main", "gallery", "large"]
+PDF_ENGLISH_KEYWORDS = ["ENGLISH", " EN ", "_EN", "MANUAL", "USER GUIDE", "DATASHEET", "QUICK START", "REFERENCE"]
+PDF_OTHER_LANGUAGE_KEYWORDS = ["FRENCH", "GERMAN", "ITALIAN", "SPANISH", "CHINESE", "FRANCAIS", "DEUTSCH", "ITALIANO", "ESPANOL"]
+MANUAL_KEYWORDS = ["manual", "user guide", "reference", "documentation"]
+DOCUMENTATION_KEYWORDS = ["support", "documentation", "specs", "specifications", "downloads", "resources"]
+
+EXTRACT_SCRIPT = """
+({selectors, keywords, minLength, maxLinkText}) => {
+    const text = el => ((el && (el.innerText || el.textContent)) || '').trim();
+
+    const images = [];
+    for (const img of document.images) {
+        const src = img.currentSrc || img.src || img.getAttribute('src') || '';
+        if (src && !src.startsWith('data:')) images.push([src, img.getAttribute('alt') || '']);
+    }
+
+    const links = [];
+    for (const a of document.querySelectorAll('a[href]')) {
+        const href = a.href || '';
+        if (!href || href.startsWith('javascript:') || href.startsWith('mailto:')) continue;
+        links.push([href, text(a).slice(0, maxLinkText)]);
+    }
+
+    const sections = [];
+    for (const [label, selector] of selectors) {
+        const value = text(document.querySelector(selector));
+        if (value.length > minLength) sections.push([label, value]);
+    }
+
+    if (!sections.length) {
+        const headers = Array.from(document.querySelectorAll('h1, h2, h3, h4, h5, b, strong'));
+        for (const [label, keyword] of keywords) {
+            const header = headers.find(h => h.textContent.includes(keyword));
+            const value = header ? text(header.parentElement) : '';
+            if (value.length > minLength) sections.push([label, value]);
+        }
+    }
+
+    return {
+        url: location.href,
+        title: document.title || '',
+        lang: document.documentElement.lang || '',
+        images,
+        links,
+        sections,
+        body_text: sections.length ? '' : text(document.body),
+    };
+}
+"""
+
+CLICK_TAB_SCRIPT = """
+(label) => {
+    for (const a of document.querySelectorAll('a')) {
+        if ((a.innerText || '').toUpperCase().includes(label)) { a.click(); return true; }
+    }
+    return false;
+}
+"""
+
+
+@dataclass
+class ExtractedPage:
+    url: str
+    title: str = ""
+    lang: str = ""
+    images: List[Dict[str, str]] = field(default_factory=list)
+    pdf_links: List[Dict[str, str]] = field(default_factory=list)
+    documentation_links: List[Dict[str, str]] = field(default_factory=list)
+    sections: List[Dict[str, str]] = field(default_factory=list)
+    body_text: str = ""
+    extraction_ms: float = 0.0
+
+    @property
+    def is_english(self) -> bool:
+        return not self.lang or self.lang.lower().startswith("en")
+
+    @property
+    def text(self) -> str:
+        """Labelled sections, or the filtered body text when none were found."""
+        if self.sections:
+            return "\n\n".join(f"### {s['label']}\n{s['text']}" for s in self.sections)
+        lines = [line.strip() for line in self.body_text.split("\n") if len(line.strip()) > 20]
+        return "\n".join(lines)
+
+
+def classify_images(raw_images: List[List[str]]) -> List[Dict[str, str]]:
+    """Keep product/gallery images, dropping icons and logos."""
+    images = []
+    seen = set()
+    for src, alt in raw_images:
+        src_lower = src.lower()
+        alt_lower = alt.lower()
+        if src in seen:
+            continue
+        if not (len(alt) > 3 or "product" in src_lower or "hero" in src_lower or "gallery" in src_lower):
+            continue
+        if any(kw in alt_lower or kw in src_lower for kw in IMAGE_KEYWORDS):
+            seen.add(src)
+            images.append({"url": src, "alt": alt})
+    return images
+
+
+def classify_links(raw_links: List[List[str]]) -> Dict[str, List[Dict[str, str]]]:
+    """Split links into English PDF documents (manuals first) and documentation pages."""
+    manuals, other_pdfs, documentation = [], [], []
+    seen = set()
+    for href, text in raw_links:
+        if href in seen:
+            continue
+        text = text.strip()
+        text_lower = text.lower()
+
+        if href.lower().split("?")[0].split("#")[0].endswith(".pdf"):
+            title_upper = text.upper()
+            url_upper = href.upper()
+            is_english = any(kw in title_upper or kw in url_upper for kw in PDF_ENGLISH_KEYWORDS)
+            is_other_lang = any(kw in title_upper for kw in PDF_OTHER_LANGUAGE_KEYWORDS)
+            if is_english or not is_other_lang:
+                seen.add(href)
+                entry = {"url": href, "title": text or "PDF Document"}
+                if any(kw in text_lower for kw in MANUAL_KEYWORDS):
+                    manuals.append(entry)
+                else:
+                    other_pdfs.append(entry)
+
+        elif any(kw in text_lower for kw in DOCUMENTATION_KEYWORDS):
+            seen.add(href)
+            documentation.append({"url": href, "title": text})
+
+    return {"pdf_links": manuals + other_pdfs, "documentation_links": documentation}
+
+
+def parse_payload(payload: Dict[str, Any]) -> ExtractedPage:
+    """Turn the raw in-page payload into a classified ExtractedPage."""
+    links = classify_links(payload.get("links") or [])
+    return ExtractedPage(
+        url=payload.get("url", ""),
+        title=(payload.get("title") or "").strip(),
+        lang=payload.get("lang") or "",
+        images=classify_images(payload.get("images") or []),
+        pdf_links=links["pdf_links"],
+        documentation_links=links["documentation_links"],
+        sections=[{"label": label, "text": text} for label, text in payload.get("sections") or []],
+        body_text=payload.get("body_text") or "",
+    )
+
+
+async def extract_page(page: Page) -> ExtractedPage:
+    """Extract a loaded product page with a single evaluate call."""
+    started = time.perf_counter()
+    payload = await page.evaluate(
+        EXTRACT_SCRIPT,
+        {
+            "selectors": [[label, selector] for label, selector in SECTION_SELECTORS],
+            "keywords": [[label, keyword] for label, keyword in SECTION_KEYWORDS],
+            "minLength": MIN_SECTION_LENGTH,
+            "maxLinkText": MAX_LINK_TEXT,
+        },
+    )
+    extracted = parse_payload(payload)
+    extracted.extraction_ms = (time.perf_counter() - started) * 1000
+    logger.debug(
+        f"Extracted {extracted.url} in {extracted.extraction_ms:.1f}ms: "
+        f"{len(extracted.images)} images, {len(extracted.pdf_links)} PDFs, {len(extracted.sections)} sections"
+    )
+    return extracted
+
+
+def html_to_text(html: str, use_cache: bool = True, url: Optional[str] = None, learn: bool = False) -> Tuple[str, str]:
+    """
+    Strip scripts and page chrome from raw HTML.
+    Returns (title, text); results are cached by the HTML's SHA-256.
+    With `url`, the domain's learned boilerplate is stripped from the
+    cached text (see services.boilerplate); `learn` counts the page towards it.
+    """
+    sha256 = sha256_bytes(html.encode("utf-8", errors="replace"))
+    cached = extraction_cache.get(sha256, HTML_EXTRACTOR_VERSION) if use_cache else None
+    if cached is not None:
+        title, text = cached["meta"].get("title", ""), cached["pages"][0][1] if cached["pages"] else ""
+        headings = cached["meta"].get("headings", [])
+    else:
+        soup = BeautifulSoup(html, "html.parser")
+        for tag in soup(HTML_NOISE_TAGS):
+            tag.decompose()
+        title = soup.title.string.strip() if soup.title and soup.title.string else ""
+        text = soup.get_text(separator="\n", strip=True)
+        headings = page_headings(soup)
+        if use_cache:
+            extraction_cache.put(sha256, HTML_EXTRACTOR_VERSION, [(1, text)], meta={"title": title, "headings": headings})
+
+    # Applied after the cache: the learned model changes as crawls run
+    if url and text:
+        text = "\n".join(boilerplate.clean(url, text.split("\n"), headings, learn=learn))
+    return title, text
+
+
+async def click_tab(page: Page, label: str) -> bool:
+    """Click the first link whose text contains `label` (e.g. a SPECIFICATIONS tab)."""
+    try:
+        return bool(await page.evaluate(CLICK_TAB_SCRIPT, label.upper()))
+    except Exception as e:
+        logger.debug(f"Could not click tab {label}: {e}")
+        return False
@@ -0,0 +1,246 @@
+"""
+Event-driven page readiness.
+Replaces fixed post-navigation sleeps: each profile declares what "ready"
+means (a selector count that stops growing, a network-quiet window, a
+specific XHR completing) and the scraper waits exactly that long, up to a
+cap. Actual wait times are recorded per profile.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from playwright.async_api import Page
+
+logger = logging.getLogger(__name__)
+
+# Long-lived connections never "finish" and would keep the network busy forever
+IGNORED_RESOURCE_TYPES = {"websocket", "eventsource", "media"}
+
+COUNT_SCRIPT = "(selector) => document.querySelectorAll(selector).length"
+MEASURE_SCRIPT = "(selector) => [document.body.scrollHeight, selector ? document.querySelectorAll(selector).length : 0]"
+
+
+@dataclass(frozen=True)
+class ReadinessSpec:
+    """
+    What "ready" means for a page. Every condition that is set must hold.
+
+    selector: number of matches must reach `min_count` and stay unchanged for `stable_ms`
+    network_quiet_ms: no requests in flight for this long
+    response_pattern: regex of a request URL that must have finished
+    timeout: cap in seconds (the old fixed sleep)
+    """
+    selector: Optional[str] = None
+    min_count: int = 1
+    stable_ms: int = 500
+    network_quiet_ms: Optional[int] = None
+    response_pattern: Optional[str] = None
+    timeout: float = 10.0
+    poll_interval: float = 0.1
+
+
+# Per-brand/page-type profiles; timeouts match the sleeps they replace
+PROFILES: Dict[str, ReadinessSpec] = {
+    "product_page": ReadinessSpec(selector="a[href], img", stable_ms=400, network_quiet_ms=500, timeout=3),
+    "rcf_product": ReadinessSpec(selector="a[href], img", stable_ms=400, network_quiet_ms=500, timeout=3),
+    "rcf_tab": ReadinessSpec(network_quiet_ms=300, timeout=1),
+    "rcf_category": ReadinessSpec(selector="a[href*='/product-detail/']", stable_ms=750, network_quiet_ms=500, timeout=8),
+    "rcf_catalogue": ReadinessSpec(selector="a[href*='/items/']", stable_ms=750, timeout=10),
+    "mackie_listing": ReadinessSpec(selector="a[href$='.html']", stable_ms=750, network_quiet_ms=500, timeout=5),
+    "allen_heath_listing": ReadinessSpec(
+        selector="a[href*='/products/'], a[href*='/hardware/']", stable_ms=750, network_quiet_ms=500, timeout=5
+    ),
+    "cookie_banner": ReadinessSpec(network_quiet_ms=300, timeout=2),
+    "json_catalogue": ReadinessSpec(network_quiet_ms=750, timeout=10),
+}
+
+
+def get_profile(name: str) -> ReadinessSpec:
+    return PROFILES.get(name, PROFILES["product_page"])
+
+
+class ReadinessStats:
+    """Per-profile wait timings, to compare against the sleeps they replaced."""
+
+    def __init__(self):
+        self.profiles: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, seconds: float, timed_out: bool = False):
+        entry = self.profiles.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "timeouts": 0})
+        entry["count"] += 1
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        if timed_out:
+            entry["timeouts"] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "count": entry["count"],
+                "avg_seconds": round(entry["total_seconds"] / entry["count"], 3) if entry["count"] else 0.0,
+                "max_seconds": round(entry["max_seconds"], 3),
+                "timeouts": entry["timeouts"],
+            }
+            for name, entry in self.profiles.items()
+        }
+
+
+class _NetworkTracker:
+    """Tracks in-flight requests and whether a matching response has finished."""
+
+    def __init__(self, page: Page, response_pattern: Optional[str] = None):
+        self.page = page
+        self.pattern = re.compile(response_pattern) if response_pattern else None
+        self.inflight = set()
+        self.last_activity = time.monotonic()
+        self.matched = False
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def _on_request(self, request):
+        if request.resource_type in IGNORED_RESOURCE_TYPES:
+            return
+        self.inflight.add(request)
+        self.last_activity = time.monotonic()
+
+    def _on_done(self, request):
+        self.inflight.discard(request)
+        self.last_activity = time.monotonic()
+        if self.pattern and self.pattern.search(request.url):
+            self.matched = True
+
+    def quiet_for(self) -> float:
+        if self.inflight:
+            return 0.0
+        return time.monotonic() - self.last_activity
+
+    def detach(self):
+        for event, handler in (("request", self._on_request), ("requestfinished", self._on_done), ("requestfailed", self._on_done)):
+            try:
+                self.page.remove_listener(event, handler)
+            except Exception:
+                pass  # Page already closed
+
+
+async def _wait(page: Page, spec: ReadinessSpec, tracker: Optional[_NetworkTracker]) -> bool:
+    """Poll until every condition in `spec` holds. Returns False on timeout."""
+    deadline = time.monotonic() + spec.timeout
+    last_count = -1
+    count_since = time.monotonic()
+
+    while True:
+        ready = True
+        now = time.monotonic()
+
+        if spec.selector:
+            try:
+                count = await page.evaluate(COUNT_SCRIPT, spec.selector)
+            except Exception:
+                count = -1  # Page navigating; try again
+            now = time.monotonic()
+            if count != last_count:
+                last_count = count
+                count_since = now
+            if count < spec.min_count or (now - count_since) * 1000 < spec.stable_ms:
+                ready = False
+
+        if tracker is not None:
+            if spec.network_quiet_ms and tracker.quiet_for() * 1000 < spec.network_quiet_ms:
+                ready = False
+            if tracker.pattern and not tracker.matched:
+                ready = False
+
+        if ready:
+            return True
+        if now >= deadline:
+            return False
+        await asyncio.sleep(spec.poll_interval)
+
+
+async def wait_until_ready(page: Page, profile: str, _tracker: Optional[_NetworkTracker] = None) -> float:
+    """
+    Wait until the page matches the named profile (or its cap).
+    Used after in-page actions (clicks); prefer `goto_ready` for navigation so
+    network conditions are tracked from the first request.
+
+    Returns:
+        Seconds actually waited
+    """
+    spec = get_profile(profile)
+    tracker = _tracker
+    if tracker is None and (spec.network_quiet_ms or spec.response_pattern):
+        tracker = _NetworkTracker(page, spec.response_pattern)
+
+    started = time.monotonic()
+    try:
+        ready = await _wait(page, spec, tracker)
+    finally:
+        if tracker is not None and _tracker is None:
+            tracker.detach()
+
+    elapsed = time.monotonic() - started
+    readiness_stats.record(profile, elapsed, timed_out=not ready)
+    if ready:
+        logger.debug(f"Readiness [{profile}]: ready after {elapsed:.2f}s")
+    else:
+        logger.debug(f"Readiness [{profile}]: cap of {spec.timeout}s reached")
+    return elapsed
+
+
+async def goto_ready(page: Page, url: str, profile: str, wait_until: str = "domcontentloaded", timeout: int = 60000):
+    """Navigate, then wait for the profile's readiness conditions. Returns the navigation response."""
+    spec = get_profile(profile)
+    tracker = _NetworkTracker(page, spec.response_pattern) if (spec.network_quiet_ms or spec.response_pattern) else None
+    try:
+        response = await page.goto(url, wait_until=wait_until, timeout=timeout)
+        await wait_until_ready(page, profile, _tracker=tracker)
+    finally:
+        if tracker is not None:
+            tracker.detach()
+    return response
+
+
+async def scroll_until_stable(
+    page: Page,
+    selector: Optional[str] = None,
+    max_scrolls: int = 20,
+    settle_timeout: float = 2.0,
+    poll_interval: float = 0.1,
+    label: str = "scroll",
+) -> int:
+    """
+    Scroll to the bottom until neither the page height nor the `selector`
+    count grows within `settle_timeout`. Returns the number of scrolls.
+    """
+    started = time.monotonic()
+    last = await page.evaluate(MEASURE_SCRIPT, selector)
+    scrolls = 0
+
+    while scrolls < max_scrolls:
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        scrolls += 1
+
+        deadline = time.monotonic() + settle_timeout
+        grew = False
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+            current = await page.evaluate(MEASURE_SCRIPT, selector)
+            if current != last:
+                last = current
+                grew = True
+                break
+        if not grew:
+            break
+
+    readiness_stats.record(label, time.monotonic() - started, timed_out=scrolls >= max_scrolls)
+    logger.debug(f"Readiness [{label}]: {scrolls} scrolls in {time.monotonic() - started:.2f}s")
+    return scrolls
+
+
+# Global timing stats
+readiness_stats = ReadinessStats()
@@ -0,0 +1,207 @@
+"""
+Streaming sitemap reader.
+Parses sitemaps incrementally over HTTP (plain or .xml.gz), follows sitemap
+indexes recursively and yields (url, lastmod) entries without holding the
+whole document in memory.
+"""
+
+import asyncio
+import logging
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable, List, Optional, Set
+from xml.etree.ElementTree import XMLPullParser
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+
+@dataclass(frozen=True)
+class SitemapEntry:
+    url: str
+    lastmod: Optional[datetime] = None
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Parse a W3C datetime into a naive UTC datetime (matches Document.last_updated)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class _SitemapStreamParser:
+    """Incremental parser that turns fed bytes into <url> entries and child sitemaps."""
+
+    def __init__(self):
+        self.parser = XMLPullParser(events=("end",))
+        self.entries: List[SitemapEntry] = []
+        self.child_sitemaps: List[str] = []
+
+    def feed(self, data: bytes):
+        self.parser.feed(data)
+        self._drain()
+
+    def close(self):
+        self.parser.close()
+        self._drain()
+
+    def _drain(self):
+        for _, elem in self.parser.read_events():
+            name = _local_name(elem.tag)
+            if name not in ("url", "sitemap"):
+                continue
+
+            loc = None
+            lastmod = None
+            for child in elem:
+                child_name = _local_name(child.tag)
+                if child_name == "loc" and child.text:
+                    loc = child.text.strip()
+                elif child_name == "lastmod":
+                    lastmod = parse_lastmod(child.text)
+
+            if loc:
+                if name == "url":
+                    self.entries.append(SitemapEntry(loc, lastmod))
+                else:
+                    self.child_sitemaps.append(loc)
+
+            # Free the subtree so large sitemaps stay flat in memory
+            elem.clear()
+
+
+class SitemapReader:
+    """
+    Reads sitemaps with bounded concurrency.
+
+    Usage:
+        reader = SitemapReader()
+        async for entry in reader.iter_entries(["https://example.com/sitemap.xml"]):
+            ...
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        timeout: float = 30.0,
+        max_depth: int = 5,
+        user_agent: Optional[str] = None,
+        queue_size: int = 1000,
+    ):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_depth = max_depth
+        self.user_agent = user_agent or DEFAULT_USER_AGENT
+        self.queue_size = queue_size
+        self.sitemaps_fetched = 0
+        self.sitemaps_failed = 0
+
+    async def _stream_sitemap(self, client: httpx.AsyncClient, sitemap_url: str, out: asyncio.Queue) -> List[str]:
+        """Stream one sitemap into `out`. Returns child sitemap URLs if it is an index."""
+        parser = _SitemapStreamParser()
+        decompressor = None
+
+        async with client.stream("GET", sitemap_url) as response:
+            if response.status_code != 200:
+                logger.warning(f"Sitemap {sitemap_url} returned status {response.status_code}")
+                self.sitemaps_failed += 1
+                return []
+
+            first_chunk = True
+            async for chunk in response.aiter_bytes():
+                if first_chunk and chunk:
+                    # httpx already undoes Content-Encoding; raw .xml.gz payloads still start with the gzip magic
+                    if chunk[:2] == GZIP_MAGIC:
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    first_chunk = False
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk)
+                parser.feed(chunk)
+                for entry in parser.entries:
+                    await out.put(entry)
+                parser.entries.clear()
+
+            if decompressor is not None:
+                parser.feed(decompressor.flush())
+            parser.close()
+
+        for entry in parser.entries:
+            await out.put(entry)
+
+        self.sitemaps_fetched += 1
+        if parser.child_sitemaps:
+            logger.info(f"Sitemap index {sitemap_url} references {len(parser.child_sitemaps)} sitemaps")
+        return parser.child_sitemaps
+
+    async def iter_entries(self, sitemap_urls: Iterable[str]) -> AsyncIterator[SitemapEntry]:
+        """Yield every (url, lastmod) entry reachable from the given sitemaps."""
+        out: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        pending: asyncio.Queue = asyncio.Queue()
+        seen: Set[str] = set()
+
+        for url in sitemap_urls:
+            if url not in seen:
+                seen.add(url)
+                pending.put_nowait((url, 0))
+
+        done_sentinel = object()
+
+        async with httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": self.user_agent},
+        ) as client:
+
+            async def worker():
+                while True:
+                    sitemap_url, depth = await pending.get()
+                    try:
+                        children = await self._stream_sitemap(client, sitemap_url, out)
+                        if depth < self.max_depth:
+                            for child in children:
+                                if child not in seen:
+                                    seen.add(child)
+                                    pending.put_nowait((child, depth + 1))
+                    except Exception as e:
+                        logger.warning(f"Failed to read sitemap {sitemap_url}: {e}")
+                        self.sitemaps_failed += 1
+                    finally:
+                        pending.task_done()
+
+            async def supervisor():
+                workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+                try:
+                    await pending.join()
+                finally:
+                    for w in workers:
+                        w.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+                await out.put(done_sentinel)
+
+            supervisor_task = asyncio.create_task(supervisor())
+            try:
+                while True:
+                    item = await out.get()
+                    if item is done_sentinel:
+                        break
+                    yield item
+            finally:
+                if not supervisor_task.done():
+                    supervisor_task.cancel()
+                await asyncio.gather(supervisor_task, return_exceptions=True)
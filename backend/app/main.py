@@ -1,15 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from .core.database import create_db_and_tables
+from .core.database import create_db_and_tables, async_engine
 from .api import brands, chat, ingestion, cache, worker, documents
 from .scheduler import start_scheduler
+from .engines.browser_pool import browser_pool
+from .core.db_writer import db_writer
+from .services.ingestion_pipeline import ingestion_pipeline
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
     start_scheduler()
     yield
+    await ingestion_pipeline.stop()
+    await browser_pool.stop()
+    db_writer.stop()
+    await async_engine.dispose()
 
 app = FastAPI(title="Halilit Support Center API", lifespan=lifespan)
 
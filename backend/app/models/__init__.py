@@ -1,4 +1,4 @@
-from .sql_models import Brand, ProductFamily, Product, Document, IngestLog
+from .sql_models import Brand, ProductFamily, Product, Document, IngestLog, FrontierURL, PageSnapshot
 from .ingestion_status import IngestionStatus
 
-__all__ = ["Brand", "ProductFamily", "Product", "Document", "IngestLog", "IngestionStatus"]
+__all__ = ["Brand", "ProductFamily", "Product", "Document", "IngestLog", "FrontierURL", "PageSnapshot", "IngestionStatus"]
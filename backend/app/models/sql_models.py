@@ -1,4 +1,5 @@
 from typing import Optional, List
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from datetime import datetime
 
@@ -16,6 +17,8 @@ class Brand(SQLModel, table=True):
     media: List["Media"] = Relationship(back_populates="brand")
 
 class ProductFamily(SQLModel, table=True):
+    __table_args__ = (Index("ix_productfamily_brand_id_name", "brand_id", "name", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True)
     description: Optional[str] = None
@@ -25,6 +28,8 @@ class ProductFamily(SQLModel, table=True):
     products: List["Product"] = Relationship(back_populates="family")
 
 class Product(SQLModel, table=True):
+    __table_args__ = (Index("ix_product_family_id_name", "family_id", "name", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True)
     description: Optional[str] = None
@@ -36,10 +41,13 @@ class Product(SQLModel, table=True):
     media: List["Media"] = Relationship(back_populates="product")
 
 class Document(SQLModel, table=True):
+    # Keys are normalized URLs; write through services.document_registry
+    __table_args__ = (Index("ix_document_brand_id_id", "brand_id", "id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
-    url: str
-    content_hash: Optional[str] = None
+    url: str = Field(index=True, unique=True)
+    content_hash: Optional[str] = Field(default=None, index=True)
     last_updated: datetime = Field(default_factory=datetime.utcnow)
     brand_id: int = Field(foreign_key="brand.id")
     product_id: Optional[int] = Field(default=None, foreign_key="product.id")
@@ -56,7 +64,7 @@ class Media(SQLModel, table=True):
     alt_text: Optional[str] = None
     brand_id: int = Field(foreign_key="brand.id", index=True)
     product_id: Optional[int] = Field(default=None, foreign_key="product.id", index=True)
-    document_id: Optional[int] = Field(default=None, foreign_key="document.id")
+    document_id: Optional[int] = Field(default=None, foreign_key="document.id", index=True)
     relevance_score: float = 1.0  # 0-1, where 1 = highly relevant
     last_verified: datetime = Field(default_factory=datetime.utcnow)
     is_official: bool = True  # Ensure only official sources
@@ -75,4 +83,58 @@ class IngestLog(SQLModel, table=True):
     documents_created: int = 0
     media_attached: int = 0
     timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
-    ingestion_time_ms: int = 0
\ No newline at end of file
+    ingestion_time_ms: int = 0
+
+class FrontierURL(SQLModel, table=True):
+    """Persistent crawl frontier: one row per URL, leased to workers in batches."""
+    __tablename__ = "crawl_frontier"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url: str = Field(index=True, unique=True)
+    brand_id: int = Field(foreign_key="brand.id", index=True)
+    priority: int = Field(default=0, index=True)  # Higher is leased first
+    state: str = Field(default="queued", index=True)  # "queued", "leased", "done", "failed"
+    attempts: int = 0
+    next_eligible_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    lease_token: Optional[str] = Field(default=None, index=True)
+    leased_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+    discovered_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class PageSnapshot(SQLModel, table=True):
+    """Raw HTML fetch, stored compressed in the content-addressed page archive."""
+    __tablename__ = "page_snapshots"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url: str = Field(index=True)
+    sha256: str = Field(index=True)
+    brand_id: Optional[int] = Field(default=None, foreign_key="brand.id", index=True)
+    product_id: Optional[int] = Field(default=None, foreign_key="product.id")
+    size: int = 0  # Uncompressed bytes
+    stored_size: int = 0  # Compressed bytes on disk
+    fetched_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class ChunkSignature(SQLModel, table=True):
+    """MinHash of a stored chunk, for near-duplicate detection within its brand (services.near_duplicates)."""
+    __tablename__ = "chunk_signatures"
+
+    chunk_id: str = Field(primary_key=True)  # Vector store id
+    brand_id: int = Field(foreign_key="brand.id", index=True)
+    source_url: str = ""  # Normalized page URL of the stored copy
+    signature: bytes  # NUM_PERM little-endian uint32 minimums
+    text_hash: str = Field(default="", index=True)  # MD5 of the normalized text
+    facts_hash: str = ""  # MD5 of its numbers and model names; both empty for rows from before 0005
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ChunkReference(SQLModel, table=True):
+    """A document's chunk that was not stored because a near-duplicate `chunk_id` already was."""
+    __tablename__ = "chunk_references"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    chunk_id: str = Field(index=True)  # The canonical (stored) chunk
+    brand_id: int = Field(foreign_key="brand.id", index=True)
+    source_url: str = Field(index=True)  # Normalized page URL of the duplicate
+    doc_id: Optional[int] = Field(default=None, index=True)
+    chunk_metadata: str = "{}"  # JSON metadata the duplicate would have been stored with
+    created_at: datetime = Field(default_factory=datetime.utcnow)
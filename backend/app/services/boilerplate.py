@@ -0,0 +1,227 @@
+"""
+Learned per-domain boilerplate stripping.
+Tag-based cleanup misses chrome built from plain divs: cookie banners,
+mega-menus, newsletter sign-ups, region pickers. They repeat on every page
+of a site. For each domain we count, across the pages fetched from it, how
+many pages contain each text line, and strip lines found on most of them.
+
+Counting is incremental as crawls run and bounded in memory: lossy counting
+(Manku & Motwani) keeps every line seen on at least 1 in BUCKET_PAGES pages
+and forgets the rest. The set of lines to strip is only re-chosen when a
+domain's page count doubles, so a page's extracted text (and content hash)
+doesn't change on every crawl. Models are saved as JSON under
+data/boilerplate/ and read (never updated) by reprocessing workers.
+
+Frequent lines are stripped when long enough to be chrome on their own, or
+when they form a run of MIN_RUN_LINES, as menus do. Short labels that
+recur on every product page ("Weight") are kept, and so is the page's own
+headings' text ("Features" right below a menu), which chunking relies on.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BOILERPLATE_DIR = Path("data/boilerplate")
+# Lossy counting bucket: lines on fewer than 1 in 20 pages are forgotten
+BUCKET_PAGES = 20
+MIN_LINE_CHARS = 30
+MIN_RUN_LINES = 5
+MAX_SEEN_PAGES = 50000
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+
+
+def domain_of(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def page_headings(soup) -> List[str]:
+    """Text of a parsed page's h1-h6 elements, as they appear among its lines."""
+    return [heading.get_text(" ", strip=True) for heading in soup(HEADING_TAGS)]
+
+
+def line_key(line: str) -> str:
+    return hashlib.blake2b(" ".join(line.lower().split()).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class DomainModel:
+    """Line frequencies for one domain, and the lines currently treated as boilerplate."""
+
+    def __init__(self, domain: str, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.domain = domain
+        self.pages: int = data.get("pages", 0)
+        self.counts: Dict[str, List[int]] = data.get("counts", {})  # line key -> [count, max undercount]
+        self.boilerplate: Set[str] = set(data.get("boilerplate", []))
+        self.chosen_at: int = data.get("chosen_at", 0)  # Page count when `boilerplate` was chosen
+        # Pages already counted (URL + content), so re-crawls of unchanged pages don't skew frequencies
+        self.seen: Dict[str, None] = dict.fromkeys(data.get("seen", []))
+        self.dirty = False
+
+    def observe(self, page_key: str, keys: List[str], min_pages: int, share: float) -> bool:
+        """Count one page's lines. Returns True if the boilerplate set was re-chosen."""
+        if page_key in self.seen:
+            return False
+        self.seen[page_key] = None
+        if len(self.seen) > MAX_SEEN_PAGES:
+            del self.seen[next(iter(self.seen))]
+        self.pages += 1
+        self.dirty = True
+        bucket = (self.pages + BUCKET_PAGES - 1) // BUCKET_PAGES
+        for key in set(keys):
+            entry = self.counts.get(key)
+            if entry:
+                entry[0] += 1
+            else:
+                self.counts[key] = [1, bucket - 1]
+        if self.pages % BUCKET_PAGES == 0:
+            self.counts = {key: entry for key, entry in self.counts.items() if entry[0] + entry[1] > bucket}
+        if self.pages >= max(min_pages, 2 * self.chosen_at):
+            needed = share * self.pages
+            self.boilerplate = {key for key, (count, _) in self.counts.items() if count >= needed}
+            self.chosen_at = self.pages
+            return True
+        return False
+
+    def strip(self, lines: List[str], keys: List[str], keep: Set[str]) -> List[str]:
+        if not self.boilerplate:
+            return lines
+        kept = []
+        i = 0
+        while i < len(lines):
+            if keys[i] not in self.boilerplate:
+                kept.append(lines[i])
+                i += 1
+                continue
+            end = i
+            while end < len(lines) and keys[end] in self.boilerplate:
+                end += 1
+            short_run = end - i < MIN_RUN_LINES
+            kept.extend(line for line in lines[i:end] if line in keep or (short_run and len(line) < MIN_LINE_CHARS))
+            i = end
+        return kept
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "domain": self.domain,
+            "pages": self.pages,
+            "chosen_at": self.chosen_at,
+            "boilerplate": sorted(self.boilerplate),
+            "counts": self.counts,
+            "seen": list(self.seen),
+        }
+
+
+class BoilerplateFilter:
+    """
+    Usage:
+        lines = boilerplate.clean(url, lines, headings, learn=True)   # crawling: count the page, then strip
+        lines = boilerplate.clean(url, lines, headings)               # reprocessing: strip only
+        boilerplate.flush()                                           # save models with unsaved pages
+    """
+
+    def __init__(self, model_dir: Path = BOILERPLATE_DIR):
+        self.model_dir = Path(model_dir)
+        self.min_pages = settings.BOILERPLATE_MIN_PAGES
+        self.share = settings.BOILERPLATE_SHARE
+        self._lock = threading.Lock()
+        self._models: Dict[str, DomainModel] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.share > 0
+
+    def _path(self, domain: str) -> Path:
+        return self.model_dir / f"{re.sub(r'[^A-Za-z0-9._-]+', '_', domain)}.json"
+
+    def _model(self, domain: str) -> DomainModel:
+        """Caller holds the lock."""
+        model = self._models.get(domain)
+        if model is None:
+            data = None
+            path = self._path(domain)
+            if path.exists():
+                try:
+                    data = json.loads(path.read_text())
+                except Exception as e:
+                    logger.warning(f"Corrupt boilerplate model {path}, starting over: {e}")
+            model = self._models[domain] = DomainModel(domain, data)
+        return model
+
+    def _save(self, model: DomainModel):
+        """Atomic write; caller holds the lock."""
+        path = self._path(model.domain)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(model.to_dict()))
+            os.replace(tmp, path)
+            model.dirty = False
+        except Exception as e:
+            logger.warning(f"Could not write boilerplate model {path}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def clean(self, url: str, lines: List[str], headings: Iterable[str] = (), learn: bool = False) -> List[str]:
+        """
+        The page's lines without its domain's boilerplate; lines equal to one
+        of its `headings` are kept. With `learn`, the page is counted first.
+        """
+        domain = domain_of(url) if url else ""
+        if not self.enabled or not domain or not lines:
+            return lines
+        keys = [line_key(line) for line in lines]
+        with self._lock:
+            model = self._model(domain)
+            if learn:
+                page_key = hashlib.blake2b(f"{url}\n{''.join(keys)}".encode("utf-8"), digest_size=8).hexdigest()
+                before = len(model.boilerplate)
+                if model.observe(page_key, keys, self.min_pages, self.share):
+                    logger.info(
+                        f"Boilerplate for {domain}: {len(model.boilerplate)} lines (was {before}) "
+                        f"on at least {self.share:.0%} of {model.pages} pages"
+                    )
+                    self._save(model)
+                elif model.dirty and model.pages % BUCKET_PAGES == 0:
+                    self._save(model)
+            kept = model.strip(lines, keys, set(headings))
+            stats = self.stats.setdefault(domain, {"pages": 0, "chars_in": 0, "chars_out": 0})
+            stats["pages"] += 1
+            stats["chars_in"] += sum(len(line) for line in lines)
+            stats["chars_out"] += sum(len(line) for line in kept)
+        return kept
+
+    def flush(self):
+        """Save every model counted since its last save."""
+        with self._lock:
+            for model in self._models.values():
+                if model.dirty:
+                    self._save(model)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            domains = {}
+            for domain, stats in self.stats.items():
+                model = self._models.get(domain)
+                domains[domain] = dict(
+                    stats,
+                    learned_pages=model.pages if model else 0,
+                    boilerplate_lines=len(model.boilerplate) if model else 0,
+                    stripped=round(1 - stats["chars_out"] / stats["chars_in"], 4) if stats["chars_in"] else 0.0,
+                )
+        return {"min_pages": self.min_pages, "share": self.share, "domains": domains}
+
+
+# Global boilerplate filter instance
+boilerplate = BoilerplateFilter()
@@ -0,0 +1,419 @@
+"""
+Batched catalog writer.
+Keeps a per-brand identity map of product families, products and (normalized)
+document URLs, so get-or-create lookups are answered from memory, and buffers new rows
+so they are written in a few large transactions (`INSERT ... ON CONFLICT DO
+NOTHING`) instead of two or three commits per product URL. If a batch fails,
+its rows are retried one by one and the ones that still fail are dropped, so
+one bad row doesn't block every later flush.
+"""
+
+import logging
+import threading
+import time
+from collections import ChainMap
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update, bindparam, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..core.database import read_engine
+from ..core.db_writer import db_writer
+from ..models.sql_models import Document, Product, ProductFamily
+from .document_registry import normalize_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAMILY = "General"
+# Keep IN (...) lists under SQLite's bound-parameter limit
+IN_CHUNK = 500
+
+
+def _key(name: str) -> str:
+    return name.strip().casefold()
+
+
+def _chunks(values: List[Any], size: int = IN_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class CatalogWriter:
+    """
+    Usage:
+        for url in product_links:
+            catalog_writer.add_product(brand.id, name_for(url))
+        catalog_writer.flush()                              # one transaction
+        product_id = catalog_writer.product_id(brand.id, name)  # from memory
+    """
+
+    def __init__(self, flush_size: int = 200):
+        self.flush_size = flush_size
+        self._lock = threading.RLock()
+        self._loaded: Set[int] = set()
+        # (brand_id, family key) -> id; brand_id -> default family id
+        self._families: Dict[Tuple[int, str], int] = {}
+        self._default_family: Dict[int, int] = {}
+        # (brand_id, product key) -> id
+        self._products: Dict[Tuple[int, str], int] = {}
+        # (brand_id, url) -> (document id or None while pending, content hash)
+        self._documents: Dict[Tuple[int, str], Tuple[Optional[int], Optional[str]]] = {}
+
+        # Buffered writes
+        self._pending_products: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self._pending_images: Dict[int, str] = {}
+        self._pending_documents: Dict[Tuple[int, str], Dict[str, Any]] = {}
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "flushes": 0,
+            "families_inserted": 0,
+            "products_inserted": 0,
+            "documents_inserted": 0,
+            "documents_updated": 0,
+            "images_updated": 0,
+            "rows_dropped": 0,
+            "flush_seconds": 0.0,
+        }
+
+    def _ensure_loaded(self, brand_id: int):
+        """Load the brand's existing families, products and documents in three queries."""
+        if brand_id in self._loaded:
+            return
+        with read_engine.connect() as conn:
+            families = conn.execute(
+                select(ProductFamily.id, ProductFamily.name)
+                .where(ProductFamily.brand_id == brand_id)
+                .order_by(ProductFamily.id)
+            ).all()
+            for family_id, name in families:
+                self._families.setdefault((brand_id, _key(name)), family_id)
+            if families:
+                self._default_family[brand_id] = families[0][0]
+
+            products = conn.execute(
+                select(Product.id, Product.name)
+                .join(ProductFamily, Product.family_id == ProductFamily.id)
+                .where(ProductFamily.brand_id == brand_id)
+                .order_by(Product.id)
+            ).all()
+            for product_id, name in products:
+                self._products.setdefault((brand_id, _key(name)), product_id)
+
+            documents = conn.execute(
+                select(Document.id, Document.url, Document.content_hash)
+                .where(Document.brand_id == brand_id)
+                .order_by(Document.id)
+            ).all()
+            for document_id, url, content_hash in documents:
+                self._documents.setdefault((brand_id, normalize_url(url)), (document_id, content_hash))
+        self._loaded.add(brand_id)
+        logger.debug(f"Catalog identity map loaded for brand {brand_id}: {len(families)} families, {len(products)} products, {len(documents)} documents")
+
+    # Products
+
+    def add_product(self, brand_id: int, name: str, family_name: Optional[str] = None, image_url: Optional[str] = None):
+        """
+        Buffer a product for insertion if it is not known yet. `family_name`
+        None means the brand's first family (created as "General" if missing).
+        """
+        with self._lock:
+            self._ensure_loaded(brand_id)
+            key = (brand_id, _key(name))
+            if key in self._products or key in self._pending_products:
+                return
+            self._pending_products[key] = {"name": name.strip(), "family_name": family_name, "image_url": image_url}
+            if len(self._pending_products) >= self.flush_size:
+                self.flush()
+
+    def product_id(self, brand_id: int, name: str, family_name: Optional[str] = None, image_url: Optional[str] = None) -> int:
+        """Get-or-create a product, served from memory when known (flushes on a miss)."""
+        with self._lock:
+            self._ensure_loaded(brand_id)
+            key = (brand_id, _key(name))
+            product_id = self._products.get(key)
+            if product_id is not None:
+                self.stats["hits"] += 1
+                return product_id
+            self.stats["misses"] += 1
+            self.add_product(brand_id, name, family_name, image_url)
+            self.flush()
+            product_id = self._products.get(key)
+            if product_id is None:
+                raise RuntimeError(f"Could not create product {name!r} for brand {brand_id}")
+            return product_id
+
+    def set_product_image(self, product_id: int, image_url: str):
+        """Buffer an image for a product that has none yet."""
+        if not product_id or not image_url:
+            return
+        with self._lock:
+            self._pending_images.setdefault(product_id, image_url)
+
+    # Documents
+
+    def document(self, brand_id: int, url: str) -> Optional[Tuple[Optional[int], Optional[str]]]:
+        """(document id, content hash) for a known URL, or None. The id is None until flushed."""
+        with self._lock:
+            self._ensure_loaded(brand_id)
+            return self._documents.get((brand_id, normalize_url(url)))
+
+    def has_document(self, brand_id: int, url: str) -> bool:
+        """True if the URL has a document whose chunks were stored (it has a content hash)."""
+        known = self.document(brand_id, url)
+        return known is not None and known[1] is not None
+
+    def record_document(self, brand_id: int, url: str, document_id: int, content_hash: Optional[str] = None):
+        """Remember a Document row written outside the writer."""
+        with self._lock:
+            self._ensure_loaded(brand_id)
+            self._documents[(brand_id, normalize_url(url))] = (document_id, content_hash)
+
+    def invalidate_document(self, document_id: int):
+        """Forget a document's content hash (see document_registry.invalidate)."""
+        with self._lock:
+            for key, (known_id, _) in self._documents.items():
+                if known_id == document_id:
+                    self._documents[key] = (known_id, None)
+
+    def save_document(
+        self,
+        brand_id: int,
+        url: str,
+        title: str,
+        content_hash: Optional[str] = None,
+        product_id: Optional[int] = None,
+        last_updated: Optional[datetime] = None,
+    ):
+        """Buffer a Document insert, or an update of the existing row for this URL."""
+        url = normalize_url(url)
+        with self._lock:
+            self._ensure_loaded(brand_id)
+            key = (brand_id, url)
+            known = self._documents.get(key)
+            self._pending_documents[key] = {
+                "id": known[0] if known else None,
+                "title": title,
+                "url": url,
+                "content_hash": content_hash,
+                "brand_id": brand_id,
+                "product_id": product_id,
+                "last_updated": last_updated or datetime.utcnow(),
+            }
+            self._documents[key] = (known[0] if known else None, content_hash)
+            if len(self._pending_documents) >= self.flush_size:
+                self.flush()
+
+    # Flushing
+
+    def flush(self):
+        """Write every buffered row in one transaction on the single writer."""
+        with self._lock:
+            if not (self._pending_products or self._pending_images or self._pending_documents):
+                return
+            products, images, documents = self._pending_products, self._pending_images, self._pending_documents
+            self._pending_products, self._pending_images, self._pending_documents = {}, {}, {}
+            started = time.perf_counter()
+            try:
+                self._write(products, images, documents)
+            except Exception as e:
+                logger.error(f"Catalog flush failed, retrying its rows one by one: {e}")
+                self._write_each(products, images, documents)
+            finally:
+                self.stats["flush_seconds"] += time.perf_counter() - started
+            self.stats["flushes"] += 1
+
+    def _write(self, products, images, documents):
+        """One transaction. Ids it creates reach the identity maps only once it commits."""
+        def job(session):
+            # New ids go in the first map of each ChainMap; lookups also see the known ones
+            learned = {
+                "families": ChainMap({}, self._families),
+                "default_family": ChainMap({}, self._default_family),
+                "products": ChainMap({}, self._products),
+                "documents": {},
+            }
+            conn = session.connection()
+            self._flush_products(conn, products, learned)
+            self._flush_images(conn, images)
+            self._flush_documents(conn, documents, learned)
+            return learned
+
+        learned = db_writer.run(job)
+        self._families.update(learned["families"].maps[0])
+        self._default_family.update(learned["default_family"].maps[0])
+        self._products.update(learned["products"].maps[0])
+        self._documents.update(learned["documents"])
+
+    def _write_each(self, products, images, documents):
+        """Retry a failed batch row by row, dropping the rows that fail on their own."""
+        rows = [({key: row}, {}, {}) for key, row in products.items()]
+        rows += [({}, {product_id: url}, {}) for product_id, url in images.items()]
+        rows += [({}, {}, {key: row}) for key, row in documents.items()]
+        for row in rows:
+            try:
+                self._write(*row)
+            except Exception as e:
+                self.stats["rows_dropped"] += 1
+                logger.error(f"Catalog writer: dropping a row that can't be written ({e}): {row}")
+                for key, document in row[2].items():
+                    # Not stored: don't report the URL as known and unchanged
+                    if document["id"] is None:
+                        self._documents.pop(key, None)
+                    else:
+                        self._documents[key] = (document["id"], None)
+
+    def _flush_products(self, conn, pending, learned):
+        if not pending:
+            return
+        families, default_family, products = learned["families"], learned["default_family"], learned["products"]
+
+        # Families first: every product needs a family id
+        wanted_families: Dict[Tuple[int, str], str] = {}
+        for (brand_id, _), row in pending.items():
+            if row["family_name"]:
+                family_key = (brand_id, _key(row["family_name"]))
+                if family_key not in families:
+                    wanted_families[family_key] = row["family_name"].strip()
+            elif brand_id not in default_family:
+                wanted_families[(brand_id, _key(DEFAULT_FAMILY))] = DEFAULT_FAMILY
+
+        if wanted_families:
+            rows = [{"brand_id": brand_id, "name": name} for (brand_id, _), name in wanted_families.items()]
+            result = conn.execute(sqlite_insert(ProductFamily.__table__).on_conflict_do_nothing(index_elements=["brand_id", "name"]), rows)
+            self.stats["families_inserted"] += max(result.rowcount or 0, 0)
+            for brand_id in {brand_id for brand_id, _ in wanted_families}:
+                names = [name for (b, _), name in wanted_families.items() if b == brand_id]
+                for names_chunk in _chunks(names):
+                    for family_id, name in conn.execute(
+                        select(ProductFamily.id, ProductFamily.name)
+                        .where(ProductFamily.brand_id == brand_id, ProductFamily.name.in_(names_chunk))
+                        .order_by(ProductFamily.id)
+                    ).all():
+                        families.setdefault((brand_id, _key(name)), family_id)
+                        default_family.setdefault(brand_id, family_id)
+
+        rows = []
+        for (brand_id, _), row in pending.items():
+            if row["family_name"]:
+                family_id = families[(brand_id, _key(row["family_name"]))]
+            else:
+                family_id = default_family[brand_id]
+            rows.append({"name": row["name"], "family_id": family_id, "image_url": row["image_url"], "description": None})
+        result = conn.execute(sqlite_insert(Product.__table__).on_conflict_do_nothing(index_elements=["family_id", "name"]), rows)
+        self.stats["products_inserted"] += max(result.rowcount or 0, 0)
+
+        for brand_id in {brand_id for brand_id, _ in pending}:
+            names = [row["name"] for (b, _), row in pending.items() if b == brand_id]
+            for names_chunk in _chunks(names):
+                for product_id, name in conn.execute(
+                    select(Product.id, Product.name)
+                    .join(ProductFamily, Product.family_id == ProductFamily.id)
+                    .where(ProductFamily.brand_id == brand_id, Product.name.in_(names_chunk))
+                    .order_by(Product.id)
+                ).all():
+                    products.setdefault((brand_id, _key(name)), product_id)
+
+    def _flush_images(self, conn, pending):
+        if not pending:
+            return
+        rows = [{"product_id": product_id, "image_url": url} for product_id, url in pending.items()]
+        table = Product.__table__
+        result = conn.execute(
+            update(table)
+            .where(table.c.id == bindparam("product_id"), table.c.image_url.is_(None))
+            .values(image_url=bindparam("image_url")),
+            rows,
+        )
+        self.stats["images_updated"] += max(result.rowcount or 0, 0)
+
+    def _flush_documents(self, conn, pending, learned):
+        if not pending:
+            return
+        table = Document.__table__
+        updates = [row for row in pending.values() if row["id"] is not None]
+        inserts = [{k: v for k, v in row.items() if k != "id"} for row in pending.values() if row["id"] is None]
+
+        # A save without a product keeps the document's existing product link
+        if updates:
+            conn.execute(
+                update(table)
+                .where(table.c.id == bindparam("doc_id"))
+                .values(
+                    title=bindparam("title"),
+                    content_hash=bindparam("content_hash"),
+                    product_id=func.coalesce(bindparam("new_product_id"), table.c.product_id),
+                    last_updated=bindparam("last_updated"),
+                ),
+                [
+                    {
+                        "doc_id": row["id"],
+                        "title": row["title"],
+                        "content_hash": row["content_hash"],
+                        "new_product_id": row["product_id"],
+                        "last_updated": row["last_updated"],
+                    }
+                    for row in updates
+                ],
+            )
+            self.stats["documents_updated"] += len(updates)
+
+        if inserts:
+            # Another writer may have created the URL since the map was loaded
+            statement = sqlite_insert(table)
+            result = conn.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["url"],
+                    set_={
+                        "title": statement.excluded.title,
+                        "content_hash": statement.excluded.content_hash,
+                        "product_id": func.coalesce(statement.excluded.product_id, table.c.product_id),
+                        "last_updated": statement.excluded.last_updated,
+                    },
+                ),
+                inserts,
+            )
+            self.stats["documents_inserted"] += max(result.rowcount or 0, 0)
+            for brand_id in {row["brand_id"] for row in inserts}:
+                urls = [row["url"] for row in inserts if row["brand_id"] == brand_id]
+                for urls_chunk in _chunks(urls):
+                    for document_id, url, content_hash in conn.execute(
+                        select(table.c.id, table.c.url, table.c.content_hash)
+                        .where(table.c.brand_id == brand_id, table.c.url.in_(urls_chunk))
+                        .order_by(table.c.id)
+                    ).all():
+                        learned["documents"][(brand_id, url)] = (document_id, content_hash)
+
+    def reset(self, brand_id: Optional[int] = None):
+        """Flush, then forget cached identities (all brands, or one) so they are reloaded."""
+        with self._lock:
+            self.flush()
+            if brand_id is None:
+                self._loaded.clear()
+                self._families.clear()
+                self._default_family.clear()
+                self._products.clear()
+                self._documents.clear()
+                return
+            self._loaded.discard(brand_id)
+            self._default_family.pop(brand_id, None)
+            for cache in (self._families, self._products, self._documents):
+                for key in [key for key in cache if key[0] == brand_id]:
+                    del cache[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["flush_seconds"] = round(stats["flush_seconds"], 3)
+            stats["avg_flush_ms"] = round(1000 * self.stats["flush_seconds"] / self.stats["flushes"], 2) if self.stats["flushes"] else 0.0
+            stats["pending"] = len(self._pending_products) + len(self._pending_images) + len(self._pending_documents)
+            stats["brands_loaded"] = len(self._loaded)
+            stats["products_cached"] = len(self._products)
+            stats["documents_cached"] = len(self._documents)
+            return stats
+
+
+# Global writer instance
+catalog_writer = CatalogWriter()
@@ -0,0 +1,283 @@
+"""
+Chunking strategies for ingestion (settings.CHUNKING_MODE).
+
+- "flat": 1,500-character chunks with 200 overlap; every chunk is embedded
+  and sent to the LLM as-is.
+- "hierarchical" (small-to-big): the text is cut into ~1,500-character parent
+  sections, and each parent into ~300-character child chunks with no overlap.
+  Only children are embedded and stored. Each carries `parent_id` and
+  `child_index`, so at query time a parent (or just the window around the
+  matched children) is reassembled from its siblings instead of being stored
+  a second time; see rag_service.expand_context.
+- "structured": follows the document's own structure. Markdown headings
+  (`### FEATURES` from page_extractor), numbered and all-caps manual headings
+  and PDF outline titles open sections. Sections are kept whole up to an
+  estimated token budget (settings.CHUNK_TOKEN_BUDGET, CHARS_PER_TOKEN
+  characters per token); longer ones are cut at paragraph, else line or
+  sentence, breaks, and before rather than inside a spec table while the
+  piece stays at least half full.
+  Subsections merge into their parent's chunk when they fit, each chunk
+  starts with its heading path and carries it in `section`. No overlap.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from ..core.config import settings
+
+FLAT = "flat"
+HIERARCHICAL = "hierarchical"
+STRUCTURED = "structured"
+
+FLAT_CHUNK_SIZE = 1500
+FLAT_CHUNK_OVERLAP = 200
+PARENT_CHUNK_SIZE = 1500
+CHILD_CHUNK_SIZE = 300
+
+_flat_splitter = RecursiveCharacterTextSplitter(chunk_size=FLAT_CHUNK_SIZE, chunk_overlap=FLAT_CHUNK_OVERLAP, length_function=len)
+_parent_splitter = RecursiveCharacterTextSplitter(chunk_size=PARENT_CHUNK_SIZE, chunk_overlap=0, length_function=len)
+# No overlap, so a parent is its children joined in order
+_child_splitter = RecursiveCharacterTextSplitter(chunk_size=CHILD_CHUNK_SIZE, chunk_overlap=0, length_function=len)
+
+
+# Token budgets are estimates: Gemini's tokenizer doesn't run offline
+# (google-genai's local tokenizer needs sentencepiece and downloads its model),
+# and it averages about 4 characters per token on English. Counting even words
+# costs as much as the whole recursive split; the estimate is free.
+CHARS_PER_TOKEN = 4
+# Headings are found with one whole-text re.finditer instead of a Python loop
+# per line. Patterns start with a literal "\n" (the text is prefixed with
+# one) rather than a multiline "^", which lets re skip ahead to candidate lines.
+_HEADING = (
+    r"(?P<heading>"
+    r"(?P<hashes>#{1,6})[ \t]+(?P<markdown>[^\n]*[^ \t#\n])[ \t#]*"  # ### FEATURES
+    r"|(?P<number>\d{1,2}(?:\.\d{1,2}){0,3})\.?[ \t]+[A-Z][^.:;!?\n]{1,70}"  # 2.1 Connecting
+    r"|(?=(?:[^a-z\n]*[A-Z]){4})[^a-z\n]{3,59}[^a-z\n.:,;]"  # FRONT PANEL
+    r")"
+)
+# The first-character lookahead rejects most lines (prose, "Key: value" rows)
+# before the heading alternatives are tried
+HEADING_RE = re.compile(rf"\n(?=[#\d \t]|[A-Z][^a-z\n])[ \t]*{_HEADING}[ \t]*(?=\n|\Z)")
+# Spec-table "Key: value" rows; tab or pipe separated rows are found with str methods
+KEY_VALUE_RE = re.compile(r"[^:.!?\n]{1,40}:\s*\S")
+# Where an oversized section may be cut, best first
+CUT_POINTS = ("\n\n", "\n", ". ", " ")
+# All-caps headings nest under markdown / numbered / outline headings
+CAPS_HEADING_LEVEL = 7
+
+
+def count_tokens(text: str) -> int:
+    """Estimated LLM tokens in `text`."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class Chunk:
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)  # Per-chunk keys, merged over the document's
+
+
+def parent_id_for(base_id: str, index: int, text: str) -> str:
+    payload = f"{base_id}#parent|{index}|{text[:100]}".encode("utf-8")
+    return hashlib.md5(payload).hexdigest()
+
+
+def split_flat(text: str) -> List[Chunk]:
+    return [Chunk(chunk) for chunk in _flat_splitter.split_text(text)]
+
+
+def split_hierarchical(text: str, base_id: str, first_parent: int = 0) -> List[Chunk]:
+    """`first_parent` numbers the parents of a document split in several parts (pages)."""
+    chunks = []
+    for parent_index, parent in enumerate(_parent_splitter.split_text(text), first_parent):
+        parent_id = parent_id_for(base_id, parent_index, parent)
+        for child_index, child in enumerate(_child_splitter.split_text(parent)):
+            chunks.append(Chunk(child, {"parent_id": parent_id, "child_index": child_index}))
+    return chunks
+
+
+Heading = Tuple[int, str, str]  # (level, title, "Outer > ... > title")
+
+
+def _normalize_title(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+def is_table_row(line: str) -> bool:
+    """Tab or pipe separated, or a short "Key: value" line."""
+    return "\t" in line or line.count("|") >= 2 or KEY_VALUE_RE.match(line) is not None
+
+
+class StructuredSplitter:
+    """
+    Usage:
+        chunks = StructuredSplitter().split(text)
+        splitter = StructuredSplitter(outline=[(1, "Setup", 4), ...])  # PDF outline
+        for page_text in pages:
+            chunks += splitter.split(page_text)   # heading path carries across calls
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, outline: Optional[Iterable[Tuple[int, str, Any]]] = None):
+        self.token_budget = token_budget or settings.CHUNK_TOKEN_BUDGET
+        self.outline = {_normalize_title(title): int(level) for level, title, *_ in (outline or []) if title.strip()}
+        self.heading_re = HEADING_RE
+        if self.outline:
+            # Bookmarked titles come first so their level wins over the heuristics
+            titles = sorted(self.outline, key=len, reverse=True)
+            pattern = "|".join(r"[ \t]+".join(map(re.escape, title.split())) for title in titles)
+            self.heading_re = re.compile(rf"\n[ \t]*(?:(?P<outline>(?i:{pattern}))|{_HEADING})[ \t]*(?=\n|\Z)")
+        self.path: List[Heading] = []  # Open headings, outermost first
+
+    def _table_start(self, body: str, cut: int, floor: int) -> Optional[int]:
+        """
+        Start of the spec table a cut at `cut` would split, if that table
+        begins after `floor`. Only the rows between `floor` and the cut are checked.
+        """
+        line_start = max(body.rfind("\n", floor, cut) + 1, floor)
+        line_end = body.find("\n", cut + 1)
+        line_end = len(body) if line_end < 0 else line_end
+        if body[cut] == "\n":
+            inside = is_table_row(body[line_start:cut]) and is_table_row(body[cut + 1:line_end])
+        else:
+            inside = is_table_row(body[line_start:line_end])
+        if not inside:
+            return None
+        table_start = line_start
+        while table_start > floor:
+            previous = max(body.rfind("\n", floor, table_start - 1) + 1, floor)
+            if not is_table_row(body[previous:table_start - 1]):
+                break
+            table_start = previous
+        return table_start if table_start > floor else None
+
+    def _cut(self, body: str, limit: int) -> List[str]:
+        """
+        Pieces of at most `limit` characters, cut at the last paragraph break
+        (else line, sentence, space) that fits. A cut that would split a spec
+        table moves before it when the piece keeps at least half the limit.
+        """
+        pieces = []
+        start = 0
+        while len(body) - start > limit:
+            end = start + limit
+            for separator in CUT_POINTS:
+                cut = body.rfind(separator, start + 1, end)
+                if cut > start:
+                    if separator != "\n\n":
+                        # Tables have no blank lines, so only finer cuts can land inside one
+                        table_start = self._table_start(body, cut, start + limit // 2)
+                        cut = table_start or (cut + 1 if separator == ". " else cut)
+                    break
+            else:
+                cut = end
+            piece = body[start:cut].strip()
+            if piece:
+                pieces.append(piece)
+            start = cut
+        piece = body[start:].strip()
+        if piece:
+            pieces.append(piece)
+        return pieces
+
+    def _heading(self, match: re.Match) -> Tuple[int, str]:
+        """(level, title) of a heading_re match."""
+        # Only the pattern built from an outline has the group
+        outline = self.outline and match["outline"]
+        if outline:
+            return self.outline[_normalize_title(outline)], " ".join(outline.split())
+        if match["hashes"]:
+            return len(match["hashes"]), match["markdown"].strip()
+        if match["number"]:
+            return match["number"].count(".") + 1, match["heading"].strip()
+        return CAPS_HEADING_LEVEL, match["heading"].strip()
+
+    def _sections(self, text: str) -> Iterator[Tuple[Optional[Tuple[int, str]], str]]:
+        """(level, title) of each heading, None before the first one, with the text under it."""
+        text = "\n" + text  # heading_re matches from the line break before a heading
+        heading = None
+        start = 0
+        for match in self.heading_re.finditer(text):
+            yield heading, text[start:match.start()]
+            heading = self._heading(match)
+            start = match.end()
+        yield heading, text[start:]
+
+    def split(self, text: str) -> List[Chunk]:
+        # Sizes are in characters, CHARS_PER_TOKEN per token of the budget, and
+        # include the "\n\n" between a chunk's parts
+        budget = self.token_budget * CHARS_PER_TOKEN
+        half = budget // 2
+        path = self.path
+        groups: List[list] = []  # [parts, section] per chunk
+        parts: List[str] = []
+        size = 0
+        # Headings of path[:shared] are common to every piece of the current chunk
+        # (its section), path[:kept] unchanged since the last piece was added
+        shared = kept = 0
+        for heading, body in self._sections(text):
+            if heading:
+                level, title = heading
+                # Levels strictly increase along a path
+                while path and path[-1][0] >= level:
+                    path.pop()
+                depth = len(path)
+                if depth < kept:
+                    kept = depth
+                path.append((level, title, f"{path[-1][2]} > {title}" if path else title))
+            body = body.strip()
+            if not body:
+                continue
+            depth = len(path)
+            breadcrumb = path[-1][2] if path else ""
+            # A new chunk starts with the breadcrumb and a separator
+            opening = len(breadcrumb) + 2 if breadcrumb else 0
+            # Sections that fit are kept whole
+            if len(body) <= half:
+                pieces = (body,)
+            else:
+                room = max(budget - opening, half)
+                pieces = (body,) if len(body) <= room else self._cut(body, room)
+            for piece in pieces:
+                length = len(piece) + 2  # With the separator before it
+                if kept == shared == depth and groups and size + length <= budget:
+                    parts.append(piece)
+                    size += length
+                    continue
+                common = shared if shared < kept else kept
+                if common and groups:
+                    new_titles = [title for _, title, _ in path[kept:]]
+                    heading_size = len("\n\n".join(new_titles)) + 2
+                if common and groups and size + heading_size + length <= budget:
+                    # A subsection (or the parent again) that still fits the current chunk
+                    parts += new_titles
+                    parts.append(piece)
+                    size += heading_size + length
+                    shared = common
+                    groups[-1][1] = path[common - 1][2]
+                else:
+                    parts = [breadcrumb, piece] if breadcrumb else [piece]
+                    size = opening + length - 2
+                    shared = depth
+                    groups.append([parts, breadcrumb])
+                kept = depth
+        return [Chunk("\n\n".join(parts), {"section": section} if section else {}) for parts, section in groups]
+
+
+def split_structured(text: str, outline=None) -> List[Chunk]:
+    return StructuredSplitter(outline=outline).split(text)
+
+
+def split_text(text: str, base_id: str, mode: Optional[str] = None) -> List[Chunk]:
+    """Chunks for one document in the given mode (default: settings.CHUNKING_MODE)."""
+    mode = mode or settings.CHUNKING_MODE
+    if mode == HIERARCHICAL:
+        return split_hierarchical(text, base_id)
+    if mode == STRUCTURED:
+        return split_structured(text)
+    if mode != FLAT:
+        raise ValueError(f"Unknown chunking mode: {mode}")
+    return split_flat(text)
@@ -0,0 +1,262 @@
+"""
+Persistent, resumable crawl frontier backed by the `crawl_frontier` table.
+Workers lease batches of URLs, then mark them done or failed. Failed URLs are
+retried with exponential backoff; expired leases (crashed or killed workers)
+are reclaimed automatically, so a restarted run resumes where it stopped.
+Updates only apply while the caller's lease is still the current one, so a
+worker whose lease expired can't overwrite a URL another worker re-leased.
+Every method waits on the database; async code calls them through
+asyncio.to_thread.
+"""
+
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, func
+
+from ..core.database import read_engine
+from ..core.db_writer import db_writer
+from ..models.sql_models import FrontierURL
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+INSERT_BATCH_SIZE = 500
+
+
+class CrawlFrontier:
+    """Lease-based work queue over the crawl_frontier table."""
+
+    def __init__(
+        self,
+        lease_seconds: int = 900,
+        max_attempts: int = 5,
+        backoff_base_seconds: int = 60,
+        backoff_max_seconds: int = 6 * 3600,
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        # Leases held by this process: token -> brand_id, and url -> token of its current lease
+        self.lease_tokens: Dict[str, int] = {}
+        self._url_tokens: Dict[str, str] = {}
+        # Guards both maps: callers run in several threads at once
+        self._lock = threading.Lock()
+
+    def enqueue(self, brand_id: int, urls: Iterable[str], priority: int = 0, requeue_done: bool = False) -> int:
+        """
+        Add URLs to the frontier. Existing URLs keep their state unless
+        `requeue_done` is set, in which case finished URLs are queued again.
+
+        Returns:
+            Number of rows inserted or requeued
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                "url": url,
+                "brand_id": brand_id,
+                "priority": priority,
+                "state": QUEUED,
+                "attempts": 0,
+                "next_eligible_at": now,
+                "discovered_at": now,
+                "updated_at": now,
+            }
+            for url in dict.fromkeys(urls)
+        ]
+        if not rows:
+            return 0
+
+        def job(session):
+            affected = 0
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                stmt = sqlite_insert(FrontierURL).values(rows[start:start + INSERT_BATCH_SIZE])
+                if requeue_done:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["url"],
+                        set_={"state": QUEUED, "attempts": 0, "next_eligible_at": now, "updated_at": now},
+                        where=FrontierURL.state == DONE,
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=["url"])
+                affected += session.execute(stmt).rowcount or 0
+            return affected
+
+        affected = db_writer.run(job)
+
+        logger.info(f"Frontier: enqueued {affected}/{len(rows)} URLs for brand {brand_id}")
+        return affected
+
+    def lease(self, brand_id: int, limit: int = 10) -> List[str]:
+        """Atomically lease up to `limit` eligible URLs, highest priority first."""
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+
+        def job(session):
+            # Reclaim leases whose holder died without releasing them
+            session.execute(
+                update(FrontierURL)
+                .where(FrontierURL.state == LEASED, FrontierURL.leased_until < now)
+                .values(state=QUEUED, lease_token=None, leased_until=None, updated_at=now)
+            )
+
+            eligible = (
+                select(FrontierURL.id)
+                .where(
+                    FrontierURL.brand_id == brand_id,
+                    FrontierURL.next_eligible_at <= now,
+                    or_(
+                        FrontierURL.state == QUEUED,
+                        and_(FrontierURL.state == FAILED, FrontierURL.attempts < self.max_attempts),
+                    ),
+                )
+                .order_by(FrontierURL.priority.desc(), FrontierURL.id)
+                .limit(limit)
+            )
+            # Single UPDATE ... WHERE id IN (SELECT ...) so concurrent workers never share a URL
+            session.execute(
+                update(FrontierURL)
+                .where(FrontierURL.id.in_(eligible), FrontierURL.state.in_([QUEUED, FAILED]))
+                .values(
+                    state=LEASED,
+                    lease_token=token,
+                    leased_until=now + timedelta(seconds=self.lease_seconds),
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            return session.exec(
+                select(FrontierURL.url)
+                .where(FrontierURL.lease_token == token, FrontierURL.state == LEASED)
+                .order_by(FrontierURL.priority.desc(), FrontierURL.id)
+            ).all()
+
+        urls = db_writer.run(job)
+
+        if urls:
+            with self._lock:
+                self.lease_tokens[token] = brand_id
+                for url in urls:
+                    self._url_tokens[url] = token
+        return list(urls)
+
+    def _token(self, url: str) -> Optional[str]:
+        """Token of this process's lease on `url`, forgotten once used."""
+        with self._lock:
+            token = self._url_tokens.pop(url, None)
+        if token is None:
+            logger.warning(f"Frontier: {url} is not leased by this process, ignoring update")
+        return token
+
+    def complete(self, url: str):
+        """Mark a URL leased by this process as done."""
+        token = self._token(url)
+        if token is None:
+            return
+        now = datetime.utcnow()
+        updated = db_writer.run(lambda session: session.execute(
+            update(FrontierURL)
+            .where(FrontierURL.url == url, FrontierURL.lease_token == token, FrontierURL.state == LEASED)
+            .values(state=DONE, lease_token=None, leased_until=None, last_error=None, updated_at=now)
+        ).rowcount)
+        if not updated:
+            logger.warning(f"Frontier: lease on {url} expired before it was completed")
+
+    def fail(self, url: str, error: Optional[str] = None):
+        """Mark a URL leased by this process as failed and push its next attempt out exponentially."""
+        token = self._token(url)
+        if token is None:
+            return
+        now = datetime.utcnow()
+
+        def job(session):
+            entry = session.exec(
+                select(FrontierURL)
+                .where(FrontierURL.url == url, FrontierURL.lease_token == token, FrontierURL.state == LEASED)
+            ).first()
+            if not entry:
+                logger.warning(f"Frontier: lease on {url} expired before it failed")
+                return None
+            entry.attempts += 1
+            delay = min(self.backoff_base_seconds * (2 ** (entry.attempts - 1)), self.backoff_max_seconds)
+            entry.state = FAILED
+            entry.next_eligible_at = now + timedelta(seconds=delay)
+            entry.lease_token = None
+            entry.leased_until = None
+            entry.last_error = (error or "")[:1000]
+            entry.updated_at = now
+            session.add(entry)
+            return entry.attempts, delay
+
+        result = db_writer.run(job)
+        if result is None:
+            return
+        attempts, delay = result
+        if attempts >= self.max_attempts:
+            logger.warning(f"Frontier: giving up on {url} after {attempts} attempts")
+        else:
+            logger.info(f"Frontier: {url} failed (attempt {attempts}), retry in {delay}s")
+
+    def release(self, brand_id: Optional[int] = None):
+        """
+        Return URLs still leased by this process for `brand_id` to the queue
+        (end of that brand's run). Without a brand, every lease this process
+        holds is released (graceful shutdown).
+        """
+        with self._lock:
+            tokens = [token for token, leased_for in self.lease_tokens.items() if brand_id is None or leased_for == brand_id]
+        if not tokens:
+            return
+        now = datetime.utcnow()
+        released = db_writer.run(lambda session: session.execute(
+            update(FrontierURL)
+            .where(FrontierURL.lease_token.in_(tokens), FrontierURL.state == LEASED)
+            .values(state=QUEUED, lease_token=None, leased_until=None, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount)
+        logger.info(f"Frontier: released {released or 0} leased URLs")
+        released_tokens = set(tokens)
+        with self._lock:
+            for token in tokens:
+                self.lease_tokens.pop(token, None)
+            self._url_tokens = {url: token for url, token in self._url_tokens.items() if token not in released_tokens}
+
+    def has_pending(self, brand_id: int) -> bool:
+        """True if the brand still has queued, leased or retryable URLs."""
+        with Session(read_engine) as session:
+            count = session.exec(
+                select(func.count(FrontierURL.id)).where(
+                    FrontierURL.brand_id == brand_id,
+                    or_(
+                        FrontierURL.state.in_([QUEUED, LEASED]),
+                        and_(FrontierURL.state == FAILED, FrontierURL.attempts < self.max_attempts),
+                    ),
+                )
+            ).one()
+        return count > 0
+
+    def stats(self, brand_id: Optional[int] = None) -> Dict[str, int]:
+        """Count frontier rows per state."""
+        with Session(read_engine) as session:
+            query = select(FrontierURL.state, func.count(FrontierURL.id)).group_by(FrontierURL.state)
+            if brand_id is not None:
+                query = query.where(FrontierURL.brand_id == brand_id)
+            rows = session.exec(query).all()
+        stats = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        stats.update({state: count for state, count in rows})
+        return stats
+
+
+# Global frontier instance
+frontier = CrawlFrontier()
@@ -0,0 +1,104 @@
+"""
+Document-level media side table.
+Images and PDF links found on a page are written once per document to the
+`Media` table (keyed by `document_id`) instead of being JSON-encoded into
+every chunk's metadata; chunks only carry a `doc_id` reference. `ask_question`
+resolves the media for all of a response's sources with one query.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.db_writer import db_writer
+from ..models.sql_models import Media
+
+logger = logging.getLogger(__name__)
+
+IMAGE_TYPE = "screenshot"
+PDF_TYPES = ("manual", "spec_sheet")
+PAGE_MEDIA_TYPES = (IMAGE_TYPE,) + PDF_TYPES
+MAX_PER_DOCUMENT = 10
+
+# Chunk metadata keys that older ingests used for media
+LEGACY_MEDIA_KEYS = ("images", "pdfs", "image_url")
+
+
+def _pdf_type(pdf: Dict[str, Any]) -> str:
+    return "manual" if "manual" in f"{pdf.get('title', '')} {pdf['url']}".lower() else "spec_sheet"
+
+
+class DocumentMedia:
+    """
+    Usage:
+        document_media.replace(doc_id, brand_id, product_id, images, pdfs)   # once per document
+        media = await document_media.for_documents(session, doc_ids)     # {doc_id: {"images", "pdfs"}}
+    """
+
+    def replace(
+        self,
+        document_id: int,
+        brand_id: int,
+        product_id: Optional[int],
+        images: Optional[List[Dict[str, Any]]] = None,
+        pdfs: Optional[List[Dict[str, Any]]] = None,
+    ) -> int:
+        """
+        Replace a document's page media (`{url, alt}` images, `{url, title}`
+        PDFs, in page order). Returns the number of rows written.
+        """
+        rows = []
+        seen = set()
+        for image in (images or [])[:MAX_PER_DOCUMENT]:
+            if image.get("url") and image["url"] not in seen:
+                seen.add(image["url"])
+                rows.append({"url": image["url"], "media_type": IMAGE_TYPE, "alt_text": image.get("alt") or ""})
+        for pdf in (pdfs or [])[:MAX_PER_DOCUMENT]:
+            if pdf.get("url") and pdf["url"] not in seen:
+                seen.add(pdf["url"])
+                rows.append({"url": pdf["url"], "media_type": _pdf_type(pdf), "alt_text": pdf.get("title") or ""})
+        now = datetime.utcnow()
+        for row in rows:
+            row.update(
+                brand_id=brand_id,
+                product_id=product_id or None,
+                document_id=document_id,
+                relevance_score=0.9,
+                last_verified=now,
+                is_official=True,
+            )
+
+        def job(session):
+            session.execute(delete(Media.__table__).where(Media.document_id == document_id, Media.media_type.in_(PAGE_MEDIA_TYPES)))
+            if rows:
+                # Ids follow list order, which keeps page order for readers
+                session.execute(insert(Media.__table__), rows)
+            return len(rows)
+
+        return db_writer.run(job)
+
+    async def for_documents(self, session: AsyncSession, document_ids: Iterable[int]) -> Dict[int, Dict[str, List[Dict[str, Any]]]]:
+        """Page media for a response's documents, in one query."""
+        document_ids = sorted({int(d) for d in document_ids if d})
+        media: Dict[int, Dict[str, List[Dict[str, Any]]]] = {d: {"images": [], "pdfs": []} for d in document_ids}
+        if not document_ids:
+            return media
+        statement = (
+            select(Media.document_id, Media.url, Media.media_type, Media.alt_text)
+            .where(Media.document_id.in_(document_ids), Media.media_type.in_(PAGE_MEDIA_TYPES))
+            .order_by(Media.document_id, Media.id)
+        )
+        for document_id, url, media_type, alt_text in (await session.exec(statement)).all():
+            if media_type == IMAGE_TYPE:
+                media[document_id]["images"].append({"url": url, "alt": alt_text or ""})
+            else:
+                media[document_id]["pdfs"].append({"url": url, "title": alt_text or ""})
+        return media
+
+
+# Global document media instance
+document_media = DocumentMedia()
@@ -0,0 +1,148 @@
+"""
+Unique-URL document registry.
+`Document.url` is unique (migration 0001); every writer goes through
+`upsert`, which normalizes the URL and relies on `INSERT ... ON CONFLICT(url)
+DO UPDATE`, so re-scraping a page updates its row instead of adding another.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import func as sa_func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..core.database import read_engine
+from ..core.db_writer import db_writer
+from ..models.sql_models import Document
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+TRACKING_PARAMS = {"gclid", "fbclid", "mc_cid", "mc_eid", "_ga", "ref"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used as the document key: lowercase scheme and host, no
+    default port, fragment or tracking parameters, sorted query, and no
+    trailing slash (except for the root path).
+    """
+    url = (url or "").strip()
+    if not url:
+        return url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+@dataclass
+class UpsertResult:
+    id: int
+    status: str  # CREATED, UPDATED or UNCHANGED
+
+    @property
+    def changed(self) -> bool:
+        return self.status != UNCHANGED
+
+
+class DocumentRegistry:
+    """
+    Usage:
+        result = document_registry.upsert(url, title, brand_id, content_hash=h)
+        if result.changed:
+            ...re-chunk...   # document_registry.invalidate(result.id) if that fails
+    """
+
+    def get(self, url: str, session: Optional[Session] = None) -> Optional[Document]:
+        """Document for a URL (index seek on the normalized URL)."""
+        if session is None:
+            with Session(read_engine) as session:
+                return self.get(url, session)
+        return session.exec(select(Document).where(Document.url == normalize_url(url))).first()
+
+    def upsert(
+        self,
+        url: str,
+        title: str,
+        brand_id: int,
+        product_id: Optional[int] = None,
+        content_hash: Optional[str] = None,
+        last_updated: Optional[datetime] = None,
+        force: bool = False,
+    ) -> UpsertResult:
+        """
+        Insert or update the Document for `url`. A row whose content hash is
+        unchanged only gets its `last_updated` refreshed (unless `force`).
+        A None `product_id` keeps the existing product link.
+        """
+        url = normalize_url(url)
+        last_updated = last_updated or datetime.utcnow()
+        table = Document.__table__
+
+        def job(session):
+            existing = session.exec(select(Document.id, Document.content_hash).where(Document.url == url)).first()
+            unchanged = (
+                existing is not None
+                and content_hash is not None
+                and existing[1] == content_hash
+                and not force
+            )
+
+            values = {
+                "url": url,
+                "title": title,
+                "brand_id": brand_id,
+                "product_id": product_id,
+                "content_hash": content_hash,
+                "last_updated": last_updated,
+            }
+            statement = sqlite_insert(table).values(**values)
+            if unchanged:
+                set_ = {"last_updated": statement.excluded.last_updated}
+            else:
+                set_ = {
+                    "title": statement.excluded.title,
+                    "content_hash": statement.excluded.content_hash,
+                    "last_updated": statement.excluded.last_updated,
+                    "product_id": sa_func.coalesce(statement.excluded.product_id, table.c.product_id),
+                }
+            session.exec(statement.on_conflict_do_update(index_elements=["url"], set_=set_))
+
+            if existing is not None:
+                return UpsertResult(existing[0], UNCHANGED if unchanged else UPDATED)
+            document_id = session.exec(select(Document.id).where(Document.url == url)).one()
+            return UpsertResult(document_id, CREATED)
+
+        # Through the single writer, batched with other queued writes
+        return db_writer.run(job)
+
+    def invalidate(self, document_id: int):
+        """
+        Forget a document's content hash, so the next crawl re-chunks it even
+        if the page is unchanged (its chunks failed to store).
+        """
+        db_writer.run(lambda session: session.execute(
+            update(Document.__table__).where(Document.id == document_id).values(content_hash=None)
+        ))
+
+
+# Global registry instance
+document_registry = DocumentRegistry()
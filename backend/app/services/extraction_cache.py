@@ -0,0 +1,96 @@
+"""
+Persistent extraction cache.
+Stores cleaned text and page boundaries, gzip-compressed, keyed by
+(content SHA-256, extractor version). When neither the source bytes nor the
+extractor changed, ingestion reads from here instead of re-parsing PDFs/HTML.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_DIR = Path("data/extraction_cache")
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """File-backed cache: <dir>/<extractor>/<sha[:2]>/<sha>.json.gz"""
+
+    def __init__(self, cache_dir: Path = EXTRACTION_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    def _path(self, sha256: str, extractor: str) -> Path:
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", extractor)
+        return self.cache_dir / slug / sha256[:2] / f"{sha256}.json.gz"
+
+    def get(self, sha256: str, extractor: str) -> Optional[Dict[str, Any]]:
+        """Return {"pages": [[page_no, text], ...], "meta": {...}} or None."""
+        path = self._path(sha256, extractor)
+        if not path.exists():
+            self.stats["misses"] += 1
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except Exception as e:
+            logger.warning(f"Corrupt extraction cache entry {path}, ignoring: {e}")
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry
+
+    def get_pages(self, sha256: str, extractor: str) -> Optional[List[Tuple[int, str]]]:
+        entry = self.get(sha256, extractor)
+        if entry is None:
+            return None
+        return [(page_no, text) for page_no, text in entry["pages"]]
+
+    def put(self, sha256: str, extractor: str, pages: List[Tuple[int, str]], meta: Optional[Dict[str, Any]] = None):
+        """Store extracted pages atomically (a crash never leaves a half-written entry)."""
+        path = self._path(sha256, extractor)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "sha256": sha256,
+            "extractor": extractor,
+            "created_at": time.time(),
+            "meta": meta or {},
+            "pages": [[page_no, text] for page_no, text in pages],
+        }
+        # Unique per write: extraction threads of one process may store the same entry at once
+        tmp = path.with_name(path.name + f".{uuid.uuid4().hex}.tmp")
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self.stats["writes"] += 1
+        except Exception as e:
+            logger.warning(f"Could not write extraction cache entry {path}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+
+# Global cache instance
+extraction_cache = ExtractionCache()
@@ -0,0 +1,320 @@
+"""
+Online vector index rebuild.
+Builds a fresh, versioned Chroma collection for a brand
+(`brand_<id>__<version>`) while queries keep being served from the current
+one, then atomically points the `brand_<id>` alias at it and drops the old
+collection after a grace period. Use it to recover a corrupted collection
+or to re-index after an embedding-model or chunking change, without wiping
+./chroma_db.
+
+Text comes from the SQL catalog: each Document's newest archived page is
+re-extracted and re-chunked; documents with no archived page (PDFs, manual
+ingests) are re-embedded from the chunk text already stored in the current
+collection. Embedding runs on a thread pool. Chunks that ingestion stores
+in the current collection while a rebuild runs are copied over once the
+alias points at the new one.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from sqlmodel import Session, select
+
+from ..core.database import read_engine
+from ..core.vector_db import (
+    VERSION_SEPARATOR,
+    brand_collection_name,
+    client,
+    embedding_function,
+    list_collection_names,
+    resolve_collection_name,
+    set_alias,
+)
+from ..engines.ingestion_engine import extract_archived_page
+from ..models.sql_models import Brand, Document
+from .compact_index import compact_index
+from .document_registry import normalize_url
+from .page_archive import page_archive
+from .near_duplicates import near_duplicates
+from .rag_service import build_chunks
+from .vector_router import chunk_source_url
+
+logger = logging.getLogger(__name__)
+
+DROP_GRACE_SECONDS = 30  # Let in-flight queries on the old collection finish
+
+
+class IndexRebuilder:
+    """
+    Usage:
+        index_rebuilder.start([3])               # background thread (API)
+        index_rebuilder.get_status()
+        index_rebuilder.rebuild_all([3])         # blocking (scripts)
+    """
+
+    def __init__(self, workers: int = 4, batch_size: int = 64):
+        self.workers = workers
+        self.batch_size = batch_size
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.status: Dict[str, Any] = {"state": "idle"}
+
+    def start(self, brand_ids: Optional[List[int]] = None) -> bool:
+        """Rebuild in a background thread. False if a rebuild is already running."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self.rebuild_all, args=(brand_ids,), name="index-rebuild", daemon=True)
+            self._thread.start()
+            return True
+
+    def rebuild_all(self, brand_ids: Optional[List[int]] = None, drop_grace: float = DROP_GRACE_SECONDS) -> Dict[int, int]:
+        """Rebuild and swap each brand's collection (default: every brand in the catalog)."""
+        if not brand_ids:
+            with Session(read_engine) as session:
+                brand_ids = list(session.exec(select(Brand.id)).all())
+        self.status = {
+            "state": "running",
+            "started_at": datetime.utcnow().isoformat(),
+            "current_brand": None,
+            "documents": 0,
+            "chunks": 0,
+            "brands": {},
+        }
+        rebuilt, retired = {}, []
+        for brand_id in brand_ids:
+            self.status["current_brand"] = brand_id
+            try:
+                count, old = self.rebuild(brand_id)
+                rebuilt[brand_id] = count
+                retired.append(old)
+                self.status["brands"][brand_id] = {"status": "swapped", "chunks": count}
+            except Exception as e:
+                logger.error(f"Index rebuild for brand {brand_id} failed, still serving the current collection: {e}")
+                self.status["brands"][brand_id] = {"status": "failed", "error": str(e)}
+
+        # Old collections are dropped once queries that started before the swap are done
+        retired = [name for name in retired if name]
+        if retired:
+            time.sleep(drop_grace)
+            existing = set(list_collection_names())
+            for name in retired:
+                if name in existing:
+                    client.delete_collection(name)
+                    logger.info(f"Dropped retired collection {name}")
+
+        self.status.update({"state": "done", "current_brand": None, "finished_at": datetime.utcnow().isoformat()})
+        return rebuilt
+
+    def rebuild(self, brand_id: int):
+        """
+        Build a new collection for one brand and swap the alias to it.
+        Returns (chunk count, name of the retired collection or None).
+        """
+        logical = brand_collection_name(brand_id)
+        current = resolve_collection_name(logical)
+        version = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        target = client.get_or_create_collection(name=f"{logical}{VERSION_SEPARATOR}{version}", embedding_function=embedding_function)
+        logger.info(f"Rebuilding {logical} into {target.name} (serving {current})")
+        # Near-duplicates are re-detected from scratch against the new collection
+        staged = near_duplicates.staging(brand_id)
+
+        # Chunks already stored when the rebuild started, plus every chunk it planned
+        start_ids = self._chunk_ids(current)
+        seen_ids = set(start_ids or ())
+        swapped = False
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="index-embed") as pool:
+                pending: Set[Future] = set()
+
+                def submit(chunks: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
+                    seen_ids.update(ids)
+                    plan = staged.plan(chunks, metadatas, ids, verify=False)
+                    staged.commit(plan)
+                    chunks, metadatas, ids = plan.chunks, plan.metadatas, plan.ids
+                    for start in range(0, len(chunks), self.batch_size):
+                        # Bounded: keep at most a few batches per worker in memory
+                        while len(pending) >= self.workers * 4:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                pending.discard(future)
+                                future.result()
+                        end = start + self.batch_size
+                        pending.add(pool.submit(self._embed_and_store, target, chunks[start:end], metadatas[start:end], ids[start:end]))
+
+                def flush():
+                    while pending:
+                        pending.pop().result()
+
+                rebuilt_urls = self._rebuild_from_archive(brand_id, submit)
+                self._copy_unarchived(current, rebuilt_urls, submit)
+                flush()
+
+                count = target.count()
+                if count == 0:
+                    raise RuntimeError("Rebuilt collection is empty")
+                set_alias(logical, target.name)
+                swapped = True
+                logger.info(f"{logical} now serves {target.name} ({count} chunks)")
+
+                # Writers follow the alias from here on; copy what they stored in the old collection meanwhile
+                if start_ids is None:
+                    logger.warning(f"Chunks written to {current} during the rebuild of {logical} are not copied")
+                else:
+                    try:
+                        rebuilt_urls |= self._catch_up(current, target, seen_ids, submit, flush)
+                        flush()
+                        count = target.count()
+                    except Exception as e:
+                        logger.error(f"Could not copy chunks written to {current} during the rebuild of {logical}: {e}")
+        except Exception:
+            if not swapped:
+                client.delete_collection(target.name)
+            raise
+
+        near_duplicates.replace_brand(brand_id, staged, rebuilt_urls)
+
+        manifest = compact_index.manifest(brand_id)
+        if manifest:
+            compact_index.build(brand_id, dtype=manifest["dtype"])
+
+        return count, current if current != target.name and current in list_collection_names() else None
+
+    def _rebuild_from_archive(self, brand_id: int, submit) -> Set[str]:
+        """Re-extract and re-chunk every catalog document with an archived page. Returns their URLs."""
+        with Session(read_engine) as session:
+            brand = session.get(Brand, brand_id)
+            documents = session.exec(select(Document).where(Document.brand_id == brand_id)).all()
+
+        rebuilt_urls = set()
+        for document in documents:
+            snapshot = page_archive.latest(document.url)
+            if snapshot is None:
+                continue
+            try:
+                title, text = extract_archived_page(snapshot.sha256, document.url)
+            except Exception as e:
+                logger.warning(f"Could not re-extract {document.url}, keeping its current chunks: {e}")
+                continue
+            rebuilt_urls.add(normalize_url(document.url))
+            metadata = {
+                "source": document.url,
+                "brand_id": int(brand_id),
+                "brand": brand.name if brand else "",
+                "product_id": int(document.product_id or 0),
+                "title": document.title or title or document.url,
+                "doc_id": int(document.id),
+            }
+            chunks, metadatas, ids = build_chunks(text, metadata, document.url)
+            self.status["documents"] += 1
+            if chunks:
+                submit(chunks, metadatas, ids)
+        logger.info(f"Brand {brand_id}: {len(rebuilt_urls)}/{len(documents)} documents rebuilt from the page archive")
+        return rebuilt_urls
+
+    def _copy_unarchived(self, current: str, rebuilt_urls: Set[str], submit, page_size: int = 500):
+        """Re-embed chunks of the current collection whose page isn't in the archive."""
+        if current not in list_collection_names():
+            return
+        try:
+            source = client.get_collection(name=current, embedding_function=embedding_function)
+            total = source.count()
+            kept = 0
+            for offset in range(0, total, page_size):
+                batch = source.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                keep = [i for i, meta in enumerate(batch["metadatas"]) if chunk_source_url(meta or {}) not in rebuilt_urls]
+                if keep:
+                    submit(
+                        [batch["documents"][i] for i in keep],
+                        [batch["metadatas"][i] for i in keep],
+                        [batch["ids"][i] for i in keep],
+                    )
+                kept += len(keep)
+            logger.info(f"Re-embedding {kept} chunks from {current} with no archived page")
+        except Exception as e:
+            # A corrupted collection: rebuild from the archive alone
+            logger.warning(f"Could not read {current}, rebuilding from archived pages only: {e}")
+
+    def _chunk_ids(self, name: str, page_size: int = 5000) -> Optional[Set[str]]:
+        """Ids stored in a collection, or None if it can't be read."""
+        if name not in list_collection_names():
+            return set()
+        try:
+            collection = client.get_collection(name=name, embedding_function=embedding_function)
+            ids: Set[str] = set()
+            for offset in range(0, collection.count(), page_size):
+                ids.update(collection.get(limit=page_size, offset=offset, include=[])["ids"])
+            return ids
+        except Exception as e:
+            logger.warning(f"Could not list the chunks of {name}: {e}")
+            return None
+
+    def _catch_up(self, current: str, target, seen_ids: Set[str], submit, flush, page_size: int = 500) -> Set[str]:
+        """
+        Copy chunks that ingestion wrote to the old collection while the
+        rebuild ran, i.e. whose ids the rebuild hasn't seen. Their pages are
+        copied in full and the rebuild's older chunks of those pages are
+        removed. Returns the URLs of the pages copied.
+        """
+        if current == target.name or current not in list_collection_names():
+            return set()
+        source = client.get_collection(name=current, embedding_function=embedding_function)
+
+        changed_urls: Set[str] = set()
+        unkeyed: Set[str] = set()  # New chunks with no page URL, copied on their own
+        for offset in range(0, source.count(), page_size):
+            batch = source.get(limit=page_size, offset=offset, include=["metadatas"])
+            for chunk_id, meta in zip(batch["ids"], batch["metadatas"]):
+                if chunk_id not in seen_ids:
+                    url = chunk_source_url(meta or {})
+                    if url:
+                        changed_urls.add(url)
+                    else:
+                        unkeyed.add(chunk_id)
+        if not changed_urls and not unkeyed:
+            return set()
+
+        copied: Set[str] = set()
+        for offset in range(0, source.count(), page_size):
+            batch = source.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            keep = [
+                i for i, (chunk_id, meta) in enumerate(zip(batch["ids"], batch["metadatas"]))
+                if chunk_id in unkeyed or chunk_source_url(meta or {}) in changed_urls
+            ]
+            if keep:
+                ids = [batch["ids"][i] for i in keep]
+                copied.update(ids)
+                submit([batch["documents"][i] for i in keep], [batch["metadatas"][i] for i in keep], ids)
+        flush()
+
+        # Only chunks the rebuild itself wrote: newer ones come from writers already using the new collection
+        stale = []
+        for offset in range(0, target.count(), page_size):
+            batch = target.get(limit=page_size, offset=offset, include=["metadatas"])
+            stale += [
+                chunk_id for chunk_id, meta in zip(batch["ids"], batch["metadatas"])
+                if chunk_id in seen_ids and chunk_id not in copied and chunk_source_url(meta or {}) in changed_urls
+            ]
+        if stale:
+            target.delete(ids=stale)
+        logger.info(f"Copied {len(copied)} chunks of {len(changed_urls)} pages written to {current} during the rebuild; removed {len(stale)} older chunks")
+        return changed_urls
+
+    def _embed_and_store(self, target, chunks: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
+        embeddings = embedding_function(chunks)
+        target.upsert(documents=chunks, metadatas=metadatas, ids=ids, embeddings=embeddings)
+        self.status["chunks"] += len(chunks)
+
+    def get_status(self) -> Dict[str, Any]:
+        status = dict(self.status)
+        status["running"] = self._thread is not None and self._thread.is_alive()
+        return status
+
+
+# Global rebuilder instance
+index_rebuilder = IndexRebuilder()
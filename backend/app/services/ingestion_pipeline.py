@@ -0,0 +1,224 @@
+"""
+Staged ingestion pipeline.
+Bounded asyncio queues connect fetch -> extract -> persist -> embed stages,
+each with its own worker count, so scrapers push extracted documents and go
+straight back to fetching. Blocking work (HTML parsing, SQL commits,
+chunking/embedding/upserts) runs in threads, off the event loop. Full queues
+apply backpressure to the producers. Producers mark a page done from
+`on_complete`, which only runs once the item has left the pipeline; a failed
+embed clears the document's content hash so the page is re-ingested.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .catalog_writer import catalog_writer
+from .document_registry import document_registry
+from .rag_service import store_document_chunks
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PipelineItem:
+    """
+    One document moving through the pipeline. Producers fill in whatever
+    they already have and submit at the matching stage:
+    - URL + `fetch` -> submit at "fetch"
+    - `html` + `extract` -> submit at "extract"
+    - `text` (+ `persist`) -> submit at "persist"
+    """
+    url: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    document_id: Optional[str] = None
+    html: Optional[str] = None
+    title: Optional[str] = None
+    text: Optional[str] = None
+    # async (url) -> html or None
+    fetch: Optional[Callable[[str], Awaitable[Optional[str]]]] = None
+    # sync (html) -> (title, text), run in a thread
+    extract: Optional[Callable[[str], Tuple[str, str]]] = None
+    # sync (item) -> extra chunk metadata, or None to stop here (e.g. unchanged); run in a thread
+    persist: Optional[Callable[["PipelineItem"], Optional[Dict[str, Any]]]] = None
+    # async (item, error or None), awaited when the item leaves the pipeline
+    on_complete: Optional[Callable[["PipelineItem", Optional[str]], Awaitable[None]]] = None
+    chunks: int = 0
+
+
+class Stage:
+    def __init__(self, name: str, handler: Callable[[PipelineItem], Awaitable[Optional[PipelineItem]]], workers: int = 1, queue_size: int = 100):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks: List[asyncio.Task] = []
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        self.metrics = {"processed": 0, "failed": 0, "in_flight": 0, "max_queue_depth": 0, "busy_seconds": 0.0}
+        self.started_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        processed = self.metrics["processed"]
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "max_queue_depth": self.metrics["max_queue_depth"],
+            "in_flight": self.metrics["in_flight"],
+            "processed": processed,
+            "failed": self.metrics["failed"],
+            "avg_seconds": round(self.metrics["busy_seconds"] / processed, 4) if processed else 0.0,
+            "throughput_per_s": round(processed / elapsed, 3),
+        }
+
+
+class IngestionPipeline:
+    """
+    Usage:
+        await ingestion_pipeline.submit(PipelineItem(url=url, text=text, metadata=meta), stage="persist")
+        ...
+        await ingestion_pipeline.drain()   # wait until everything submitted is stored
+
+    Workers are bound to the event loop of the first submit; `stop()` at the
+    end of a script run.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        self._by_name = {stage.name: stage for stage in stages}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # First use, or a new asyncio.run(): rebuild queues and workers on this loop
+        self._loop = loop
+        for index, stage in enumerate(self.stages):
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+            stage.reset_metrics()
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            stage.tasks = [asyncio.create_task(self._worker(stage, next_stage)) for _ in range(stage.workers)]
+        logger.info(f"Ingestion pipeline started: " + ", ".join(f"{s.name}x{s.workers}" for s in self.stages))
+
+    async def submit(self, item: PipelineItem, stage: Optional[str] = None):
+        """Queue an item at `stage` (default: the first). Waits while that queue is full."""
+        self._start()
+        target = self._by_name[stage] if stage else self.stages[0]
+        await target.queue.put(item)
+        target.metrics["max_queue_depth"] = max(target.metrics["max_queue_depth"], target.queue.qsize())
+
+    async def _worker(self, stage: Stage, next_stage: Optional[Stage]):
+        while True:
+            item = await stage.queue.get()
+            stage.metrics["in_flight"] += 1
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+                stage.metrics["processed"] += 1
+                if result is not None and next_stage is not None:
+                    await next_stage.queue.put(result)
+                    next_stage.metrics["max_queue_depth"] = max(next_stage.metrics["max_queue_depth"], next_stage.queue.qsize())
+                else:
+                    await self._complete(item, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stage.metrics["failed"] += 1
+                logger.error(f"Pipeline stage {stage.name} failed for {item.url}: {e}")
+                await self._complete(item, str(e) or e.__class__.__name__)
+            finally:
+                stage.metrics["busy_seconds"] += time.monotonic() - started
+                stage.metrics["in_flight"] -= 1
+                stage.queue.task_done()
+
+    async def _complete(self, item: PipelineItem, error: Optional[str]):
+        if item.on_complete is None:
+            return
+        try:
+            await item.on_complete(item, error)
+        except Exception as e:
+            logger.error(f"Pipeline completion callback failed for {item.url}: {e}")
+
+    async def drain(self):
+        """Wait until every submitted item has left the pipeline."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        # Items only move downstream, so joining in stage order drains everything
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def stop(self):
+        """Drain, then cancel the workers."""
+        if self._loop is not asyncio.get_running_loop():
+            self._loop = None
+            return
+        await self.drain()
+        for stage in self.stages:
+            for task in stage.tasks:
+                task.cancel()
+            await asyncio.gather(*stage.tasks, return_exceptions=True)
+            stage.tasks = []
+        self._loop = None
+        logger.info(f"Ingestion pipeline stopped: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.get_stats() for stage in self.stages}
+
+
+async def _fetch_stage(item: PipelineItem) -> PipelineItem:
+    if item.html is None and item.text is None:
+        if item.fetch is None:
+            raise ValueError("Item has no html, text or fetch callable")
+        item.html = await item.fetch(item.url)
+        if not item.html:
+            raise RuntimeError("No content retrieved")
+    return item
+
+
+async def _extract_stage(item: PipelineItem) -> PipelineItem:
+    if item.text is None:
+        if item.extract is None:
+            raise ValueError("Item has no text or extract callable")
+        title, item.text = await asyncio.to_thread(item.extract, item.html)
+        item.title = item.title or title
+        item.html = None  # Release the raw page; the archive keeps it
+    return item
+
+
+async def _persist_stage(item: PipelineItem) -> Optional[PipelineItem]:
+    if item.persist is not None:
+        extra = await asyncio.to_thread(item.persist, item)
+        if extra is None:
+            return None
+        item.metadata.update(extra)
+    return item
+
+
+async def _embed_stage(item: PipelineItem) -> PipelineItem:
+    try:
+        item.chunks = await asyncio.to_thread(store_document_chunks, item.text, item.metadata, item.document_id)
+    except Exception:
+        # Persist already recorded the new content hash; without this the
+        # next crawl would skip the page as unchanged and never store it
+        doc_id = item.metadata.get("doc_id")
+        if doc_id:
+            await asyncio.to_thread(document_registry.invalidate, int(doc_id))
+            catalog_writer.invalidate_document(int(doc_id))
+        raise
+    return item
+
+
+# Global pipeline. Persist is single-worker: SQLite has one writer anyway.
+ingestion_pipeline = IngestionPipeline([
+    Stage("fetch", _fetch_stage, workers=2, queue_size=50),
+    Stage("extract", _extract_stage, workers=2, queue_size=50),
+    Stage("persist", _persist_stage, workers=1, queue_size=100),
+    Stage("embed", _embed_stage, workers=2, queue_size=100),
+])
@@ -8,6 +8,7 @@ from playwright.async_api import async_playwright
 from ..core.database import Session, engine
 from ..models.sql_models import Brand, Product, ProductFamily, Document
 from .rag_service import ingest_document
+from .document_registry import document_registry
 from sqlmodel import select
 
 class MackieScraper:
@@ -90,12 +91,8 @@ class MackieScraper:
             # Ingest into RAG
             content = f"Product: {name}\nBrand: Mackie\nCategory: {family_name}\n\nDescription:\n{description}\n\nSpecifications/Features:\n{specs_content}"
             
-            # Check if document already exists
-            doc = session.exec(select(Document).where(Document.url == url)).first()
-            if not doc:
-                doc = Document(title=f"Mackie Product: {name}", url=url, brand_id=brand.id, product_id=product.id)
-                session.add(doc)
-                session.commit()
+            # Create the document row, or refresh it if it already exists
+            document_registry.upsert(url, f"Mackie Product: {name}", brand.id, product_id=product.id)
             
             await ingest_document(content, {"source": url, "brand": "Mackie", "product": name, "type": "product_page"})
             print(f"Successfully ingested {name}")
@@ -0,0 +1,508 @@
+"""
+Near-duplicate chunk detection (MinHash LSH over word shingles).
+Brand sites repeat the same blocks on many pages: warranty and shipping
+text, shared series descriptions. Before chunks are embedded, each one is
+compared with the chunks already stored for its brand; a near-duplicate is
+not embedded or stored again. Similar text is not enough: sibling products
+share whole spec blocks that differ only in model names and numbers, so a
+chunk is only a duplicate when its normalized text is identical, or when it
+is similar and has exactly the same numbers and model names. Instead a `ChunkReference` row records that
+its document contains the canonical chunk, with the metadata the copy
+would have had.
+
+Every stored chunk keeps its signature in `ChunkSignature`. The per-brand
+LSH tables are rebuilt from it in memory on first use. If the canonical
+chunk's document is deleted, the vector reconciler hands the chunk to a
+document that still references it (`promote`) instead of dropping the text.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..core.config import settings
+from ..core.database import read_engine
+from ..core.db_writer import db_writer
+from ..models.sql_models import Brand, ChunkReference, ChunkSignature, Document
+from .vector_router import chunk_source_url, vector_router
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+# 8 bands of 8 rows: pairs above ~0.77 Jaccard usually share a band and are compared
+BANDS = 8
+SHINGLE_WORDS = 3
+WORD_RE = re.compile(r"\w+")
+# Numbers and model names ("T5V", "104", "1.5", "XLR"): chunks that differ in
+# any of them describe different products, however similar the rest is
+FACT_RE = re.compile(r"[\w.-]*\d[\w.-]*|\b[A-Z]{2,}[\w-]*")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+# Fixed seed: signatures are persisted and compared across runs
+_random = np.random.RandomState(20261018)
+_A = _random.randint(1, 1 << 31, NUM_PERM).astype(np.uint64)
+_B = _random.randint(0, 1 << 31, NUM_PERM).astype(np.uint64)
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """MinHash of the text's word shingles, or None if it is too short to compare."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # h < 2**32 and a, b < 2**31, so a * h + b can't overflow uint64
+    return ((hashes[:, None] * _A + _B) % _MERSENNE_PRIME).min(axis=0).astype(np.uint32)
+
+
+def fingerprints(text: str) -> Tuple[str, str]:
+    """(hash of the normalized text, hash of its numbers and model names in order)."""
+    text_hash = hashlib.md5(" ".join(WORD_RE.findall(text.lower())).encode("utf-8")).hexdigest()
+    facts_hash = hashlib.md5("\x00".join(FACT_RE.findall(text)).encode("utf-8")).hexdigest()
+    return text_hash, facts_hash
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _band_keys(sig: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(band, rows.tobytes()) for band, rows in enumerate(sig.reshape(BANDS, -1))]
+
+
+class _Entry(NamedTuple):
+    signature: np.ndarray
+    source_url: str
+    text_hash: str  # Empty for signatures stored before fingerprints: never matched
+    facts_hash: str
+
+
+class _BrandIndex:
+    """LSH buckets over one brand's stored chunks, plus exact normalized-text hashes."""
+
+    def __init__(self):
+        self.chunks: Dict[str, _Entry] = {}
+        self.buckets: Dict[Tuple[int, bytes], List[str]] = defaultdict(list)
+        self.exact: Dict[str, str] = {}  # text_hash -> chunk_id
+
+    def add(self, chunk_id: str, sig: np.ndarray, source_url: str, text_hash: str = "", facts_hash: str = ""):
+        if chunk_id in self.chunks:
+            return
+        self.chunks[chunk_id] = _Entry(sig, source_url, text_hash, facts_hash)
+        if text_hash:
+            self.exact.setdefault(text_hash, chunk_id)
+        for key in _band_keys(sig):
+            self.buckets[key].append(chunk_id)
+
+    def remove(self, chunk_id: str):
+        entry = self.chunks.pop(chunk_id, None)
+        if entry is None:
+            return
+        if self.exact.get(entry.text_hash) == chunk_id:
+            del self.exact[entry.text_hash]
+        for key in _band_keys(entry.signature):
+            bucket = self.buckets.get(key)
+            if bucket and chunk_id in bucket:
+                bucket.remove(chunk_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def match(self, sig: np.ndarray, threshold: float, text_hash: str, facts_hash: str) -> Optional[Tuple[str, str]]:
+        """
+        (chunk_id, source_url) of a stored chunk with the same normalized
+        text, else of the most similar one at or above `threshold` that has
+        the same numbers and model names.
+        """
+        best = self.exact.get(text_hash)
+        if best:
+            return best, self.chunks[best].source_url
+        best_score = threshold
+        seen = set()
+        for key in _band_keys(sig):
+            for chunk_id in self.buckets.get(key, ()):
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                entry = self.chunks[chunk_id]
+                if not entry.facts_hash or entry.facts_hash != facts_hash:
+                    continue
+                score = similarity(sig, entry.signature)
+                if score >= best_score:
+                    best, best_score = chunk_id, score
+        return (best, self.chunks[best].source_url) if best else None
+
+
+@dataclass
+class DedupPlan:
+    """What to store for a batch of chunks, and what to record once it is stored."""
+    chunks: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    duplicate_ids: List[str] = field(default_factory=list)  # Input ids that were dropped
+    signatures: List[Dict[str, Any]] = field(default_factory=list)  # ChunkSignature rows for stored chunks
+    references: List[Dict[str, Any]] = field(default_factory=list)  # ChunkReference rows for dropped chunks
+    replace_urls: Set[str] = field(default_factory=set)  # Documents whose old references are replaced
+    counts: Dict[int, List[int]] = field(default_factory=dict)  # brand_id -> [chunks, duplicates]
+
+
+class NearDuplicateIndex:
+    """
+    Usage:
+        plan = near_duplicates.plan(chunks, metadatas, ids)    # before embedding
+        vector_router.upsert(documents=plan.chunks, metadatas=plan.metadatas, ids=plan.ids)
+        near_duplicates.commit(plan)                           # once stored
+        near_duplicates.shared_with_product(product_id)        # stored chunks a product only references
+        near_duplicates.report()                               # duplicate rate per brand
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        self.threshold = settings.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+        self._lock = threading.Lock()
+        self._brands: Dict[int, _BrandIndex] = {}
+        self.stats: Dict[int, Dict[str, int]] = defaultdict(lambda: {"chunks": 0, "duplicates": 0})
+        self.staged: Optional[DedupPlan] = None  # Rows collected instead of written (see staging)
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def _index(self, brand_id: int) -> _BrandIndex:
+        """The brand's LSH index, loaded from ChunkSignature on first use. Caller holds the lock."""
+        index = self._brands.get(brand_id)
+        if index is None:
+            index = _BrandIndex()
+            with Session(read_engine) as session:
+                rows = session.exec(
+                    select(
+                        ChunkSignature.chunk_id,
+                        ChunkSignature.signature,
+                        ChunkSignature.source_url,
+                        ChunkSignature.text_hash,
+                        ChunkSignature.facts_hash,
+                    ).where(ChunkSignature.brand_id == brand_id)
+                ).all()
+            for chunk_id, blob, source_url, text_hash, facts_hash in rows:
+                index.add(chunk_id, np.frombuffer(blob, dtype="<u4"), source_url, text_hash, facts_hash)
+            self._brands[brand_id] = index
+            logger.info(f"Near-duplicate index for brand {brand_id}: {len(index.chunks)} chunks")
+        return index
+
+    def plan(
+        self,
+        chunks: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        replace_references: bool = True,
+        verify: bool = True,
+    ) -> DedupPlan:
+        """
+        Split a batch into chunks to store and near-duplicates of chunks its
+        brand already has (or that appear earlier in the batch). With
+        `replace_references`, the batch is each of its documents in full,
+        so their previous references are dropped on commit. `verify` checks
+        matched chunks still exist in the vector store.
+        """
+        plan = DedupPlan()
+        if not self.enabled:
+            plan.chunks, plan.metadatas, plan.ids = list(chunks), list(metadatas), list(ids)
+            return plan
+
+        # (index, brand_id, signature, fingerprints, source_url, canonical match) per chunk; matches are verified below
+        matches: List[Tuple[int, int, Optional[np.ndarray], Tuple[str, str], str, Optional[Tuple[str, str]]]] = []
+        with self._lock:
+            batch: Dict[int, _BrandIndex] = defaultdict(_BrandIndex)
+            for i, (text, meta) in enumerate(zip(chunks, metadatas)):
+                brand_id = vector_router.brand_id_for(meta)
+                # Hierarchical children are kept: their parent is reassembled from all its siblings
+                sig = signature(text) if brand_id and "parent_id" not in meta else None
+                source_url = chunk_source_url(meta)
+                hashes = ("", "")
+                match = None
+                if sig is not None:
+                    hashes = fingerprints(text)
+                    counts = plan.counts.setdefault(brand_id, [0, 0])
+                    counts[0] += 1
+                    match = (
+                        self._index(brand_id).match(sig, self.threshold, *hashes)
+                        or batch[brand_id].match(sig, self.threshold, *hashes)
+                    )
+                    if match and (match[0] == ids[i] or (match[1] == source_url and match[0] not in batch[brand_id].chunks)):
+                        # The chunk itself, or an older version of it from the same page
+                        match = None
+                    if match is None:
+                        batch[brand_id].add(ids[i], sig, source_url, *hashes)
+                matches.append((i, brand_id, sig, hashes, source_url, match))
+
+        if verify:
+            missing = self._missing({(brand_id, match[0]) for _, brand_id, _, _, _, match in matches if match})
+            if missing:
+                self.forget(chunk_id for _, chunk_id in missing)
+        else:
+            missing = set()
+
+        for i, brand_id, sig, (text_hash, facts_hash), source_url, match in matches:
+            meta = metadatas[i]
+            if replace_references and source_url:
+                plan.replace_urls.add(source_url)
+            if match and (brand_id, match[0]) not in missing:
+                plan.duplicate_ids.append(ids[i])
+                plan.counts[brand_id][1] += 1
+                if match[1] != source_url:
+                    doc_id = meta.get("doc_id")
+                    plan.references.append({
+                        "chunk_id": match[0],
+                        "brand_id": brand_id,
+                        "source_url": source_url,
+                        "doc_id": int(doc_id) if doc_id else None,
+                        "chunk_metadata": json.dumps(meta, default=str),
+                    })
+                continue
+            plan.chunks.append(chunks[i])
+            plan.metadatas.append(meta)
+            plan.ids.append(ids[i])
+            if sig is not None:
+                plan.signatures.append({
+                    "chunk_id": ids[i],
+                    "brand_id": brand_id,
+                    "source_url": source_url,
+                    "signature": sig.astype("<u4").tobytes(),
+                    "text_hash": text_hash,
+                    "facts_hash": facts_hash,
+                })
+        return plan
+
+    def _missing(self, candidates: Set[Tuple[int, str]]) -> Set[Tuple[int, str]]:
+        """Matched chunks that are gone from the vector store (deleted outside the reconciler)."""
+        by_brand = defaultdict(list)
+        for brand_id, chunk_id in candidates:
+            by_brand[brand_id].append(chunk_id)
+        missing = set()
+        for brand_id, chunk_ids in by_brand.items():
+            try:
+                found = set(vector_router.partition(brand_id).get(ids=chunk_ids, include=[])["ids"])
+            except Exception as e:
+                logger.warning(f"Could not verify canonical chunks for brand {brand_id}: {e}")
+                continue
+            missing.update((brand_id, chunk_id) for chunk_id in chunk_ids if chunk_id not in found)
+        return missing
+
+    def commit(self, plan: DedupPlan):
+        """Record a plan's signatures and references once its chunks are stored."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for row in plan.signatures:
+                self._index(row["brand_id"]).add(
+                    row["chunk_id"],
+                    np.frombuffer(row["signature"], dtype="<u4"),
+                    row["source_url"],
+                    row["text_hash"],
+                    row["facts_hash"],
+                )
+            for brand_id, (count, duplicates) in plan.counts.items():
+                self.stats[brand_id]["chunks"] += count
+                self.stats[brand_id]["duplicates"] += duplicates
+            if self.staged is not None:
+                self.staged.signatures += plan.signatures
+                self.staged.references += plan.references
+                return
+        if not (plan.signatures or plan.references or plan.replace_urls):
+            return
+
+        def job(session):
+            if plan.replace_urls:
+                session.execute(delete(ChunkReference.__table__).where(ChunkReference.source_url.in_(plan.replace_urls)))
+            if plan.signatures:
+                session.execute(sqlite_insert(ChunkSignature.__table__).on_conflict_do_nothing(), plan.signatures)
+            if plan.references:
+                session.execute(insert(ChunkReference.__table__), plan.references)
+
+        db_writer.run(job)
+
+    def staging(self, brand_id: int) -> "NearDuplicateIndex":
+        """
+        An empty index for a brand being rebuilt into a new collection. Its
+        commits are only collected; replace_brand installs them once the new
+        collection serves the brand.
+        """
+        staged = NearDuplicateIndex(self.threshold)
+        staged._brands[brand_id] = _BrandIndex()
+        staged.staged = DedupPlan()
+        return staged
+
+    def replace_brand(self, brand_id: int, staged: "NearDuplicateIndex", rebuilt_urls: Set[str]):
+        """
+        Swap in a rebuild's signatures and references. References of pages
+        that were not rebuilt are kept if their chunk is still stored.
+        """
+        index = staged._brands[brand_id]
+        with Session(read_engine) as session:
+            old_references = session.exec(
+                select(ChunkReference.id, ChunkReference.chunk_id, ChunkReference.source_url)
+                .where(ChunkReference.brand_id == brand_id)
+            ).all()
+        stale = [id for id, chunk_id, source_url in old_references if source_url in rebuilt_urls or chunk_id not in index.chunks]
+
+        def job(session):
+            session.execute(delete(ChunkSignature.__table__).where(ChunkSignature.brand_id == brand_id))
+            for start in range(0, len(stale), 500):
+                session.execute(delete(ChunkReference.__table__).where(ChunkReference.id.in_(stale[start:start + 500])))
+            if staged.staged.signatures:
+                session.execute(sqlite_insert(ChunkSignature.__table__).on_conflict_do_nothing(), staged.staged.signatures)
+            if staged.staged.references:
+                session.execute(insert(ChunkReference.__table__), staged.staged.references)
+
+        db_writer.run(job)
+        with self._lock:
+            self._brands[brand_id] = index
+
+    def forget(self, chunk_ids: Iterable[str]):
+        """Drop deleted chunks' signatures and the references that pointed at them."""
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        if not chunk_ids:
+            return
+        with self._lock:
+            for index in self._brands.values():
+                for chunk_id in chunk_ids:
+                    index.remove(chunk_id)
+
+        def job(session):
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                session.execute(delete(ChunkSignature.__table__).where(ChunkSignature.chunk_id.in_(batch)))
+                session.execute(delete(ChunkReference.__table__).where(ChunkReference.chunk_id.in_(batch)))
+
+        db_writer.run(job)
+
+    def promote(self, collection, chunk_ids: List[str]) -> Set[str]:
+        """
+        For canonical chunks about to be deleted with their document, move
+        each one to the oldest document that still references it: the
+        chunk's metadata becomes that document's and its reference row is
+        removed. Returns the ids that were kept this way.
+        """
+        if not self.enabled or not chunk_ids:
+            return set()
+        with Session(read_engine) as session:
+            references = session.exec(
+                select(ChunkReference)
+                .where(ChunkReference.chunk_id.in_(chunk_ids))
+                .where((ChunkReference.doc_id == None) | ChunkReference.doc_id.in_(select(Document.id)))  # noqa: E711
+                .where(ChunkReference.brand_id.in_(select(Brand.id)))
+                .order_by(ChunkReference.id)
+            ).all()
+        heirs: Dict[str, ChunkReference] = {}
+        for reference in references:
+            heirs.setdefault(reference.chunk_id, reference)
+        if not heirs:
+            return set()
+
+        stored = collection.get(ids=list(heirs), include=["documents", "embeddings"])
+        if not stored["ids"]:
+            return set()
+        collection.upsert(
+            ids=stored["ids"],
+            documents=stored["documents"],
+            embeddings=stored["embeddings"],
+            metadatas=[json.loads(heirs[chunk_id].chunk_metadata) for chunk_id in stored["ids"]],
+        )
+        promoted = set(stored["ids"])
+        reference_ids = [heirs[chunk_id].id for chunk_id in promoted]
+        new_urls = {heirs[chunk_id].chunk_id: heirs[chunk_id].source_url for chunk_id in promoted}
+
+        def job(session):
+            session.execute(delete(ChunkReference.__table__).where(ChunkReference.id.in_(reference_ids)))
+            for chunk_id, source_url in new_urls.items():
+                session.execute(
+                    ChunkSignature.__table__.update().where(ChunkSignature.chunk_id == chunk_id).values(source_url=source_url)
+                )
+
+        db_writer.run(job)
+        with self._lock:
+            for index in self._brands.values():
+                for chunk_id, source_url in new_urls.items():
+                    if chunk_id in index.chunks:
+                        index.chunks[chunk_id] = index.chunks[chunk_id]._replace(source_url=source_url)
+        logger.info(f"Kept {len(promoted)} shared chunks whose document was deleted; they now belong to a referencing document")
+        return promoted
+
+    def prune(self) -> int:
+        """Delete references and signatures of deleted documents and brands. Returns references removed."""
+
+        def job(session):
+            removed = session.execute(
+                delete(ChunkReference.__table__).where(
+                    ((ChunkReference.doc_id != None) & ChunkReference.doc_id.not_in(select(Document.id)))  # noqa: E711
+                    | ChunkReference.brand_id.not_in(select(Brand.id))
+                )
+            ).rowcount or 0
+            session.execute(delete(ChunkSignature.__table__).where(ChunkSignature.brand_id.not_in(select(Brand.id))))
+            return removed
+
+        removed = db_writer.run(job)
+        with self._lock:
+            # Cheap to rebuild on next use; keeps deleted brands out of memory
+            self._brands.clear()
+        return removed
+
+    def shared_with_product(self, product_id: int, brand_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Stored chunks that the product's documents only reference, as
+        chunk_id -> brand_id. Product-scoped searches add these to their
+        `product_id` filter; they keep the metadata (and citation) of the
+        page they were stored from.
+        """
+        statement = (
+            select(ChunkReference.chunk_id, ChunkReference.brand_id)
+            .join(Document, Document.id == ChunkReference.doc_id)
+            .where(Document.product_id == product_id)
+            .order_by(ChunkReference.id)
+        )
+        if brand_id:
+            statement = statement.where(ChunkReference.brand_id == brand_id)
+        with Session(read_engine) as session:
+            rows = session.exec(statement).all()
+        return dict(rows)
+
+    def report(self) -> Dict[int, Dict[str, Any]]:
+        """Stored vs. referenced (not stored) chunks per brand, from the catalog."""
+        with Session(read_engine) as session:
+            stored = dict(session.exec(select(ChunkSignature.brand_id, func.count()).group_by(ChunkSignature.brand_id)).all())
+            referenced = dict(session.exec(select(ChunkReference.brand_id, func.count()).group_by(ChunkReference.brand_id)).all())
+            names = dict(session.exec(select(Brand.id, Brand.name)).all())
+        report = {}
+        for brand_id in sorted(set(stored) | set(referenced)):
+            total = stored.get(brand_id, 0) + referenced.get(brand_id, 0)
+            report[brand_id] = {
+                "brand": names.get(brand_id, ""),
+                "stored_chunks": stored.get(brand_id, 0),
+                "duplicate_chunks": referenced.get(brand_id, 0),
+                "duplicate_rate": round(referenced.get(brand_id, 0) / total, 4) if total else 0.0,
+            }
+        return report
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Chunks checked and dropped per brand since start."""
+        with self._lock:
+            brands = {
+                brand_id: dict(counts, duplicate_rate=round(counts["duplicates"] / counts["chunks"], 4) if counts["chunks"] else 0.0)
+                for brand_id, counts in self.stats.items()
+            }
+            indexed = {brand_id: len(index.chunks) for brand_id, index in self._brands.items()}
+        return {"threshold": self.threshold, "brands": brands, "indexed_chunks": indexed}
+
+
+# Global near-duplicate index
+near_duplicates = NearDuplicateIndex()
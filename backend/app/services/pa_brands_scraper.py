@@ -1,13 +1,22 @@
 import asyncio
-from playwright.async_api import async_playwright
 from playwright_stealth import Stealth
 import logging
-from app.services.rag_service import ingest_document
+from app.services.ingestion_pipeline import PipelineItem, ingestion_pipeline
 from app.core.database import Session, engine
-from app.models.sql_models import Brand, Product, ProductFamily, Document
+from app.models.sql_models import Brand
 from app.services.ingestion_tracker import tracker
+from app.services.crawl_frontier import frontier, QUEUED, LEASED, FAILED
+from app.services.page_archive import page_archive
+from app.services.catalog_writer import catalog_writer
+from app.services.document_registry import document_registry
+from app.services.document_media import document_media
+from app.engines.browser_pool import browser_pool
+from app.engines.page_extractor import extract_page, click_tab
+from app.engines.readiness import goto_ready, wait_until_ready, scroll_until_stable, readiness_stats
+from app.engines.network_capture import capture_catalogue
 from sqlmodel import select
 import datetime
+import hashlib
 import re
 import json
 
@@ -15,9 +24,14 @@ from app.models.ingestion_status import IngestionStatus
 
 logger = logging.getLogger(__name__)
 
+# Returned by a product handler that queued the page in the ingestion pipeline
+PIPELINED = "pipelined"
+
 class PABrandsScraper:
     def __init__(self, force_rescan=False):
         self.force_rescan = force_rescan
+        # Set by the worker on SIGTERM; leased URLs are released back to the frontier
+        self.stop_requested = False
         # Priority brands from HALILIT_BRANDS_LIST.md - focusing on those with accessible documentation
         self.brands_to_scrape = [
             # Tier 1: Audio Interfaces & Monitoring (High Priority)
@@ -51,41 +65,23 @@ class PABrandsScraper:
         ]
 
     async def run(self):
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080},
-                extra_http_headers={
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Cache-Control': 'no-cache',
-                    'Pragma': 'no-cache',
-                    'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                    'Sec-Ch-Ua-Mobile': '?0',
-                    'Sec-Ch-Ua-Platform': '"Windows"',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Sec-Fetch-User': '?1',
-                    'Upgrade-Insecure-Requests': '1'
-                }
-            )
+        # Pages come from the shared browser pool; its owner (worker, API lifespan) stops it
+        for brand_info in self.brands_to_scrape:
+            if self.stop_requested:
+                break
+            logger.info(f"Starting scrape for {brand_info['name']}")
+            tracker.start(brand_info['name'])
             
-            for brand_info in self.brands_to_scrape:
-                logger.info(f"Starting scrape for {brand_info['name']}")
-                tracker.start(brand_info['name'])
+            with Session(engine) as session:
+                brand = session.exec(select(Brand).where(Brand.name == brand_info['name'])).first()
                 
-                with Session(engine) as session:
-                    brand = session.exec(select(Brand).where(Brand.name == brand_info['name'])).first()
-                    
-                    if not brand:
-                        logger.error(f"Brand {brand_info['name']} not found in DB")
-                        tracker.update_progress({"errors": [{"message": f"Brand {brand_info['name']} not found in DB"}]})
-                        continue
+                if not brand:
+                    logger.error(f"Brand {brand_info['name']} not found in DB")
+                    tracker.update_progress({"errors": [{"message": f"Brand {brand_info['name']} not found in DB"}]})
+                    continue
 
-                    page = await context.new_page()
-                    try:
+                try:
+                    async with browser_pool.page() as page:
                         tracker.update_progress({"current_step": "Navigating to brand page"})
                         await page.goto(brand_info['url'], wait_until='domcontentloaded', timeout=90000)
                         
@@ -98,15 +94,73 @@ class PABrandsScraper:
                         else:
                             # Generic scraper for others
                             await self.scrape_generic_brand(page, brand, session)
-                            
+                        
+                except Exception as e:
+                    logger.error(f"Error scraping {brand_info['name']}: {e}")
+                    tracker.update_progress({"errors": [{"message": str(e)}]})
+        
+        # Product pages were handed off as they were scraped; wait for them to be stored
+        await ingestion_pipeline.drain()
+        catalog_writer.flush()
+        logger.info(f"Catalog writes: {catalog_writer.get_stats()}")
+        logger.info(f"Page readiness timings: {readiness_stats.get_stats()}")
+        logger.info(f"Ingestion pipeline: {ingestion_pipeline.get_stats()}")
+        tracker.update_progress({"is_running": False, "progress_percent": 100})
+
+    async def _enqueue_products(self, brand, product_links, priority=0):
+        """Queue product links in the crawl frontier, starting a new cycle unless a previous run is unfinished"""
+        requeue_done = self.force_rescan or not await asyncio.to_thread(frontier.has_pending, brand.id)
+        await asyncio.to_thread(frontier.enqueue, brand.id, product_links, priority=priority, requeue_done=requeue_done)
+
+    def _register_products(self, brand, urls, name_for, family_for=None, image_for=None):
+        """Create catalog rows for every discovered product in one batched write"""
+        for url in urls:
+            name = name_for(url)
+            if name:
+                catalog_writer.add_product(
+                    brand.id,
+                    name,
+                    family_name=family_for(url) if family_for else None,
+                    image_url=image_for(url) if image_for else None,
+                )
+        catalog_writer.flush()
+
+    async def _drain_frontier(self, brand, handler):
+        """
+        Lease the brand's URLs from the crawl frontier in batches and run
+        `handler(url, index, total)` on each. A handler returning False or
+        raising marks the URL failed (retried later with backoff). One that
+        returns PIPELINED handed the page to the ingestion pipeline, whose
+        completion callback marks it done or failed once it is stored.
+        """
+        stats = await asyncio.to_thread(frontier.stats, brand.id)
+        total = max(stats[QUEUED] + stats[LEASED] + stats[FAILED], 1)
+        processed = 0
+        try:
+            while not self.stop_requested:
+                batch = await asyncio.to_thread(frontier.lease, brand.id, limit=10)
+                if not batch:
+                    break
+                for url in batch:
+                    if self.stop_requested:
+                        break
+                    processed += 1
+                    try:
+                        result = await handler(url, processed, total)
                     except Exception as e:
-                        logger.error(f"Error scraping {brand_info['name']}: {e}")
-                        tracker.update_progress({"errors": [{"message": str(e)}]})
-                    finally:
-                        await page.close()
-            
-            tracker.update_progress({"is_running": False, "progress_percent": 100})
-            await browser.close()
+                        logger.error(f"Error processing {brand.name} product {url}: {e}")
+                        await asyncio.to_thread(frontier.fail, url, str(e))
+                        continue
+                    if result is PIPELINED:
+                        continue
+                    if result is False:
+                        await asyncio.to_thread(frontier.fail, url, "Product page scrape failed")
+                    else:
+                        await asyncio.to_thread(frontier.complete, url)
+            # Queued pages are still leased until they are stored
+            await ingestion_pipeline.drain()
+        finally:
+            await asyncio.to_thread(frontier.release, brand.id)
 
     async def scrape_generic_brand(self, page, brand, session):
         """
@@ -186,32 +240,29 @@ class PABrandsScraper:
         except Exception as e:
             logger.error(f"Failed to update DB status for {brand.name}: {e}")
 
-        for i, url in enumerate(product_links):
-            name = url.split('/')[-1].replace('-', ' ').replace('.html', '').title()
-            if not name: continue
+        def name_for(url):
+            return url.split('/')[-1].replace('-', ' ').replace('.html', '').title()
+
+        self._register_products(brand, product_links, name_for)
+        await self._enqueue_products(brand, product_links)
+
+        async def handle(url, i, total):
+            name = name_for(url)
+            if not name: return True
             logger.info(f"Processing {brand.name} product: {name}")
             
             tracker.update_progress({
                 "current_step": f"Processing {name}",
                 "current_document": url,
-                "urls_processed": i + 1,
-                "progress_percent": ((i + 1) / len(product_links)) * 100
+                "urls_processed": i,
+                "progress_percent": (i / total) * 100
             })
             
-            product = session.exec(select(Product).where(Product.name == name)).first()
-            if not product:
-                family = session.exec(select(ProductFamily).where(ProductFamily.brand_id == brand.id)).first()
-                if not family:
-                    family = ProductFamily(name="General", brand_id=brand.id)
-                    session.add(family)
-                    session.commit()
-                    session.refresh(family)
-                product = Product(name=name, family_id=family.id)
-                session.add(product)
-                session.commit()
-                session.refresh(product)
+            product_id = catalog_writer.product_id(brand.id, name)
+
+            return await self.scrape_generic_product_page(page, url, brand.id, product_id, brand.name)
 
-            await self.scrape_generic_product_page(page, url, brand.id, product.id, brand.name)
+        await self._drain_frontier(brand, handle)
 
     async def scrape_allen_heath(self, page, brand, session):
         # Allen & Heath products are listed in categories
@@ -233,8 +284,7 @@ class PABrandsScraper:
             # Fallback to crawling if file doesn't exist
             try:
                 await Stealth().apply_stealth_async(page)
-                await page.goto("https://www.allen-heath.com/hardware/", wait_until='domcontentloaded', timeout=60000)
-                await asyncio.sleep(5)
+                await goto_ready(page, "https://www.allen-heath.com/hardware/", "allen_heath_listing")
                 
                 links = await page.query_selector_all("a")
                 for link in links:
@@ -250,65 +300,51 @@ class PABrandsScraper:
                 logger.error(f"Error crawling AH links: {e}")
 
         logger.info(f"Processing {len(product_links)} Allen & Heath products")
+
+        def name_for(url):
+            name = url.split('/')[-1].replace('-', ' ').title()
+            if not name or name == 'Products': 
+                name = url.split('/')[-2].replace('-', ' ').title()
+            return name
+
+        self._register_products(brand, product_links, name_for)
+        await self._enqueue_products(brand, product_links)
         
-        for i, url in enumerate(product_links):
-            try:
-                # Check if already ingested
-                if not self.force_rescan:
-                    existing_doc = session.exec(select(Document).where(Document.url == url)).first()
-                    if existing_doc:
-                        logger.info(f"Skipping already ingested AH product: {url}")
-                        continue
+        async def handle(url, i, total):
+            # Check if already ingested
+            if not self.force_rescan:
+                if catalog_writer.has_document(brand.id, url):
+                    logger.info(f"Skipping already ingested AH product: {url}")
+                    return True
 
-                name = url.split('/')[-1].replace('-', ' ').title()
-                if not name or name == 'Products': 
-                    name = url.split('/')[-2].replace('-', ' ').title()
-                
-                logger.info(f"Processing Allen & Heath product: {name}")
-                
-                tracker.update_progress({
-                    "current_step": f"Processing {name}",
-                    "current_document": url,
-                    "urls_processed": i + 1,
-                    "progress_percent": ((i + 1) / len(product_links)) * 100
-                })
-                
-                product = session.exec(select(Product).where(Product.name == name)).first()
-                if not product:
-                    family = session.exec(select(ProductFamily).where(ProductFamily.brand_id == brand.id)).first()
-                    if not family:
-                        family = ProductFamily(name="General", brand_id=brand.id)
-                        session.add(family)
-                        session.commit()
-                        session.refresh(family)
-                    product = Product(name=name, family_id=family.id)
-                    session.add(product)
-                    session.commit()
-                    session.refresh(product)
-
-                # Use a new page for each product to apply stealth properly
-                product_page = await page.context.new_page()
-                try:
-                    await Stealth().apply_stealth_async(product_page)
-                    await self.scrape_generic_product_page(product_page, url, brand.id, product.id, brand.name)
-                finally:
-                    await product_page.close()
-                    
-            except Exception as e:
-                logger.error(f"Error processing AH product {url}: {e}")
+            name = name_for(url)
+            
+            logger.info(f"Processing Allen & Heath product: {name}")
+            
+            tracker.update_progress({
+                "current_step": f"Processing {name}",
+                "current_document": url,
+                "urls_processed": i,
+                "progress_percent": (i / total) * 100
+            })
+            
+            product_id = catalog_writer.product_id(brand.id, name)
+
+            # Use a separate pooled page per product (stealth is applied by the pool)
+            async with browser_pool.page() as product_page:
+                return await self.scrape_generic_product_page(product_page, url, brand.id, product_id, brand.name)
+
+        await self._drain_frontier(brand, handle)
 
     async def scrape_mackie(self, page, brand, session):
         # Mackie products
         logger.info("Scraping Mackie products...")
         tracker.update_progress({"current_step": "Discovering Mackie products"})
         
-        await page.goto("https://mackie.com/en/products", wait_until='domcontentloaded')
-        await asyncio.sleep(5)
+        await goto_ready(page, "https://mackie.com/en/products", "mackie_listing")
         
-        # Scroll multiple times to load all products
-        for _ in range(5):
-            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await asyncio.sleep(2)
+        # Scroll until no more products load
+        await scroll_until_stable(page, "a[href$='.html']", max_scrolls=5, label="mackie_scroll")
         
         links = await page.query_selector_all("a")
         product_links = []
@@ -329,35 +365,31 @@ class PABrandsScraper:
         })
         
         # Process more products for Mackie
-        for i, url in enumerate(product_links[:50]): 
-            try:
-                name = url.split('/')[-1].replace('-', ' ').replace('.html', '').title()
-                logger.info(f"Processing Mackie product: {name}")
-                
-                tracker.update_progress({
-                    "current_step": f"Processing {name}",
-                    "current_document": url,
-                    "urls_processed": i + 1,
-                    "progress_percent": ((i + 1) / min(len(product_links), 50)) * 100
-                })
-                
-                product = session.exec(select(Product).where(Product.name == name)).first()
-                if not product:
-                    family_name = url.split('/')[-2].replace('-', ' ').title()
-                    family = session.exec(select(ProductFamily).where(ProductFamily.name == family_name)).first()
-                    if not family:
-                        family = ProductFamily(name=family_name, brand_id=brand.id)
-                        session.add(family)
-                        session.commit()
-                        session.refresh(family)
-                    product = Product(name=name, family_id=family.id)
-                    session.add(product)
-                    session.commit()
-                    session.refresh(product)
-
-                await self.scrape_generic_product_page(page, url, brand.id, product.id, brand.name)
-            except Exception as e:
-                logger.error(f"Error processing Mackie product {url}: {e}")
+        def name_for(url):
+            return url.split('/')[-1].replace('-', ' ').replace('.html', '').title()
+
+        def family_for(url):
+            return url.split('/')[-2].replace('-', ' ').title()
+
+        self._register_products(brand, product_links[:50], name_for, family_for=family_for)
+        await self._enqueue_products(brand, product_links[:50])
+
+        async def handle(url, i, total):
+            name = name_for(url)
+            logger.info(f"Processing Mackie product: {name}")
+            
+            tracker.update_progress({
+                "current_step": f"Processing {name}",
+                "current_document": url,
+                "urls_processed": i,
+                "progress_percent": (i / total) * 100
+            })
+            
+            product_id = catalog_writer.product_id(brand.id, name, family_name=family_for(url))
+
+            return await self.scrape_generic_product_page(page, url, brand.id, product_id, brand.name)
+
+        await self._drain_frontier(brand, handle)
 
     async def scrape_rcf(self, page, brand, session):
         # RCF products - use sitemap-extracted links if available
@@ -366,6 +398,7 @@ class PABrandsScraper:
         import os
         links_file = "rcf_links.txt"
         all_product_links = []
+        records_by_url = {}
         
         if os.path.exists(links_file):
             logger.info(f"Loading RCF links from {links_file}")
@@ -385,22 +418,28 @@ class PABrandsScraper:
             for cat_url in categories:
                 try:
                     logger.info(f"Visiting RCF category: {cat_url}")
-                    await page.goto(cat_url, wait_until='domcontentloaded', timeout=60000)
-                    await asyncio.sleep(8) # Wait for JS grid
+                    
+                    # Prefer structured records from the grid's JSON API
+                    records = await capture_catalogue(page, cat_url, "rcf")
+                    if records:
+                        for record in records:
+                            records_by_url[record.url] = record
+                            cat_links.add(record.url)
+                        continue
+                    
+                    await wait_until_ready(page, "rcf_category")  # Wait for JS grid
                     
                     # Try to click "Accept" on cookie banner if it exists
                     try:
                         cookie_btn = await page.query_selector("#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll")
                         if cookie_btn:
                             await cookie_btn.click()
-                            await asyncio.sleep(2)
+                            await wait_until_ready(page, "cookie_banner")
                     except:
                         pass
 
                     # Scroll to load more
-                    for _ in range(3):
-                        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                        await asyncio.sleep(2)
+                    await scroll_until_stable(page, "a[href*='/product-detail/']", max_scrolls=3, label="rcf_category_scroll")
                     
                     links = await page.query_selector_all("a")
                     for link in links:
@@ -416,177 +455,69 @@ class PABrandsScraper:
         logger.info(f"Found {len(all_product_links)} RCF product links")
         
         # Process a batch of products
-        batch_links = all_product_links[:100]
-        for i, url in enumerate(batch_links): # Increased limit for RCF
-            try:
-                name = url.split('/')[-1].replace('-', ' ').title()
-                logger.info(f"Processing RCF product: {name}")
-                
-                tracker.update_progress({
-                    "current_step": f"Processing {name}",
-                    "current_document": url,
-                    "urls_processed": i + 1,
-                    "progress_percent": ((i + 1) / len(batch_links)) * 100
-                })
-                
-                product = session.exec(select(Product).where(Product.name == name)).first()
-                if not product:
-                    # Try to infer family from URL or just use General
-                    family = session.exec(select(ProductFamily).where(ProductFamily.brand_id == brand.id)).first()
-                    if not family:
-                        family = ProductFamily(name="General", brand_id=brand.id)
-                        session.add(family)
-                        session.commit()
-                        session.refresh(family)
-                    product = Product(name=name, family_id=family.id)
-                    session.add(product)
-                    session.commit()
-                    session.refresh(product)
-
-                await self.scrape_generic_product_page(page, url, brand.id, product.id, brand.name)
-            except Exception as e:
-                logger.error(f"Error processing RCF product {url}: {e}")
+        def name_for(url):
+            record = records_by_url.get(url)
+            return record.name if record else url.split('/')[-1].replace('-', ' ').title()
+
+        def image_for(url):
+            record = records_by_url.get(url)
+            return record.image_url if record else None
+
+        self._register_products(brand, all_product_links[:100], name_for, image_for=image_for)
+        await self._enqueue_products(brand, all_product_links[:100])
+
+        async def handle(url, i, total):
+            name = name_for(url)
+            logger.info(f"Processing RCF product: {name}")
+            
+            tracker.update_progress({
+                "current_step": f"Processing {name}",
+                "current_document": url,
+                "urls_processed": i,
+                "progress_percent": (i / total) * 100
+            })
+            
+            product_id = catalog_writer.product_id(brand.id, name, image_url=image_for(url))
+
+            return await self.scrape_generic_product_page(page, url, brand.id, product_id, brand.name)
+
+        await self._drain_frontier(brand, handle)
 
     async def scrape_generic_product_page(self, page, url, brand_id, product_id, brand_name=""):
+        """Scrape and ingest one product page. Returns False if the page could not be scraped."""
         try:
             logger.info(f"Scraping product page: {url}")
-            await page.goto(url, wait_until='domcontentloaded', timeout=60000)
-            await asyncio.sleep(3) # Wait for content
+            await goto_ready(page, url, "rcf_product" if "rcf.it" in url else "product_page")
             
+            # Special handling for RCF tabs: open Specifications so it is rendered
+            if "rcf.it" in url:
+                if await click_tab(page, "SPECIFICATIONS"):
+                    await wait_until_ready(page, "rcf_tab")
+
+            # Single in-page pass: title, language, images, links and sections
+            extracted = await extract_page(page)
+            title = extracted.title
+
             # Check for "Page not Sound" or 404
-            title = await page.title()
             if "Page not Sound" in title or "404" in title:
                 logger.warning(f"Skipping {url} - Page not found or blocked")
-                return
+                return True
 
             # Language Check (Strict English)
-            lang = await page.evaluate("document.documentElement.lang")
-            if lang and not lang.lower().startswith('en') and len(lang) > 0:
-                logger.warning(f"Skipping {url} - Non-English language detected: {lang}")
-                return
-
-            # Special handling for RCF tabs
-            if "rcf.it" in url:
-                try:
-                    # Try to click Specifications tab to ensure it's loaded/visible
-                    tabs = await page.query_selector_all("a")
-                    for tab in tabs:
-                        text = await tab.inner_text()
-                        if 'SPECIFICATIONS' in text.upper():
-                            await tab.click()
-                            await asyncio.sleep(1)
-                            break
-                except:
-                    pass
-
-            # 1. Extract all images and illustrations
-            images = await page.query_selector_all("img")
-            image_urls = []
-            for img in images:
-                try:
-                    src = await img.get_attribute("src")
-                    alt = await img.get_attribute("alt") or ""
-                    
-                    # Filter out small icons, logos, etc.
-                    if src and not src.startswith('data:') and (len(alt) > 3 or 'product' in src.lower() or 'hero' in src.lower() or 'gallery' in src.lower()):
-                        # Basic relevance check
-                        if any(kw in alt.lower() or kw in src.lower() for kw in ['product', 'hero', 'main', 'gallery', 'large']):
-                            if not src.startswith('http'):
-                                base = "/".join(page.url.split('/')[:3])
-                                src = base + (src if src.startswith('/') else '/' + src)
-                            image_urls.append({"url": src, "alt": alt})
-                except:
-                    continue
-            
-            # 2. Extract all PDF links (Manuals, Datasheets) - PRIORITIZED
-            links = await page.query_selector_all("a")
-            pdf_links = []
-            documentation_links = []  # For non-PDF documentation pages
-            
-            for link in links:
-                try:
-                    href = await link.get_attribute("href")
-                    text = await link.inner_text()
-                    text_lower = text.strip().lower()
-                    
-                    # Priority 1: PDF manuals and documentation
-                    if href and href.lower().endswith('.pdf'):
-                        # Filter for English manuals
-                        title_upper = text.strip().upper()
-                        url_upper = href.upper()
-                        
-                        is_english = any(kw in title_upper or kw in url_upper for kw in ["ENGLISH", " EN ", "_EN", "MANUAL", "USER GUIDE", "DATASHEET", "QUICK START", "REFERENCE"])
-                        is_other_lang = any(kw in title_upper for kw in ["FRENCH", "GERMAN", "ITALIAN", "SPANISH", "CHINESE", "FRANCAIS", "DEUTSCH", "ITALIANO", "ESPANOL"])
-                        
-                        if is_english or not is_other_lang:
-                            if not href.startswith('http'):
-                                base = "/".join(page.url.split('/')[:3])
-                                href = base + (href if href.startswith('/') else '/' + href)
-                            
-                            # Prioritize manuals over other PDFs
-                            is_manual = any(kw in text_lower for kw in ['manual', 'user guide', 'reference', 'documentation'])
-                            if is_manual:
-                                pdf_links.insert(0, {"url": href, "title": text.strip() or "PDF Document"})
-                            else:
-                                pdf_links.append({"url": href, "title": text.strip() or "PDF Document"})
-                    
-                    # Priority 2: Support/Documentation pages (non-PDF)
-                    elif href and any(kw in text_lower for kw in ['support', 'documentation', 'specs', 'specifications', 'downloads', 'resources']):
-                        if not href.startswith('http'):
-                            base = "/".join(page.url.split('/')[:3])
-                            href = base + (href if href.startswith('/') else '/' + href)
-                        documentation_links.append({"url": href, "title": text.strip()})
-                except:
-                    continue
+            if not extracted.is_english:
+                logger.warning(f"Skipping {url} - Non-English language detected: {extracted.lang}")
+                return True
 
-            # 3. Extract structured text (Features, Specs)
-            content_parts = []
-            
-            # Try to find specific sections by common classes/IDs
-            selectors = [
-                (".product-features, .features, #features, .features-list", "FEATURES"),
-                (".product-specs, .specs, #specs, .specifications, .technical-specs, #technical-specifications", "SPECIFICATIONS"),
-                (".product-description, .description, #description, .overview, .product-overview", "OVERVIEW")
-            ]
-            
-            for selector, label in selectors:
-                el = await page.query_selector(selector)
-                if el:
-                    text = await el.inner_text()
-                    if len(text.strip()) > 50:
-                        content_parts.append(f"### {label}\n{text.strip()}")
-
-            # Fallback: If no structured sections found, try to find by text content
-            if not content_parts:
-                # Look for elements containing keywords
-                for keyword, label in [("Features", "FEATURES"), ("Specifications", "SPECIFICATIONS"), ("Overview", "OVERVIEW")]:
-                    try:
-                        el = await page.evaluate_handle(f"""() => {{
-                            const headers = Array.from(document.querySelectorAll('h1, h2, h3, h4, h5, b, strong'));
-                            const header = headers.find(h => h.textContent.includes('{keyword}'));
-                            if (header && header.parentElement) return header.parentElement;
-                            return null;
-                        }}""")
-                        if el:
-                            text = await el.evaluate('node => node.innerText')
-                            if len(text.strip()) > 50:
-                                content_parts.append(f"### {label}\n{text.strip()}")
-                    except:
-                        continue
+            # Keep the raw HTML so extraction changes can be replayed without re-crawling
+            await asyncio.to_thread(page_archive.store, url, await page.content(), brand_id, product_id)
 
-            # Final Fallback: Full body text
-            if not content_parts:
-                text = await page.evaluate("() => document.body.innerText")
-                lines = [line.strip() for line in text.split('\n') if len(line.strip()) > 20]
-                clean_text = "\n".join(lines)
-                content_parts.append(clean_text)
-            
-            final_text = "\n\n".join(content_parts)
+            image_urls = extracted.images
+            pdf_links = extracted.pdf_links
+            final_text = extracted.text
 
             # 4. Ingest into RAG with rich metadata
-            import json
-            from app.services.rag_service import ingest_document
-            
+            # Images and PDFs go to the Media table once per document (persist
+            # stage); chunks only carry the doc_id it returns
             metadata = {
                 "brand_id": int(brand_id) if brand_id is not None else 0,
                 "brand": brand_name,
@@ -595,14 +526,8 @@ class PABrandsScraper:
                 "source_url": str(url) if url else "",
                 "source": "official_website",
                 "title": title.strip() if title else "Product Page",
-                "images": json.dumps(image_urls[:10]) if image_urls else "[]", 
-                "pdfs": json.dumps(pdf_links[:10]) if pdf_links else "[]",    
             }
-            
-            if image_urls and image_urls[0].get('url'):
-                metadata["image_url"] = str(image_urls[0]['url'])
-            else:
-                metadata["image_url"] = ""
+            image_url = str(image_urls[0]['url']) if image_urls and image_urls[0].get('url') else ""
 
             # Ensure no None values in metadata
             for key, value in metadata.items():
@@ -611,33 +536,57 @@ class PABrandsScraper:
 
             # Only ingest if we have meaningful content OR PDFs
             if len(final_text) > 300 or pdf_links:
-                await ingest_document(final_text, metadata, document_id=url)
-                
-                # 5. Save document record in DB and update product image
-                with Session(engine) as session:
-                    doc = Document(
-                        title=f"Product Page: {url.split('/')[-1]}",
-                        url=url,
-                        brand_id=brand_id,
+                # 5. Save document record in DB and update product image (persist stage, in a thread)
+                def persist(item):
+                    # One row per URL: a re-scrape updates it instead of adding a duplicate
+                    content_hash = hashlib.md5(final_text.encode()).hexdigest()
+                    result = document_registry.upsert(
+                        url,
+                        f"Product Page: {url.split('/')[-1]}",
+                        brand_id,
                         product_id=product_id,
-                        last_updated=datetime.datetime.now()
+                        content_hash=content_hash,
+                        last_updated=datetime.datetime.now(),
+                        force=self.force_rescan,
                     )
-                    session.add(doc)
-                    
-                    # Update product image if not set
-                    if product_id and metadata.get("image_url"):
-                        product = session.exec(select(Product).where(Product.id == product_id)).first()
-                        if product and not product.image_url:
-                            product.image_url = metadata["image_url"]
-                            session.add(product)
-                    
-                    session.commit()
-                
-                logger.info(f"Successfully ingested rich info for product {product_id}")
+                    catalog_writer.record_document(brand_id, url, result.id, content_hash)
+
+                    # Update product image if not set (batched with other catalog writes)
+                    catalog_writer.set_product_image(product_id, image_url)
+                    if not result.changed:
+                        logger.info(f"Skipping {url} - content unchanged")
+                        return None
+                    document_media.replace(result.id, brand_id, product_id, image_urls, pdf_links)
+                    return {"doc_id": int(result.id)}
+
+                async def on_complete(item, error):
+                    # The page is only done once its chunks are stored
+                    if error:
+                        await asyncio.to_thread(frontier.fail, url, error)
+                    else:
+                        await asyncio.to_thread(frontier.complete, url)
+
+                # Chunking and embedding happen in the pipeline; go straight back to scraping
+                await ingestion_pipeline.submit(
+                    PipelineItem(
+                        url=url,
+                        metadata=metadata,
+                        document_id=url,
+                        title=metadata["title"],
+                        text=final_text,
+                        persist=persist,
+                        on_complete=on_complete,
+                    ),
+                    stage="persist",
+                )
+                logger.info(f"Queued rich info for product {product_id}")
+                return PIPELINED
             else:
                 logger.warning(f"Skipping {url} - Insufficient content ({len(final_text)} chars) and no PDFs")
+            return True
         except Exception as e:
             logger.error(f"Error scraping product page {url}: {e}")
+            return False
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,156 @@
+"""
+Content-addressed archive of raw fetched HTML.
+Pages are stored once per SHA-256 (zstd when `zstandard` is installed, gzip
+otherwise) and indexed by URL and fetch time in `page_snapshots`, so
+extraction and chunking changes can be replayed offline without re-crawling.
+Snapshot URLs are normalized like `Document.url`, so a document finds its
+page whatever form of the URL the crawler fetched.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlmodel import Session, select, func
+
+from ..core.database import read_engine
+from ..core.db_writer import db_writer
+from ..models.sql_models import PageSnapshot
+from .document_registry import normalize_url
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_ARCHIVE_DIR = Path("data/page_archive")
+
+
+class PageArchive:
+    """Usage: page_archive.store(url, html, brand_id=...); page_archive.load(sha256)"""
+
+    def __init__(self, archive_dir: Path = PAGE_ARCHIVE_DIR, zstd_level: int = 10):
+        self.archive_dir = Path(archive_dir)
+        self.zstd_level = zstd_level
+        self.stats = {"stored": 0, "deduplicated": 0, "unchanged": 0, "errors": 0}
+
+    @property
+    def extension(self) -> str:
+        return ".html.zst" if zstandard is not None else ".html.gz"
+
+    def _blob_path(self, sha256: str, extension: str) -> Path:
+        return self.archive_dir / sha256[:2] / f"{sha256}{extension}"
+
+    def _find_blob(self, sha256: str) -> Optional[Path]:
+        # Either codec may have written it, depending on what was installed at the time
+        for extension in (".html.zst", ".html.gz"):
+            path = self._blob_path(sha256, extension)
+            if path.exists():
+                return path
+        return None
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _write_blob(self, sha256: str, data: bytes) -> int:
+        """Write the blob if it is new. Returns its size on disk."""
+        existing = self._find_blob(sha256)
+        if existing is not None:
+            self.stats["deduplicated"] += 1
+            return existing.stat().st_size
+        path = self._blob_path(sha256, self.extension)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        compressed = self._compress(data)
+        # Unique per write: crawl threads may archive the same page at once
+        tmp = path.with_name(path.name + f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(compressed)
+        os.replace(tmp, path)
+        return len(compressed)
+
+    def store(self, url: str, html: str, brand_id: Optional[int] = None, product_id: Optional[int] = None) -> Optional[str]:
+        """
+        Archive one fetch. A refetch with identical content only bumps the
+        snapshot's fetch time. Never raises: archiving must not break a crawl.
+
+        Returns:
+            SHA-256 of the HTML, or None if archiving failed
+        """
+        try:
+            url = normalize_url(url)
+            data = html.encode("utf-8", errors="replace")
+            sha256 = hashlib.sha256(data).hexdigest()
+            stored_size = self._write_blob(sha256, data)
+
+            def job(session):
+                latest = session.exec(
+                    select(PageSnapshot).where(PageSnapshot.url == url).order_by(PageSnapshot.id.desc())
+                ).first()
+                if latest and latest.sha256 == sha256:
+                    latest.fetched_at = datetime.utcnow()
+                    session.add(latest)
+                    return "unchanged"
+                session.add(PageSnapshot(
+                    url=url,
+                    sha256=sha256,
+                    brand_id=brand_id,
+                    product_id=product_id,
+                    size=len(data),
+                    stored_size=stored_size,
+                ))
+                return "stored"
+
+            self.stats[db_writer.run(job)] += 1
+            return sha256
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Failed to archive {url}: {e}")
+            return None
+
+    def load(self, sha256: str) -> str:
+        """Return the archived HTML for a content hash."""
+        path = self._find_blob(sha256)
+        if path is None:
+            raise FileNotFoundError(f"No archived page for {sha256}")
+        raw = path.read_bytes()
+        if path.name.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read .zst archive entries")
+            data = zstandard.ZstdDecompressor().decompress(raw)
+        else:
+            data = gzip.decompress(raw)
+        return data.decode("utf-8", errors="replace")
+
+    def latest(self, url: str) -> Optional[PageSnapshot]:
+        """Newest snapshot of a page, by raw or normalized URL."""
+        with Session(read_engine) as session:
+            return session.exec(
+                select(PageSnapshot).where(PageSnapshot.url == normalize_url(url)).order_by(PageSnapshot.id.desc())
+            ).first()
+
+    def latest_snapshots(self, brand_id: Optional[int] = None) -> List[PageSnapshot]:
+        """Newest snapshot of every archived URL, optionally for one brand."""
+        with Session(read_engine) as session:
+            newest = select(func.max(PageSnapshot.id)).group_by(PageSnapshot.url)
+            if brand_id is not None:
+                newest = newest.where(PageSnapshot.brand_id == brand_id)
+            return list(session.exec(select(PageSnapshot).where(PageSnapshot.id.in_(newest))).all())
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self.stats)
+        with Session(read_engine) as session:
+            stats["snapshots"] = session.exec(select(func.count(PageSnapshot.id))).one()
+            stats["urls"] = session.exec(select(func.count(func.distinct(PageSnapshot.url)))).one()
+        return stats
+
+
+# Global archive instance
+page_archive = PageArchive()
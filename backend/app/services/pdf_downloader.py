@@ -0,0 +1,344 @@
+"""
+PDF download manager.
+Shares one aiohttp connection pool with per-host concurrency limits, streams
+bodies to disk in chunks, resumes interrupted downloads with Range requests
+(guarded by If-Range, so a file that changed on the server is fetched again
+rather than spliced) and stores files content-addressed by SHA-256, so a
+manual linked from many products is fetched and stored once.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+PDF_STORE_DIR = Path("data/pdf_store")
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+PDF_MAGIC = b"%PDF"
+
+
+class _PermanentError(Exception):
+    """Download failure that retrying will not fix."""
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    status: str  # "downloaded", "cached" or "failed"
+    sha256: Optional[str] = None
+    path: Optional[str] = None
+    size: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+
+class PDFDownloadManager:
+    """
+    Usage:
+        result = await pdf_downloader.fetch(url)
+        if result.ok:
+            reader = PdfReader(result.path)
+        ...
+        await pdf_downloader.close()   # also writes the URL index
+    """
+
+    def __init__(
+        self,
+        store_dir: Path = PDF_STORE_DIR,
+        max_connections: int = 20,
+        per_host: int = 4,
+        max_bytes: int = 200 * 1024 * 1024,
+        timeout: float = 300,
+        chunk_size: int = 256 * 1024,
+        retries: int = 3,
+    ):
+        self.store_dir = Path(store_dir)
+        self.partial_dir = self.store_dir / "partial"
+        self.index_path = self.store_dir / "url_index.json"
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.retries = retries
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._url_index: Optional[Dict[str, Dict]] = None
+        self._index_dirty = False
+        self._index_lock = asyncio.Lock()
+        self.stats = {"downloaded": 0, "cached": 0, "deduplicated": 0, "resumed": 0, "failed": 0, "bytes": 0}
+
+    # -- storage ---------------------------------------------------------
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.store_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def _partial_path(self, url: str) -> Path:
+        return self.partial_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.part"
+
+    @staticmethod
+    def _validator_path(part: Path) -> Path:
+        """ETag or Last-Modified of the response a partial file was started from."""
+        return part.with_suffix(".validator")
+
+    def _discard(self, part: Path):
+        part.unlink(missing_ok=True)
+        self._validator_path(part).unlink(missing_ok=True)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if self._url_index is None:
+            self._url_index = {}
+            if self.index_path.exists():
+                try:
+                    self._url_index = json.loads(self.index_path.read_text())
+                except Exception as e:
+                    logger.warning(f"Could not read PDF url index, starting fresh: {e}")
+        return self._url_index
+
+    def _save_index(self, index: Dict[str, Dict]):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(index, indent=2))
+        os.replace(tmp, self.index_path)
+
+    async def save_index(self):
+        """Write the URL index if downloads changed it (fetch_many and close() call this)."""
+        async with self._index_lock:
+            if not self._index_dirty:
+                return
+            self._index_dirty = False
+            # Entries are never changed in place, so a shallow copy is a stable snapshot
+            await asyncio.to_thread(self._save_index, dict(self._url_index))
+
+    def lookup(self, url: str) -> Optional[DownloadResult]:
+        """Return the stored copy of `url` without touching the network."""
+        entry = self._load_index().get(url)
+        if entry and self.blob_path(entry["sha256"]).exists():
+            path = self.blob_path(entry["sha256"])
+            return DownloadResult(url=url, status="cached", sha256=entry["sha256"], path=str(path), size=entry.get("size", 0))
+        return None
+
+    def materialize(self, result: DownloadResult, dest_path) -> bool:
+        """Expose a stored blob at `dest_path` (hard link, falling back to a copy)."""
+        if not result.ok:
+            return False
+        dest = Path(dest_path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists():
+            return True
+        try:
+            os.link(result.path, dest)
+        except OSError:
+            shutil.copyfile(result.path, dest)
+        return True
+
+    # -- session ---------------------------------------------------------
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60),
+                headers={"User-Agent": DEFAULT_USER_AGENT},
+            )
+            self._host_limits = {}
+
+    async def close(self):
+        await self.save_index()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._host_limits = {}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    # -- downloads -------------------------------------------------------
+
+    async def fetch(self, url: str, refresh: bool = False) -> DownloadResult:
+        """Download `url` into the store (or return the stored copy)."""
+        if not refresh:
+            cached = self.lookup(url)
+            if cached:
+                self.stats["cached"] += 1
+                return cached
+
+        # Concurrent requests for the same URL share one download
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_with_retries(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def fetch_many(self, urls: Iterable[str]) -> List[DownloadResult]:
+        """Download many URLs concurrently (bounded by the pool and per-host limits)."""
+        results = list(await asyncio.gather(*(self.fetch(url) for url in dict.fromkeys(urls))))
+        await self.save_index()
+        return results
+
+    async def _fetch_with_retries(self, url: str) -> DownloadResult:
+        await self.start()
+        error = None
+        for attempt in range(1, self.retries + 1):
+            try:
+                async with self._host_limit(url):
+                    return await asyncio.wait_for(self._download(url), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                error = f"timed out after {self.timeout}s"
+            except _PermanentError as e:
+                error = str(e)
+                break
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            logger.warning(f"PDF download attempt {attempt}/{self.retries} failed for {url}: {error}")
+            if attempt < self.retries:
+                await asyncio.sleep(2 ** attempt)
+
+        self.stats["failed"] += 1
+        logger.error(f"Failed to download {url}: {error}")
+        return DownloadResult(url=url, status="failed", error=error)
+
+    async def _download(self, url: str) -> DownloadResult:
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        part = self._partial_path(url)
+        validator_path = self._validator_path(part)
+        offset = part.stat().st_size if part.exists() else 0
+        # A partial file is only resumed if the server can tell whether it changed since
+        validator = validator_path.read_text() if offset and validator_path.exists() else None
+        if not validator:
+            offset = 0
+        headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset else {}
+        started = time.monotonic()
+
+        restart = False
+        async with self._session.get(url, headers=headers) as response:
+            content_range = response.headers.get("Content-Range", "")
+            if response.status == 416 and offset and content_range == f"bytes */{offset}":
+                # Nothing left to fetch: the partial file is complete
+                pass
+            elif response.status == 206 and offset and content_range.startswith(f"bytes {offset}-"):
+                self.stats["resumed"] += 1
+                logger.info(f"Resuming {url} at {offset} bytes")
+                await self._stream(response, part, "ab", offset)
+            elif response.status == 200:
+                # Also the answer to an If-Range that no longer matches
+                if offset:
+                    logger.info(f"{url} changed since its partial download, starting over")
+                offset = 0
+                validator = self._response_validator(response)
+                if validator:
+                    validator_path.write_text(validator)
+                else:
+                    validator_path.unlink(missing_ok=True)
+                await self._stream(response, part, "wb", 0)
+            elif response.status in (206, 416) and offset:
+                # The range doesn't line up with the file on the server
+                restart = True
+            elif response.status in (404, 410):
+                raise _PermanentError(f"status {response.status}")
+            else:
+                raise RuntimeError(f"status {response.status}")
+
+        if restart:
+            logger.info(f"Discarding partial download of {url} ({content_range or response.status})")
+            self._discard(part)
+            return await self._download(url)
+
+        result = await self._finalize(url, part)
+        logger.info(f"Downloaded {url} ({result.size} bytes) in {time.monotonic() - started:.1f}s")
+        return result
+
+    @staticmethod
+    def _response_validator(response: aiohttp.ClientResponse) -> Optional[str]:
+        """If-Range value for resuming this response: a strong ETag, else Last-Modified."""
+        etag = response.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return response.headers.get("Last-Modified")
+
+    async def _stream(self, response: aiohttp.ClientResponse, part: Path, mode: str, offset: int):
+        length = response.content_length
+        if length is not None and offset + length > self.max_bytes:
+            raise _PermanentError(f"too large ({offset + length} bytes > {self.max_bytes})")
+
+        written = offset
+        with open(part, mode) as f:
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                written += len(chunk)
+                if written > self.max_bytes:
+                    f.close()
+                    part.unlink(missing_ok=True)
+                    raise _PermanentError(f"exceeded {self.max_bytes} bytes")
+                f.write(chunk)
+        self.stats["bytes"] += written - offset
+
+    async def _finalize(self, url: str, part: Path) -> DownloadResult:
+        """Hash the completed file (in a thread) and move it into the content-addressed store."""
+        sha256, size, deduplicated = await asyncio.to_thread(self._store, part)
+        self.stats["deduplicated"] += deduplicated
+        self.stats["downloaded"] += 1
+        self._load_index()[url] = {"sha256": sha256, "size": size, "fetched_at": time.time()}
+        self._index_dirty = True
+        return DownloadResult(url=url, status="downloaded", sha256=sha256, path=str(self.blob_path(sha256)), size=size)
+
+    def _store(self, part: Path) -> Tuple[str, int, bool]:
+        """(sha256, size, already stored) of a completed partial file, which is moved or dropped."""
+        digest = hashlib.sha256()
+        size = 0
+        with open(part, "rb") as f:
+            head = f.read(len(PDF_MAGIC))
+            f.seek(0)
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+                size += len(block)
+        self._validator_path(part).unlink(missing_ok=True)
+
+        if head != PDF_MAGIC:
+            part.unlink(missing_ok=True)
+            raise _PermanentError("response is not a PDF")
+
+        sha256 = digest.hexdigest()
+        blob = self.blob_path(sha256)
+        if blob.exists():
+            part.unlink(missing_ok=True)
+            return sha256, size, True
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(part, blob)
+        return sha256, size, False
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["urls_indexed"] = len(self._load_index())
+        return stats
+
+
+# Global download manager
+pdf_downloader = PDFDownloadManager()
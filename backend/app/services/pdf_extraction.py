@@ -0,0 +1,239 @@
+"""
+Parallel PDF text extraction.
+Pages are extracted in batches on a ProcessPoolExecutor and yielded in page
+order as (page_number, text), so large manuals are chunked incrementally
+instead of being joined into one string on the event loop. PyMuPDF is used
+when installed, then pdfplumber, then pypdf. Cleaned pages are cached by
+file hash, so unchanged PDFs are only parsed once.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+from .extraction_cache import extraction_cache, sha256_file
+
+logger = logging.getLogger(__name__)
+
+# Fastest first
+BACKEND_PREFERENCE = ["pymupdf", "pdfplumber", "pypdf"]
+
+# Bump when cleaning or extraction output changes, to invalidate cached text
+EXTRACTOR_VERSION = "1"
+
+
+def _import_pymupdf():
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf  # Older releases only ship the fitz name
+    return pymupdf
+
+
+def _backend_available(backend: str) -> bool:
+    try:
+        if backend == "pymupdf":
+            _import_pymupdf()
+        elif backend == "pdfplumber":
+            import pdfplumber  # noqa: F401
+        elif backend == "pypdf":
+            import pypdf  # noqa: F401
+        else:
+            return False
+        return True
+    except ImportError:
+        return False
+
+
+def available_backends() -> List[str]:
+    return [backend for backend in BACKEND_PREFERENCE if _backend_available(backend)]
+
+
+def count_pages(path: str, backend: str) -> int:
+    if backend == "pymupdf":
+        with _import_pymupdf().open(path) as doc:
+            return doc.page_count
+    if backend == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _extract_with(backend: str, path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    pages = []
+    if backend == "pymupdf":
+        with _import_pymupdf().open(path) as doc:
+            for index in range(start, end):
+                pages.append((index + 1, doc.load_page(index).get_text("text") or ""))
+    elif backend == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            for index in range(start, end):
+                pages.append((index + 1, pdf.pages[index].extract_text() or ""))
+    else:
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        for index in range(start, end):
+            pages.append((index + 1, reader.pages[index].extract_text() or ""))
+    return pages
+
+
+def read_outline(path: str, backend: str) -> List[Tuple[int, str, int]]:
+    """PDF bookmarks as (level, title, page_number); empty if there are none."""
+    if backend == "pymupdf":
+        with _import_pymupdf().open(path) as doc:
+            return [(int(level), title.strip(), int(page)) for level, title, page, *_ in doc.get_toc()]
+    if backend == "pypdf":
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        outline = []
+
+        def walk(items, level):
+            for item in items:
+                if isinstance(item, list):
+                    walk(item, level + 1)
+                    continue
+                try:
+                    page = reader.get_destination_page_number(item) + 1
+                except Exception:
+                    page = 0
+                outline.append((level, str(item.title).strip(), page))
+
+        walk(reader.outline, 1)
+        return outline
+    return []  # pdfplumber doesn't expose bookmarks
+
+
+def clean_page_text(text: str) -> str:
+    """Collapse runs of spaces and blank lines left by PDF layout."""
+    text = re.sub(r"[ \t\xa0]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def extract_page_range(path: str, start: int, end: int, backends: List[str]) -> List[Tuple[int, str]]:
+    """Extract pages [start, end) in a worker process, falling back across backends."""
+    last_error = None
+    for backend in backends:
+        try:
+            return [(page_no, clean_page_text(text)) for page_no, text in _extract_with(backend, path, start, end)]
+        except Exception as e:
+            last_error = e
+    raise RuntimeError(f"All PDF backends failed for {path} pages {start + 1}-{end}: {last_error}")
+
+
+class PDFExtractor:
+    """
+    Usage:
+        async for page_no, text in pdf_extractor.iter_pages(path, sha256=known_hash):
+            ...
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, pages_per_task: int = 16):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.pages_per_task = pages_per_task
+        self.backends = available_backends()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if not self.backends:
+            logger.warning("No PDF backend installed (pymupdf, pdfplumber or pypdf)")
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def page_count(self, path) -> int:
+        if not self.backends:
+            raise RuntimeError("No PDF backend installed (pymupdf, pdfplumber or pypdf)")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, count_pages, str(path), self.backends[0])
+
+    @property
+    def version(self) -> str:
+        """
+        Cache key component: the backend chain plus the extractor version.
+        Any page range may have fallen back to a later backend, so the entry
+        depends on the whole chain, not only the first.
+        """
+        backends = "+".join(self.backends) or "none"
+        return f"pdf-{backends}-v{EXTRACTOR_VERSION}"
+
+    async def iter_pages(self, path, sha256: Optional[str] = None, use_cache: bool = True) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) in order. Served from the extraction cache when
+        the file hash and extractor version match; otherwise extracted on the
+        pool and cached once the whole document has been read.
+        """
+        if not use_cache:
+            async for page in self._extract_pages(path):
+                yield page
+            return
+
+        if sha256 is None:
+            sha256 = await asyncio.to_thread(sha256_file, path)
+        cached = extraction_cache.get_pages(sha256, self.version)
+        if cached is not None:
+            for page in cached:
+                yield page
+            return
+
+        pages = []
+        async for page in self._extract_pages(path):
+            pages.append(page)
+            yield page
+        extraction_cache.put(sha256, self.version, pages, meta={"source": str(path), "page_count": len(pages)})
+
+    async def _extract_pages(self, path) -> AsyncIterator[Tuple[int, str]]:
+        """Extract on the pool, keeping a bounded number of batches in flight."""
+        path = str(path)
+        total = await self.page_count(path)
+        loop = asyncio.get_running_loop()
+        ranges = [(start, min(start + self.pages_per_task, total)) for start in range(0, total, self.pages_per_task)]
+
+        window = self.max_workers * 2
+        pending: List[asyncio.Future] = []
+        next_range = 0
+        try:
+            while next_range < len(ranges) or pending:
+                while next_range < len(ranges) and len(pending) < window:
+                    start, end = ranges[next_range]
+                    pending.append(loop.run_in_executor(self.executor, extract_page_range, path, start, end, self.backends))
+                    next_range += 1
+                for page in await pending.pop(0):
+                    yield page
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def outline(self, path) -> List[Tuple[int, str, int]]:
+        """Bookmarks (level, title, page) from the first backend that can read them."""
+        for backend in self.backends:
+            try:
+                outline = await asyncio.to_thread(read_outline, str(path), backend)
+            except Exception as e:
+                logger.debug(f"{backend} could not read the outline of {path}: {e}")
+                continue
+            if outline:
+                return outline
+        return []
+
+    async def extract_text(self, path, sha256: Optional[str] = None) -> str:
+        """Whole-document text, for callers that still need a single string."""
+        parts = [text async for _, text in self.iter_pages(path, sha256=sha256) if text.strip()]
+        return "\n\n".join(parts).strip()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+# Global extractor (worker processes start lazily)
+pdf_extractor = PDFExtractor()
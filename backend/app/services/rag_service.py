@@ -1,10 +1,15 @@
 import os
-from ..core.vector_db import get_collection
+import asyncio
 from ..core.config import settings
 from .prompt_manager import prompt_manager
-from ..core.database import get_session
+from .vector_router import vector_router
+from .document_media import document_media
+from .near_duplicates import near_duplicates
+from .chunking import HIERARCHICAL, STRUCTURED, Chunk, StructuredSplitter, split_hierarchical, split_text
+from ..core.database import async_engine
 from ..models.sql_models import Product, ProductFamily, Brand
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 import uuid
 # Note: google.generativeai is deprecated, but langchain still uses it internally
 # The warning is safe to ignore for now as langchain handles the migration
@@ -16,8 +21,6 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=settings.GEMINI_API_KEY)
 llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=settings.GEMINI_API_KEY)
 
-collection = get_collection()
-
 import hashlib
 
 def generate_chunk_id(content: str, url: str, index: int) -> str:
@@ -58,49 +61,179 @@ async def ingest_document(text: str, metadata: dict, document_id: str = None):
     Split text into chunks and store in vector DB.
     Uses deterministic IDs to prevent duplicates.
     """
+    try:
+        return store_document_chunks(text, metadata, document_id)
+    except Exception as e:
+        print(f"[INGEST] Error upserting to ChromaDB: {e}")
+        return 0
+
+def store_document_chunks(text: str, metadata: dict, document_id: str = None) -> int:
+    """
+    Synchronous body of ingest_document: chunk, embed and upsert.
+    Blocking, so the ingestion pipeline runs it in a worker thread.
+    Raises if the chunks could not be stored, so the caller can retry.
+    """
+    chunks, clean_metadatas, ids = build_chunks(text, metadata, document_id)
+    if not chunks:
+        return 0
+
+    # Near-duplicates of the brand's stored chunks are referenced, not embedded again
+    plan = near_duplicates.plan(chunks, clean_metadatas, ids)
+    if plan.chunks:
+        vector_router.upsert(
+            documents=plan.chunks,
+            metadatas=plan.metadatas,
+            ids=plan.ids
+        )
+    near_duplicates.commit(plan)
+    return len(chunks)
+
+def build_chunks(text: str, metadata: dict, document_id: str = None) -> tuple[list, list, list]:
+    """
+    Quality-check and split a document into (chunks, metadatas, ids), without
+    storing anything. Empty lists if the document is rejected.
+    """
     # Quality check: Skip if text is too short
     if len(text.strip()) < 50:
         print(f"[INGEST] Skipping document: Content too short ({len(text)} chars)")
-        return 0
+        return [], [], []
 
     # Language check: Skip if not English
     if not is_english(text):
         print(f"[INGEST] Skipping document: Not detected as English (Title: {metadata.get('title', 'Unknown')})")
-        return 0
+        return [], [], []
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500,
-        chunk_overlap=200,
-        length_function=len,
-    )
-    
-    chunks = text_splitter.split_text(text)
-    
     # Generate deterministic IDs
     base_id = document_id or metadata.get("source_url", "unknown")
+    split = split_text(text, base_id)
+    chunks = [chunk.text for chunk in split]
     ids = [generate_chunk_id(chunk, base_id, i) for i, chunk in enumerate(chunks)]
     
     # Ensure metadata has required fields and valid types
     clean_metadatas = []
-    for _ in chunks:
+    for chunk in split:
         # Create a copy to avoid modifying the original for all chunks
-        clean_meta = metadata.copy()
+        clean_meta = {**metadata, **chunk.metadata}
         # Convert any non-primitive types to string for ChromaDB
         for k, v in clean_meta.items():
             if not isinstance(v, (str, int, float, bool)) and v is not None:
                 clean_meta[k] = str(v)
         clean_metadatas.append(clean_meta)
     
-    try:
-        collection.upsert(
-            documents=chunks,
-            metadatas=clean_metadatas,
-            ids=ids
-        )
-        return len(chunks)
-    except Exception as e:
-        print(f"[INGEST] Error upserting to ChromaDB: {e}")
+    return chunks, clean_metadatas, ids
+
+async def ingest_document_pages(pages, metadata: dict, document_id: str = None, batch_size: int = 64, outline: list = None):
+    """
+    Chunk and store a paged document (e.g. a PDF) incrementally.
+    `pages` is an async iterable of (page_number, text). Pages are buffered
+    until they fill a chunk, and every chunk records the page range it came
+    from in `page_start` / `page_end`.
+    In "structured" chunking mode, `outline` (PDF bookmarks as (level, title,
+    page)) marks section headings, and the section path carries across pages.
+    In "hierarchical" mode each buffer is cut into parents and children, with
+    parents numbered across the whole document.
+    Batches are embedded and stored off the event loop.
+    Returns the number of chunks stored (0 if the document was rejected);
+    raises if a batch could not be stored, so the caller doesn't record the
+    partially indexed document as up to date.
+    """
+    chunk_size = 1500
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=200,
+        length_function=len,
+    )
+    structured = StructuredSplitter(outline=outline) if settings.CHUNKING_MODE == STRUCTURED else None
+    hierarchical = settings.CHUNKING_MODE == HIERARCHICAL
+    # Structured chunks and parents end at buffer boundaries too, so buffer several chunks' worth
+    buffer_size = chunk_size * 4 if structured or hierarchical else chunk_size
+    base_id = document_id or metadata.get("source_url", "unknown")
+
+    base_meta = metadata.copy()
+    for k, v in base_meta.items():
+        if not isinstance(v, (str, int, float, bool)) and v is not None:
+            base_meta[k] = str(v)
+
+    chunk_index = 0
+    parent_index = 0
+    stored = 0
+    total_chars = 0
+    checked_language = False
+    buffer, buffer_start, buffer_end = [], None, None
+    batch_docs, batch_metas, batch_ids = [], [], []
+
+    def store_batch(docs, metas, ids, replace_references):
+        plan = near_duplicates.plan(docs, metas, ids, replace_references=replace_references)
+        if plan.chunks:
+            vector_router.upsert(documents=plan.chunks, metadatas=plan.metadatas, ids=plan.ids)
+        near_duplicates.commit(plan)
+
+    async def flush_batch():
+        nonlocal stored
+        if not batch_docs:
+            return
+        docs, metas, ids = list(batch_docs), list(batch_metas), list(batch_ids)
+        batch_docs.clear()
+        batch_metas.clear()
+        batch_ids.clear()
+        try:
+            # The first batch replaces the document's old near-duplicate references
+            await asyncio.to_thread(store_batch, docs, metas, ids, not stored)
+        except Exception as e:
+            print(f"[INGEST] Error upserting to ChromaDB: {e}")
+            raise
+        stored += len(docs)
+
+    async def split_buffer():
+        nonlocal chunk_index, parent_index
+        text = "\n\n".join(buffer)
+        if structured:
+            chunks = structured.split(text)
+        elif hierarchical:
+            chunks = split_hierarchical(text, base_id, first_parent=parent_index)
+            parent_index += len({chunk.metadata["parent_id"] for chunk in chunks})
+        else:
+            chunks = [Chunk(chunk) for chunk in text_splitter.split_text(text)]
+        for chunk in chunks:
+            batch_docs.append(chunk.text)
+            batch_metas.append({**base_meta, **chunk.metadata, "page_start": buffer_start, "page_end": buffer_end})
+            batch_ids.append(generate_chunk_id(chunk.text, base_id, chunk_index))
+            chunk_index += 1
+        buffer.clear()
+        if len(batch_docs) >= batch_size:
+            await flush_batch()
+
+    async for page_no, page_text in pages:
+        page_text = (page_text or "").strip()
+        if not page_text:
+            continue
+        if not buffer:
+            buffer_start = page_no
+        buffer.append(page_text)
+        buffer_end = page_no
+        total_chars += len(page_text)
+
+        if sum(len(part) for part in buffer) >= buffer_size:
+            # Language check on the first full buffer, before anything is stored
+            if not checked_language:
+                checked_language = True
+                if not is_english("\n".join(buffer)):
+                    print(f"[INGEST] Skipping document: Not detected as English (Title: {metadata.get('title', 'Unknown')})")
+                    return 0
+            await split_buffer()
+
+    # Quality checks for documents shorter than one chunk
+    if total_chars < 50:
+        print(f"[INGEST] Skipping document: Content too short ({total_chars} chars)")
         return 0
+    if not checked_language and not is_english("\n".join(buffer)):
+        print(f"[INGEST] Skipping document: Not detected as English (Title: {metadata.get('title', 'Unknown')})")
+        return 0
+
+    if buffer:
+        await split_buffer()
+    await flush_batch()
+    return stored
 
 def extract_product_model(question: str) -> str:
     """
@@ -114,9 +247,54 @@ def extract_product_model(question: str) -> str:
         return match.group(1)
     return None
 
-async def ask_question(question: str, brand_id: int = None, is_first_message: bool = False, history: list[dict] = [], product_id: int = None):
+async def expand_context(docs: list, metas: list) -> tuple[list, list]:
+    """
+    Small-to-big: collapse child-chunk hits (hierarchical chunking) onto their
+    parents, keep the top settings.CHUNK_CONTEXT_PARENTS and expand each into
+    the full parent or the window around its matched children. Flat chunks
+    count as their own unit. No-op when no hit has a parent.
+    """
+    if not any(meta.get('parent_id') for meta in metas):
+        return docs, metas
+
+    units = {}  # key -> [doc, meta, matched child indexes], in rank order
+    for i, (doc, meta) in enumerate(zip(docs, metas)):
+        key = meta.get('parent_id') or f"chunk-{i}"
+        if key in units:
+            units[key][2].add(int(meta.get('child_index') or 0))
+        elif len(units) < settings.CHUNK_CONTEXT_PARENTS:
+            units[key] = [doc, meta, {int(meta.get('child_index') or 0)}]
+
+    children = await vector_router.children([meta for _, meta, _ in units.values()])
+    expanded_docs, expanded_metas = [], []
+    for key, (doc, meta, matched) in units.items():
+        parts = children.get(meta.get('parent_id')) or []
+        if settings.CHUNK_CONTEXT_EXPANSION == "window":
+            parts = [(index, text) for index, text in parts if any(abs(index - m) <= 1 for m in matched)]
+        if parts:
+            # Adjacent children join directly; skipped ones leave a gap marker
+            doc = parts[0][1]
+            for (previous, _), (index, text) in zip(parts, parts[1:]):
+                doc += ("\n" if index == previous + 1 else "\n...\n") + text
+        expanded_docs.append(doc)
+        expanded_metas.append(meta)
+    return expanded_docs, expanded_metas
+
+def _legacy_chunk_media(meta: dict) -> tuple[list, list]:
+    """Images and PDFs JSON-encoded in chunks ingested before the Media side table."""
+    import json
+    media = []
+    for key in ("images", "pdfs"):
+        try:
+            value = meta.get(key) or "[]"
+            media.append(json.loads(value) if isinstance(value, str) else value)
+        except: media.append([])
+    return media[0], media[1]
+
+async def ask_question(question: str, brand_id: int = None, is_first_message: bool = False, history: list[dict] = [], product_id: int = None, vector_backend: str = None):
     """
     Retrieve context and generate answer using Gemini.
+    `vector_backend` ("chroma" or "compact") overrides settings.VECTOR_BACKEND for this question.
     """
     # 1. Query Vector DB
     # Detect if the user is asking for a comparison or general brand info
@@ -128,44 +306,37 @@ async def ask_question(question: str, brand_id: int = None, is_first_message: bo
     print(f"[RAG DEBUG] Extracted product model: {product_model}")
     print(f"[RAG DEBUG] Brand ID: {brand_id}")
     
-    query_params = {
-        "query_texts": [question],
-        "n_results": 15  # Increased from 10 to get more context
-    }
+    n_results = 15  # Increased from 10 to get more context
     
     where_clause = {}
+    brand_name = None
     
-    # If we found a product model in the question, prioritize that
-    if product_model and not is_comparison:
-        # First try: query with product model filter (using brand metadata, not brand_id)
-        session = next(get_session())
-        if brand_id:
+    # Brand-scoped questions search only that brand's partition (see vector_router)
+    if brand_id:
+        async with AsyncSession(async_engine) as session:
             statement = select(Brand).where(Brand.id == brand_id)
-            brand = session.exec(statement).first()
-            if brand:
-                where_clause["brand"] = brand.name
-                # Note: We'll do a post-filter for product name since ChromaDB doesn't support partial matching well
-    elif brand_id:
-        # Use brand name from database
-        session = next(get_session())
-        statement = select(Brand).where(Brand.id == brand_id)
-        brand = session.exec(statement).first()
+            brand = (await session.exec(statement)).first()
         if brand:
-            where_clause["brand"] = brand.name
+            brand_name = brand.name
+        # With a product model in the question we post-sort by product name below,
+        # since ChromaDB doesn't support partial matching well
     
     # Only filter by product_id if it's NOT a comparison question
+    shared_chunks = {}
+    shared_ids = {}
     if product_id and not is_comparison:
         where_clause["product_id"] = product_id
-        
-    if where_clause:
-        if len(where_clause) > 1:
-            query_params["where"] = {"$and": [{k: v} for k, v in where_clause.items()]}
-        else:
-            query_params["where"] = where_clause
+        # Chunks stored once for several products (near-duplicates) carry another product's id
+        try:
+            shared_chunks = await asyncio.to_thread(near_duplicates.shared_with_product, product_id, brand_id)
+        except Exception as e:
+            print(f"Error loading shared chunks for product {product_id}: {e}")
+        for chunk_id, chunk_brand_id in shared_chunks.items():
+            shared_ids.setdefault(chunk_brand_id, []).append(chunk_id)
         
     # Check if collection has documents to avoid ChromaDB errors on empty collections
     try:
-        count = collection.count()
+        count = await asyncio.to_thread(vector_router.count, brand_id)
     except Exception as e:
         print(f"Error accessing ChromaDB: {e}")
         count = 0
@@ -176,8 +347,16 @@ async def ask_question(question: str, brand_id: int = None, is_first_message: bo
         results = {'metadatas': [[]]}
     else:
         try:
-            # Use a more robust query approach
-            results = collection.query(**query_params)
+            # Scoped: one partition. Unscoped: concurrent fan-out across partitions, merged
+            results = await vector_router.query(
+                question,
+                n_results=n_results,
+                brand_id=brand_id,
+                brand_name=brand_name,
+                where=where_clause,
+                backend=vector_backend,
+                include_ids=shared_ids,
+            )
             context_docs = results['documents'][0] if results['documents'] else []
             context_metas = results['metadatas'][0] if results['metadatas'] else []
             
@@ -191,6 +370,11 @@ async def ask_question(question: str, brand_id: int = None, is_first_message: bo
                 results['documents'][0] = context_docs
                 results['metadatas'][0] = context_metas
             
+            # Hierarchical chunks: a few expanded parents instead of 15 chunks
+            context_docs, context_metas = await expand_context(context_docs, context_metas)
+            results['documents'][0] = context_docs
+            results['metadatas'][0] = context_metas
+            
             context_text = "\n\n".join([f"--- Context {i+1} ---\n{doc}" for i, doc in enumerate(context_docs)])
         except Exception as e:
             print(f"CRITICAL: ChromaDB query failed: {e}")
@@ -204,9 +388,9 @@ async def ask_question(question: str, brand_id: int = None, is_first_message: bo
     intent = prompt_manager.determine_intent(question)
     if intent == "list_products" and brand_id:
         try:
-            session = next(get_session())
-            statement = select(Product).join(ProductFamily).where(ProductFamily.brand_id == brand_id)
-            products = session.exec(statement).all()
+            async with AsyncSession(async_engine) as session:
+                statement = select(Product).join(ProductFamily).where(ProductFamily.brand_id == brand_id)
+                products = (await session.exec(statement)).all()
             
             if products:
                 product_list_text = "### AVAILABLE PRODUCTS (from database):\n"
@@ -264,42 +448,47 @@ async def ask_question(question: str, brand_id: int = None, is_first_message: bo
     if product_id:
         sources = sorted(sources, key=lambda x: x.get('product_id') == product_id, reverse=True)
 
+    # Page media lives in the Media table keyed by document: one lookup for all sources
+    media_by_doc = {}
+    doc_ids = [meta['doc_id'] for meta in sources if meta.get('doc_id')]
+    if doc_ids:
+        try:
+            async with AsyncSession(async_engine) as session:
+                media_by_doc = await document_media.for_documents(session, doc_ids)
+        except Exception as e:
+            print(f"Error fetching document media: {e}")
+
     for meta in sources:
+        doc_media = media_by_doc.get(int(meta['doc_id'])) if meta.get('doc_id') else None
+        if doc_media is not None:
+            imgs, pdfs = doc_media["images"], doc_media["pdfs"]
+        else:
+            imgs, pdfs = _legacy_chunk_media(meta)
+
         # Handle images
-        if 'images' in meta:
-            import json
-            try:
-                imgs = json.loads(meta['images']) if isinstance(meta['images'], str) else meta['images']
-                for img in imgs:
-                    if img['url'] not in seen_images:
-                        # Basic relevance check for images
-                        if any(kw in img.get('alt', '').lower() or kw in img['url'].lower() for kw in ['product', 'hero', 'main', 'gallery', 'large']):
-                            all_images.append(img)
-                            seen_images.add(img['url'])
-            except: pass
-        elif 'image_url' in meta and meta['image_url']:
-            if meta['image_url'] not in seen_images:
-                all_images.append({"url": meta['image_url'], "alt": "Product Image"})
-                seen_images.add(meta['image_url'])
-                
+        for img in imgs:
+            if img['url'] not in seen_images:
+                # Basic relevance check for images
+                if any(kw in img.get('alt', '').lower() or kw in img['url'].lower() for kw in ['product', 'hero', 'main', 'gallery', 'large']):
+                    all_images.append(img)
+                    seen_images.add(img['url'])
+        if not imgs and meta.get('image_url') and meta['image_url'] not in seen_images:
+            all_images.append({"url": meta['image_url'], "alt": "Product Image"})
+            seen_images.add(meta['image_url'])
+
         # Handle PDFs
-        if 'pdfs' in meta:
-            import json
-            try:
-                pdfs = json.loads(meta['pdfs']) if isinstance(meta['pdfs'], str) else meta['pdfs']
-                for pdf in pdfs:
-                    if pdf['url'] not in seen_pdfs:
-                        # Filter for English manuals
-                        title = pdf.get('title', '').upper()
-                        url_upper = pdf['url'].upper()
-                        
-                        is_english = any(kw in title or kw in url_upper for kw in ["ENGLISH", " EN ", "_EN", "MANUAL", "USER GUIDE", "DATASHEET"])
-                        is_other_lang = any(kw in title for kw in ["FRENCH", "GERMAN", "ITALIAN", "SPANISH", "CHINESE", "FRANCAIS", "DEUTSCH", "ITALIANO", "ESPANOL"])
-                        
-                        if is_english or not is_other_lang:
-                            all_pdfs.append(pdf)
-                            seen_pdfs.add(pdf['url'])
-            except: pass
+        for pdf in pdfs:
+            if pdf['url'] not in seen_pdfs:
+                # Filter for English manuals
+                title = pdf.get('title', '').upper()
+                url_upper = pdf['url'].upper()
+
+                is_english = any(kw in title or kw in url_upper for kw in ["ENGLISH", " EN ", "_EN", "MANUAL", "USER GUIDE", "DATASHEET"])
+                is_other_lang = any(kw in title for kw in ["FRENCH", "GERMAN", "ITALIAN", "SPANISH", "CHINESE", "FRANCAIS", "DEUTSCH", "ITALIANO", "ESPANOL"])
+
+                if is_english or not is_other_lang:
+                    all_pdfs.append(pdf)
+                    seen_pdfs.add(pdf['url'])
 
     # Extract Brand Logos
     brand_logos = []
@@ -319,10 +508,10 @@ async def ask_question(question: str, brand_id: int = None, is_first_message: bo
             
     if seen_brands:
         try:
-            session = next(get_session())
-            # Convert set to list for SQLModel
-            statement = select(Brand).where(Brand.id.in_(list(seen_brands)))
-            brands = session.exec(statement).all()
+            async with AsyncSession(async_engine) as session:
+                # Convert set to list for SQLModel
+                statement = select(Brand).where(Brand.id.in_(list(seen_brands)))
+                brands = (await session.exec(statement)).all()
             for b in brands:
                 if b.logo_url:
                     brand_logos.append({"name": b.name, "url": b.logo_url})
@@ -1,12 +1,15 @@
 import asyncio
-from playwright.async_api import async_playwright
 import logging
 from .rag_service import ingest_document
+from .document_registry import document_registry
+from .document_media import document_media
+from ..engines.browser_pool import browser_pool
+from ..engines.readiness import wait_until_ready, scroll_until_stable
+from ..engines.network_capture import capture_catalogue
 from ..core.database import Session, engine
 from ..models.sql_models import Brand, Product, ProductFamily, Document
 from sqlmodel import select
 import datetime
-import json
 import re
 
 logging.basicConfig(level=logging.INFO)
@@ -18,37 +21,28 @@ class RCFCatalogueScraper:
         self.start_url = "https://www.halilit.com/g/5193-%D7%99%D7%A6%D7%A8%D7%9F/33208-Rcf"
 
     async def run(self):
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-            
-            with Session(engine) as session:
-                brand = session.exec(select(Brand).where(Brand.name.ilike('%rcf%'))).first()
-                if not brand:
-                    logger.error("RCF brand not found in DB.")
-                    return
+        with Session(engine) as session:
+            brand = session.exec(select(Brand).where(Brand.name.ilike('%rcf%'))).first()
+            if not brand:
+                logger.error("RCF brand not found in DB.")
+                return
 
-                page = await context.new_page()
+            async with browser_pool.page() as page:
                 logger.info(f"Starting RCF catalogue scrape from {self.start_url}")
                 
-                try:
-                    await page.goto(self.start_url, wait_until='networkidle', timeout=90000)
+                # Prefer product records from the grid's JSON API
+                records = await capture_catalogue(page, self.start_url, "halilit")
+                product_links = {record.url for record in records}
+                
+                if not product_links:
+                    logger.info("No listing API captured, falling back to scrolling the grid")
+                    await wait_until_ready(page, "rcf_catalogue")
                     
-                    # Scroll down multiple times to load all products
-                    last_height = await page.evaluate("document.body.scrollHeight")
-                    for i in range(20):
-                        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                        await asyncio.sleep(2)
-                        new_height = await page.evaluate("document.body.scrollHeight")
-                        if new_height == last_height:
-                            break
-                        last_height = new_height
-                        logger.info(f"Scrolled {i+1} times...")
+                    # Scroll until no more products load
+                    scrolls = await scroll_until_stable(page, "a[href*='/items/']", max_scrolls=20, label="rcf_catalogue_scroll")
+                    logger.info(f"Scrolled {scrolls} times...")
                     
                     # Find all product links
-                    product_links = set()
                     links = await page.query_selector_all("a")
                     for link in links:
                         href = await link.get_attribute("href")
@@ -57,27 +51,22 @@ class RCFCatalogueScraper:
                             if not href.startswith('http'):
                                 href = self.base_url + href
                             product_links.add(href)
-                    
-                    logger.info(f"Found {len(product_links)} unique RCF products")
+                
+                logger.info(f"Found {len(product_links)} unique RCF products")
 
-                    # Scrape each product
-                    for i, url in enumerate(list(product_links)):
-                        # Check if already ingested
-                        existing_doc = session.exec(select(Document).where(Document.url == url)).first()
-                        if existing_doc:
-                            logger.info(f"[{i+1}/{len(product_links)}] Skipping already ingested: {url}")
-                            continue
+                # Scrape each product
+                for i, url in enumerate(list(product_links)):
+                    # Check if already ingested
+                    existing_doc = document_registry.get(url, session)
+                    if existing_doc:
+                        logger.info(f"[{i+1}/{len(product_links)}] Skipping already ingested: {url}")
+                        continue
 
-                        logger.info(f"[{i+1}/{len(product_links)}] Processing RCF product: {url}")
-                        try:
-                            await self.scrape_product(page, url, brand, session)
-                        except Exception as e:
-                            logger.error(f"Error processing product {url}: {e}")
-                            
-                finally:
-                    await page.close()
-            
-            await browser.close()
+                    logger.info(f"[{i+1}/{len(product_links)}] Processing RCF product: {url}")
+                    try:
+                        await self.scrape_product(page, url, brand, session)
+                    except Exception as e:
+                        logger.error(f"Error processing product {url}: {e}")
 
     async def scrape_product(self, page, url, brand, session):
         await page.goto(url, wait_until='networkidle', timeout=60000)
@@ -137,29 +126,31 @@ class RCFCatalogueScraper:
         lines = [line.strip() for line in text.split('\n') if len(line.strip()) > 20]
         clean_text = "\n".join(lines)
 
-        # Ingest into RAG
+        # Save document record (updates the row on re-scrape) and its media
+        result = document_registry.upsert(
+            url,
+            f"Halilit Product: {name}",
+            brand.id,
+            product_id=product.id,
+            last_updated=datetime.datetime.now()
+        )
+        document_media.replace(result.id, brand.id, product.id, image_urls, pdf_links)
+
+        # Ingest into RAG; chunks reference the document's media by doc_id
         await ingest_document(clean_text, {
             "brand_id": brand.id,
             "product_id": product.id,
             "url": url,
             "source": "halilit_website",
-            "images": json.dumps(image_urls[:10]),
-            "pdfs": json.dumps(pdf_links[:10]),
-            "image_url": image_urls[0]['url'] if image_urls else None
+            "doc_id": int(result.id),
         })
-        
-        # Save document record
-        doc = Document(
-            title=f"Halilit Product: {name}",
-            url=url,
-            brand_id=brand.id,
-            product_id=product.id,
-            last_updated=datetime.datetime.now()
-        )
-        session.add(doc)
-        session.commit()
         logger.info(f"Successfully ingested {name}")
 
 if __name__ == "__main__":
-    scraper = RCFCatalogueScraper()
-    asyncio.run(scraper.run())
+    async def main():
+        try:
+            await RCFCatalogueScraper().run()
+        finally:
+            await browser_pool.stop()
+
+    asyncio.run(main())
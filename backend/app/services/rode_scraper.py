@@ -2,6 +2,7 @@ import asyncio
 from playwright.async_api import async_playwright
 import logging
 from .rag_service import ingest_document
+from .document_registry import document_registry
 from ..core.database import Session, engine
 from ..models.sql_models import Brand, Product, ProductFamily, Document
 from sqlmodel import select
@@ -112,17 +113,14 @@ class RodeScraper:
                 "image_url": product_image or (image_data[0]['url'] if image_data else None)
             })
             
-            # Save document record in DB
-            with Session(engine) as session:
-                doc = Document(
-                    title=f"User Guide: {url.split('/')[-1]}",
-                    url=url,
-                    brand_id=brand_id,
-                    product_id=product_id,
-                    last_updated=datetime.datetime.now()
-                )
-                session.add(doc)
-                session.commit()
+            # Save document record in DB (updates the row on re-scrape)
+            document_registry.upsert(
+                url,
+                f"User Guide: {url.split('/')[-1]}",
+                brand_id,
+                product_id=product_id,
+                last_updated=datetime.datetime.now()
+            )
                 
             logger.info(f"Successfully ingested guide for product {product_id}")
             
@@ -1,5 +1,5 @@
-from playwright.async_api import async_playwright
 import logging
+from ..engines.browser_pool import browser_pool
 
 logger = logging.getLogger(__name__)
 
@@ -9,11 +9,7 @@ class BrandScraper:
 
     async def scrape_site(self):
         logger.info(f"Starting scrape for {self.start_url}")
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context()
-            page = await context.new_page()
-            
+        async with browser_pool.page() as page:
             try:
                 await page.goto(self.start_url, timeout=60000)
                 title = await page.title()
@@ -31,5 +27,3 @@ class BrandScraper:
             except Exception as e:
                 logger.error(f"Error scraping {self.start_url}: {e}")
                 return None
-            finally:
-                await browser.close()
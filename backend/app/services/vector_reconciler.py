@@ -0,0 +1,314 @@
+"""
+Vector/SQL consistency reconciler.
+Streams chunk ids and `doc_id` / `brand_id` / source URL metadata from every
+collection in pages and compares them set-wise against a snapshot of the SQL
+catalog. Orphans (chunks of deleted documents or brands) are deleted in
+batches, except chunks that other documents share as near-duplicates, which
+are handed to one of them (near_duplicates.promote); catalog documents with no chunks at all are reported, and optionally
+re-queued in the crawl frontier, for re-ingestion. A chunk whose `doc_id` is
+gone but whose page URL is still registered belongs to a document that was
+merged into that URL's row (migration 0001); its `doc_id` is rewritten.
+
+A cycle can run in one go (`reconcile()`, scripts/reconcile_vectors.py) or
+in bounded steps (`step(max_chunks)`), which the worker calls between brand
+scrapes so a large store is reconciled incrementally.
+"""
+
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlmodel import Session, select
+
+from ..core.database import read_engine
+from ..models.sql_models import Brand, Document
+from .compact_index import compact_index
+from .crawl_frontier import frontier
+from .document_registry import normalize_url
+from .near_duplicates import near_duplicates
+from .vector_router import chunk_source_url, vector_router
+
+logger = logging.getLogger(__name__)
+
+REPORT_FILE = Path("data/vector_reconcile_report.json")
+
+DELETED_DOCUMENT = "deleted_document"
+DELETED_BRAND = "deleted_brand"
+UNREGISTERED_URL = "unregistered_url"
+
+
+def _int(value) -> Optional[int]:
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+class VectorReconciler:
+    """
+    Usage:
+        report = vector_reconciler.reconcile()          # full cycle (scripts)
+        vector_reconciler.step(max_chunks=20000)       # one bounded step (scheduler)
+        vector_reconciler.get_stats()
+    """
+
+    def __init__(self, page_size: int = 1000, delete_batch: int = 500):
+        self.page_size = page_size
+        self.delete_batch = delete_batch
+        self._lock = threading.Lock()
+        self._cycle: Optional[Dict[str, Any]] = None
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.stats = {"cycles": 0, "chunks_scanned": 0, "orphans_deleted": 0}
+
+    def reconcile(self, by_url: bool = False, dry_run: bool = False, requeue: bool = False) -> Dict[str, Any]:
+        """Run a full cycle from scratch and return its report."""
+        with self._lock:
+            self._cycle = self._new_cycle(by_url, dry_run, requeue)
+        return self.step()
+
+    def step(self, max_chunks: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Scan up to `max_chunks` chunks (all, if None), continuing the current
+        cycle or starting one. Returns the report when the cycle completes.
+        """
+        with self._lock:
+            if self._cycle is None:
+                self._cycle = self._new_cycle()
+            cycle = self._cycle
+            scanned = 0
+            while cycle["collections"] and (max_chunks is None or scanned < max_chunks):
+                label, partition_brand, collection = cycle["collections"][0]
+                try:
+                    batch = collection.get(limit=self.page_size, offset=cycle["offset"], include=["metadatas"])
+                except Exception as e:
+                    # e.g. a collection dropped by an index rebuild mid-cycle
+                    logger.warning(f"Skipping {label} in this reconcile cycle: {e}")
+                    batch = {"ids": []}
+                if not batch["ids"]:
+                    cycle["collections"].pop(0)
+                    cycle["offset"] = 0
+                    continue
+
+                orphans, relinks = self._classify(cycle, partition_brand, batch["ids"], batch["metadatas"])
+                if relinks and not cycle["dry_run"]:
+                    self._relink(cycle, collection, relinks)
+                    if partition_brand is not None:
+                        cycle["changed_brands"].add(partition_brand)
+                deleted = 0
+                if orphans and not cycle["dry_run"]:
+                    confirmed = self._confirm(cycle, orphans)
+                    promoted = self._promote(cycle, collection, orphans, confirmed)
+                    deleted = self._delete(collection, [chunk_id for chunk_id in confirmed if chunk_id not in promoted])
+                    if deleted and partition_brand is not None:
+                        cycle["changed_brands"].add(partition_brand)
+                # Deleted rows shift the rest of the collection down
+                cycle["offset"] += len(batch["ids"]) - deleted
+                scanned += len(batch["ids"])
+                self.stats["chunks_scanned"] += len(batch["ids"])
+
+            if cycle["collections"]:
+                return None
+            self._cycle = None
+            return self._finish(cycle)
+
+    def _new_cycle(self, by_url: bool = False, dry_run: bool = False, requeue: bool = False) -> Dict[str, Any]:
+        """SQL snapshot plus the list of collections to stream."""
+        with Session(read_engine) as session:
+            brand_ids = set(session.exec(select(Brand.id)).all())
+            documents = session.exec(select(Document.id, Document.url, Document.brand_id, Document.last_updated)).all()
+
+        collections = [("support_docs", None, vector_router.shared())]
+        collections += [(f"brand_{brand_id}", brand_id, collection) for brand_id, collection in vector_router.partitions().items()]
+        return {
+            "started_at": datetime.utcnow(),
+            "by_url": by_url,
+            "dry_run": dry_run,
+            "requeue": requeue,
+            "collections": collections,
+            "collection_names": [label for label, _, _ in collections],
+            "offset": 0,
+            "brand_ids": brand_ids,
+            "documents": documents,
+            "doc_ids": {row[0] for row in documents},
+            "urls": {normalize_url(row[1]) for row in documents},
+            "url_doc_ids": {normalize_url(row[1]): row[0] for row in documents},
+            "seen_doc_ids": set(),
+            "seen_urls": set(),
+            "orphans": Counter(),
+            "deleted": Counter(),
+            "promoted": 0,
+            "relinked": 0,
+            "unregistered": 0,
+            "changed_brands": set(),
+        }
+
+    def _classify(
+        self, cycle: Dict[str, Any], partition_brand: Optional[int], ids: List[str], metadatas: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Record what the page references; return its orphans, and chunk_id -> metadata of chunks to relink."""
+        orphans = []
+        relinks = {}
+        for chunk_id, meta in zip(ids, metadatas):
+            meta = meta or {}
+            doc_id = _int(meta.get("doc_id"))
+            brand_id = _int(meta.get("brand_id")) or partition_brand
+            url = chunk_source_url(meta)
+            if doc_id:
+                cycle["seen_doc_ids"].add(doc_id)
+            if url:
+                cycle["seen_urls"].add(url)
+
+            reason = None
+            if brand_id and brand_id not in cycle["brand_ids"]:
+                reason = DELETED_BRAND
+            elif doc_id and doc_id not in cycle["doc_ids"]:
+                if url in cycle["url_doc_ids"]:
+                    # Merged into the Document registered for the same page, not deleted
+                    relinks[chunk_id] = dict(meta, doc_id=cycle["url_doc_ids"][url])
+                else:
+                    reason = DELETED_DOCUMENT
+            elif not doc_id and url and url not in cycle["urls"]:
+                # Plenty of ingests never register a Document; only delete these on request
+                cycle["unregistered"] += 1
+                if cycle["by_url"]:
+                    reason = UNREGISTERED_URL
+            if reason:
+                cycle["orphans"][reason] += 1
+                orphans.append({"id": chunk_id, "reason": reason, "doc_id": doc_id, "brand_id": brand_id, "url": url})
+        return orphans, relinks
+
+    def _relink(self, cycle: Dict[str, Any], collection, relinks: Dict[str, Dict[str, Any]]):
+        """Rewrite the doc_id of chunks whose document was merged into another row for the same URL."""
+        stored = collection.get(ids=list(relinks), include=["documents", "embeddings"])
+        if not stored["ids"]:
+            return
+        collection.upsert(
+            ids=stored["ids"],
+            documents=stored["documents"],
+            embeddings=stored["embeddings"],
+            metadatas=[relinks[chunk_id] for chunk_id in stored["ids"]],
+        )
+        cycle["relinked"] += len(stored["ids"])
+
+    def _confirm(self, cycle: Dict[str, Any], orphans: List[Dict[str, Any]]) -> List[str]:
+        """Re-check candidates against SQL, so rows created since the snapshot are kept."""
+        doc_ids = {o["doc_id"] for o in orphans if o["reason"] == DELETED_DOCUMENT}
+        brand_ids = {o["brand_id"] for o in orphans if o["reason"] == DELETED_BRAND}
+        urls = {o["url"] for o in orphans if o["reason"] == UNREGISTERED_URL}
+        with Session(read_engine) as session:
+            if doc_ids:
+                cycle["doc_ids"].update(session.exec(select(Document.id).where(Document.id.in_(doc_ids))).all())
+            if brand_ids:
+                cycle["brand_ids"].update(session.exec(select(Brand.id).where(Brand.id.in_(brand_ids))).all())
+            if urls:
+                cycle["urls"].update(session.exec(select(Document.url).where(Document.url.in_(urls))).all())
+
+        confirmed = []
+        for orphan in orphans:
+            live = (
+                (orphan["reason"] == DELETED_DOCUMENT and orphan["doc_id"] in cycle["doc_ids"])
+                or (orphan["reason"] == DELETED_BRAND and orphan["brand_id"] in cycle["brand_ids"])
+                or (orphan["reason"] == UNREGISTERED_URL and orphan["url"] in cycle["urls"])
+            )
+            if not live:
+                confirmed.append(orphan["id"])
+                cycle["deleted"][orphan["reason"]] += 1
+        return confirmed
+
+    def _promote(self, cycle: Dict[str, Any], collection, orphans: List[Dict[str, Any]], ids: List[str]) -> Set[str]:
+        """Keep orphans that live documents reference as near-duplicates; they are reassigned, not deleted."""
+        try:
+            promoted = near_duplicates.promote(collection, ids)
+        except Exception as e:
+            logger.warning(f"Could not reassign shared chunks, deleting them: {e}")
+            return set()
+        for orphan in orphans:
+            if orphan["id"] in promoted:
+                cycle["deleted"][orphan["reason"]] -= 1
+        cycle["promoted"] += len(promoted)
+        return promoted
+
+    def _delete(self, collection, ids: List[str]) -> int:
+        for start in range(0, len(ids), self.delete_batch):
+            collection.delete(ids=ids[start:start + self.delete_batch])
+        near_duplicates.forget(ids)
+        self.stats["orphans_deleted"] += len(ids)
+        return len(ids)
+
+    def _finish(self, cycle: Dict[str, Any]) -> Dict[str, Any]:
+        # Documents registered during the cycle may not be embedded yet
+        missing = [
+            {"doc_id": doc_id, "url": url, "brand_id": brand_id}
+            for doc_id, url, brand_id, last_updated in cycle["documents"]
+            if doc_id not in cycle["seen_doc_ids"]
+            and normalize_url(url) not in cycle["seen_urls"]
+            and (last_updated is None or last_updated < cycle["started_at"])
+        ]
+
+        requeued = 0
+        if cycle["requeue"] and missing and not cycle["dry_run"]:
+            by_brand = defaultdict(list)
+            for document in missing:
+                by_brand[document["brand_id"]].append(document["url"])
+            for brand_id, urls in by_brand.items():
+                requeued += frontier.enqueue(brand_id, urls, requeue_done=True)
+
+        if not cycle["dry_run"]:
+            near_duplicates.prune()
+
+        # Compact snapshots of brands that lost chunks would still return them
+        for brand_id in sorted(cycle["changed_brands"] & cycle["brand_ids"]):
+            manifest = compact_index.manifest(brand_id)
+            if manifest:
+                compact_index.build(brand_id, dtype=manifest["dtype"])
+
+        report = {
+            "started_at": cycle["started_at"].isoformat(),
+            "finished_at": datetime.utcnow().isoformat(),
+            "dry_run": cycle["dry_run"],
+            "collections": cycle["collection_names"],
+            "orphans": dict(cycle["orphans"]),
+            "deleted": dict(cycle["deleted"]),
+            "promoted": cycle["promoted"],
+            "relinked": cycle["relinked"],
+            "unregistered_chunks": cycle["unregistered"],
+            "missing_documents": len(missing),
+            "requeued": requeued,
+            "missing": missing,
+        }
+        try:
+            REPORT_FILE.parent.mkdir(parents=True, exist_ok=True)
+            REPORT_FILE.write_text(json.dumps(report, indent=2))
+        except Exception as e:
+            logger.warning(f"Could not write {REPORT_FILE}: {e}")
+
+        self.stats["cycles"] += 1
+        self.last_report = {k: v for k, v in report.items() if k != "missing"}
+        logger.info(
+            f"Vector reconcile: deleted {sum(cycle['deleted'].values())} orphan chunks {dict(cycle['deleted'])}, "
+            f"relinked {cycle['relinked']} chunks of merged documents, "
+            f"{len(missing)} documents with no chunks, {cycle['unregistered']} chunks with no Document row"
+        )
+        return report
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        cycle = self._cycle
+        if cycle is not None:
+            stats["cycle"] = {
+                "started_at": cycle["started_at"].isoformat(),
+                "collections_left": len(cycle["collections"]),
+                "offset": cycle["offset"],
+                "orphans": dict(cycle["orphans"]),
+            }
+        stats["last_report"] = self.last_report
+        return stats
+
+
+# Global reconciler instance
+vector_reconciler = VectorReconciler()
@@ -0,0 +1,262 @@
+"""
+Brand-partitioned vector storage.
+Chunks are stored in one Chroma collection per brand (`brand_<id>`), so a
+brand-scoped question searches only that brand's HNSW graph instead of the
+whole corpus with a `where` post-filter. Unscoped questions fan out across
+every partition concurrently and the hits are merged by distance. Chunks
+with no known brand stay in the shared `support_docs` collection, which is
+also searched (with a brand filter) while it still holds unpartitioned
+chunks; see scripts/partition_vectors.py.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlmodel import Session, select
+
+from ..core.config import settings
+from ..core.database import read_engine
+from ..core.vector_db import (
+    DEFAULT_COLLECTION,
+    brand_collection_name,
+    embedding_function,
+    get_collection,
+    list_brand_ids,
+    resolve_collection_name,
+)
+from ..models.sql_models import Brand
+from .compact_index import compact_index
+from .document_registry import normalize_url
+
+logger = logging.getLogger(__name__)
+
+RESULT_KEYS = ("ids", "documents", "metadatas", "distances")
+
+
+def chunk_source_url(metadata: Dict[str, Any]) -> str:
+    """Normalized page URL a chunk came from ("" if unknown); `source` is sometimes a label."""
+    for key in ("source_url", "url", "source"):
+        value = str(metadata.get(key) or "")
+        if value.startswith(("http://", "https://")):
+            return normalize_url(value)
+    return ""
+
+
+def _where(clauses: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return dict(clauses)
+    return {"$and": [{k: v} for k, v in clauses.items()]}
+
+
+class VectorRouter:
+    """
+    Usage:
+        vector_router.upsert(chunks, metadatas, ids)   # routed by metadata brand_id / brand
+        results = await vector_router.query(question, n_results=15, brand_id=3)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._partitions: Dict[int, Any] = {}
+        self._shared = None
+        self._brand_ids_by_name: Dict[str, int] = {}
+        self.stats = {"scoped_queries": 0, "fanout_queries": 0, "compact_queries": 0, "collections_searched": 0, "query_seconds": 0.0}
+
+    def partition(self, brand_id: int):
+        """A brand's serving collection; follows alias swaps from index rebuilds."""
+        brand_id = int(brand_id)
+        physical = resolve_collection_name(brand_collection_name(brand_id))
+        cached = self._partitions.get(brand_id)
+        if cached is None or cached[0] != physical:
+            with self._lock:
+                cached = self._partitions.get(brand_id)
+                if cached is None or cached[0] != physical:
+                    cached = self._partitions[brand_id] = (physical, get_collection(physical))
+        return cached[1]
+
+    def shared(self):
+        physical = resolve_collection_name(DEFAULT_COLLECTION)
+        if self._shared is None or self._shared[0] != physical:
+            self._shared = (physical, get_collection(physical))
+        return self._shared[1]
+
+    def partitions(self) -> Dict[int, Any]:
+        """Every brand partition on disk (including ones created by other processes)."""
+        return {brand_id: self.partition(brand_id) for brand_id in list_brand_ids()}
+
+    def brand_id_for(self, metadata: Dict[str, Any]) -> Optional[int]:
+        """Partition key for a chunk: its brand_id, else its brand name resolved via the catalog."""
+        brand_id = metadata.get("brand_id")
+        try:
+            if brand_id is not None and int(brand_id) > 0:
+                return int(brand_id)
+        except (TypeError, ValueError):
+            pass
+        name = (metadata.get("brand") or "").strip().lower()
+        if not name:
+            return None
+        if name not in self._brand_ids_by_name:
+            with Session(read_engine) as session:
+                brands = session.exec(select(Brand.id, Brand.name)).all()
+            self._brand_ids_by_name = {brand_name.strip().lower(): brand_id for brand_id, brand_name in brands}
+        return self._brand_ids_by_name.get(name)
+
+    def upsert(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str], embeddings: Optional[Sequence] = None):
+        """Upsert chunks, grouped into one call per partition."""
+        groups: Dict[Optional[int], List[int]] = {}
+        for index, metadata in enumerate(metadatas):
+            groups.setdefault(self.brand_id_for(metadata), []).append(index)
+        for brand_id, indexes in groups.items():
+            collection = self.shared() if brand_id is None else self.partition(brand_id)
+            collection.upsert(
+                documents=[documents[i] for i in indexes],
+                metadatas=[metadatas[i] for i in indexes],
+                ids=[ids[i] for i in indexes],
+                embeddings=[embeddings[i] for i in indexes] if embeddings is not None else None,
+            )
+
+    def count(self, brand_id: Optional[int] = None) -> int:
+        """Chunks searchable for a brand (or in total). Blocking."""
+        if brand_id:
+            total = self.partition(brand_id).count()
+        else:
+            total = sum(collection.count() for collection in self.partitions().values())
+        return total + self.shared().count()
+
+    async def query(
+        self,
+        query_text: str,
+        n_results: int = 10,
+        brand_id: Optional[int] = None,
+        brand_name: Optional[str] = None,
+        where: Optional[Dict[str, Any]] = None,
+        backend: Optional[str] = None,
+        include_ids: Optional[Dict[int, List[str]]] = None,
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        Top `n_results` chunks for `query_text`, in Chroma's query result shape.
+        With `brand_id` only that brand's partition is searched; otherwise all
+        partitions are searched concurrently and merged. `where` holds any
+        extra metadata filters (e.g. product_id); `include_ids` (brand_id ->
+        chunk ids) are searched as well without them, for stored chunks the
+        filtered documents share through near-duplicate references.
+        `backend="compact"` serves brand-scoped queries from the brand's
+        compact index when one is built (Chroma otherwise), in place of its
+        partition; the shared collection is still searched.
+        """
+        started = time.perf_counter()
+        query_embeddings = await asyncio.to_thread(embedding_function, [query_text])
+
+        compact = None
+        if brand_id and (backend or settings.VECTOR_BACKEND) == "compact" and compact_index.has(brand_id):
+            shared_ids = (include_ids or {}).get(int(brand_id))
+            compact = await asyncio.to_thread(compact_index.search, brand_id, query_embeddings[0], n_results, where, shared_ids)
+
+        where = dict(where or {})
+        shared_where = dict(where)
+        if brand_id:
+            # Unpartitioned chunks still need the old post-filter
+            shared_where["brand" if brand_name else "brand_id"] = brand_name or int(brand_id)
+        if compact is not None:
+            # The compact index covers the partition and its include_ids
+            targets = []
+            self.stats["compact_queries"] += 1
+        elif brand_id:
+            targets = [(self.partition(brand_id), where)]
+            self.stats["scoped_queries"] += 1
+        else:
+            partitions = await asyncio.to_thread(self.partitions)
+            targets = [(collection, where) for collection in partitions.values()]
+            self.stats["fanout_queries"] += 1
+        targets.append((self.shared(), shared_where))
+        targets = [(collection, clauses, None) for collection, clauses in targets]
+        for shared_brand_id, chunk_ids in (include_ids or {}).items():
+            if compact is None and chunk_ids and (not brand_id or int(shared_brand_id) == int(brand_id)):
+                targets.append((self.partition(shared_brand_id), {}, list(chunk_ids)))
+
+        def search(collection, clauses, ids):
+            size = collection.count()
+            if not size:
+                return None
+            return collection.query(
+                query_embeddings=query_embeddings,
+                n_results=min(n_results, size, len(ids) if ids else size),
+                where=_where(clauses),
+                ids=ids,
+                include=["documents", "metadatas", "distances"],
+            )
+
+        results = await asyncio.gather(
+            *(asyncio.to_thread(search, *target) for target in targets),
+            return_exceptions=True,
+        )
+
+        searched = [(collection.name, result) for (collection, _, _), result in zip(targets, results)]
+        if compact is not None:
+            # Compact distances are 1 - cosine; Chroma's default squared L2 between
+            # the (unit-length) embeddings is twice that
+            compact["distances"] = [[2 * distance for distance in compact["distances"][0]]]
+            searched.append((f"compact index of brand {brand_id}", compact))
+
+        hits: Dict[str, tuple] = {}
+        for name, result in searched:
+            if isinstance(result, Exception):
+                logger.warning(f"Vector query on {name} failed: {result}")
+                continue
+            if not result:
+                continue
+            self.stats["collections_searched"] += 1
+            for hit in zip(*(result[key][0] for key in RESULT_KEYS)):
+                # Same chunk in two collections (mid-migration): keep the closer hit
+                if hit[0] not in hits or hit[3] < hits[hit[0]][3]:
+                    hits[hit[0]] = hit
+        ranked = sorted(hits.values(), key=lambda hit: hit[3])[:n_results]
+
+        self.stats["query_seconds"] += time.perf_counter() - started
+        return {key: [[hit[i] for hit in ranked]] for i, key in enumerate(RESULT_KEYS)}
+
+    async def children(self, metadatas: List[Dict[str, Any]]) -> Dict[str, List[Tuple[int, str]]]:
+        """
+        Every stored child chunk of the given hits' parents (hierarchical
+        chunking), as parent_id -> [(child_index, text)] in order. One `get`
+        per partition involved, run concurrently.
+        """
+        groups: Dict[Optional[int], set] = {}
+        for metadata in metadatas:
+            if metadata.get("parent_id"):
+                groups.setdefault(self.brand_id_for(metadata), set()).add(metadata["parent_id"])
+
+        def fetch(brand_id, parent_ids):
+            collection = self.shared() if brand_id is None else self.partition(brand_id)
+            return collection.get(where={"parent_id": {"$in": sorted(parent_ids)}}, include=["documents", "metadatas"])
+
+        results = await asyncio.gather(
+            *(asyncio.to_thread(fetch, brand_id, parent_ids) for brand_id, parent_ids in groups.items()),
+            return_exceptions=True,
+        )
+        children: Dict[str, List[Tuple[int, str]]] = {}
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Fetching parent chunks failed: {result}")
+                continue
+            for text, metadata in zip(result["documents"], result["metadatas"]):
+                children.setdefault(metadata["parent_id"], []).append((int(metadata.get("child_index") or 0), text))
+        for parts in children.values():
+            parts.sort()
+        return children
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        queries = stats["scoped_queries"] + stats["fanout_queries"] + stats["compact_queries"]
+        stats["avg_query_ms"] = round(1000 * stats.pop("query_seconds") / queries, 2) if queries else 0.0
+        stats["partitions"] = len(self._partitions)
+        return stats
+
+
+# Global router instance
+vector_router = VectorRouter()
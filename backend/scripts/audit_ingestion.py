@@ -10,7 +10,7 @@ import logging
 import hashlib
 from typing import Dict, Set, List, Tuple
 from app.core.database import Session, engine
-from app.core.vector_db import get_collection
+from app.services.vector_reconciler import vector_reconciler
 from app.models.sql_models import Brand, Document
 from sqlmodel import select
 
@@ -104,8 +104,6 @@ class ContentDeduplicator:
         
         logger.info(f"Found {len(self.duplicate_docs)} documents to remove")
         
-        collection = get_collection()
-        
         with Session(engine) as session:
             for keep_id, remove_id in self.duplicate_docs:
                 try:
@@ -120,18 +118,6 @@ class ContentDeduplicator:
                     logger.info(f"  Keeping: {doc_to_keep.url}")
                     logger.info(f"  Removing: {doc_to_remove.url}")
                     
-                    # Remove from ChromaDB by filtering for doc_id in metadata
-                    try:
-                        results = collection.get(
-                            where={"doc_id": remove_id},
-                            include=[]
-                        )
-                        if results['ids']:
-                            collection.delete(ids=results['ids'])
-                            logger.info(f"    Deleted {len(results['ids'])} vectors from ChromaDB")
-                    except Exception as e:
-                        logger.warning(f"    Could not delete from ChromaDB: {e}")
-                    
                     # Remove from SQL database
                     session.delete(doc_to_remove)
                     session.commit()
@@ -142,6 +128,11 @@ class ContentDeduplicator:
                     session.rollback()
         
         logger.info(f"\n✅ Successfully removed {self.removed_count} duplicate documents")
+        
+        # Their chunks are now orphans: one batched pass instead of a where-delete per document
+        if self.removed_count:
+            report = vector_reconciler.reconcile()
+            logger.info(f"    Deleted {sum(report['deleted'].values())} vectors from ChromaDB")
     
     async def verify_brand_quality(self, brand_name: str):
         """Detailed quality report for a specific brand"""
@@ -0,0 +1,96 @@
+"""
+Move media JSON out of chunk metadata into the Media table.
+Chunks ingested before the document-level media table carry `images`,
+`pdfs` and `image_url` in every chunk. This writes each document's media
+once (document_media.replace), then rewrites its chunks with only a `doc_id`
+reference. Embeddings are copied as-is, so nothing is re-embedded.
+Chunks whose page has no Document row keep their metadata.
+
+Usage:
+    python scripts/backfill_document_media.py
+    python scripts/backfill_document_media.py --dry-run
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.document_media import LEGACY_MEDIA_KEYS, document_media
+from app.services.document_registry import document_registry
+from app.services.vector_router import vector_router
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _load(value):
+    try:
+        return json.loads(value) if isinstance(value, str) else (value or [])
+    except ValueError:
+        return []
+
+
+def backfill_collection(collection, written_docs, batch_size=500, dry_run=False):
+    """Returns (chunks rewritten, chunks left unresolved)."""
+    # Page by id: rewriting chunks while paging by offset could skip or repeat rows
+    all_ids = collection.get(include=[])["ids"]
+    rewritten = unresolved = 0
+    for start in range(0, len(all_ids), batch_size):
+        batch = collection.get(ids=all_ids[start:start + batch_size], include=["documents", "metadatas", "embeddings"])
+        keep = []
+        for i, meta in enumerate(batch["metadatas"]):
+            meta = meta or {}
+            if not any(key in meta for key in LEGACY_MEDIA_KEYS):
+                continue
+            doc_id = meta.get("doc_id")
+            if not doc_id:
+                document = document_registry.get(meta.get("source_url") or meta.get("url") or meta.get("source") or "")
+                doc_id = document.id if document else None
+            if not doc_id:
+                unresolved += 1
+                continue
+            doc_id = int(doc_id)
+            if doc_id not in written_docs and not dry_run:
+                document_media.replace(doc_id, vector_router.brand_id_for(meta) or 0, meta.get("product_id"), _load(meta.get("images")), _load(meta.get("pdfs")))
+            written_docs.add(doc_id)
+            # Upsert merges metadata; None removes a key
+            batch["metadatas"][i] = dict(meta, doc_id=doc_id, **{key: None for key in LEGACY_MEDIA_KEYS})
+            keep.append(i)
+
+        if keep and not dry_run:
+            collection.upsert(
+                ids=[batch["ids"][i] for i in keep],
+                documents=[batch["documents"][i] for i in keep],
+                metadatas=[batch["metadatas"][i] for i in keep],
+                embeddings=[batch["embeddings"][i] for i in keep],
+            )
+        rewritten += len(keep)
+    return rewritten, unresolved
+
+
+def backfill(batch_size=500, dry_run=False):
+    collections = [("support_docs", vector_router.shared())]
+    collections += [(f"brand_{brand_id}", collection) for brand_id, collection in vector_router.partitions().items()]
+
+    written_docs = set()
+    for name, collection in collections:
+        rewritten, unresolved = backfill_collection(collection, written_docs, batch_size, dry_run)
+        if rewritten or unresolved:
+            logger.info(f"{name}: {rewritten} chunks rewritten, {unresolved} with no Document row left as-is")
+    logger.info(f"Media for {len(written_docs)} documents {'would be ' if dry_run else ''}moved to the Media table")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move chunk media JSON into the Media table")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+    backfill(args.batch_size, dry_run=args.dry_run)
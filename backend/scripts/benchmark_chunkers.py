@@ -0,0 +1,118 @@
+"""
+Compare chunking strategies on our own corpus.
+Texts come from the page archive (re-extracted offline) and, with --pdf-dir,
+from downloaded manuals. For each chunking mode it reports split time,
+chunk count, mean tokens per chunk, overlap overhead and how many spec
+tables were cut across chunks.
+
+Usage:
+    python scripts/benchmark_chunkers.py
+    python scripts/benchmark_chunkers.py --limit 500 --pdf-dir data/brand_docs --repeat 5
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.engines.ingestion_engine import extract_archived_page
+from app.services.chunking import FLAT, STRUCTURED, count_tokens, is_table_row, split_text
+from app.services.page_archive import page_archive
+from app.services.pdf_extraction import pdf_extractor
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def load_corpus(limit, pdf_dir=None):
+    texts = []
+    for snapshot in page_archive.latest_snapshots()[:limit]:
+        try:
+            texts.append(extract_archived_page(snapshot.sha256, snapshot.url)[1])
+        except Exception as e:
+            logger.warning(f"Skipping {snapshot.url}: {e}")
+    if pdf_dir:
+        async def read_pdfs():
+            for path in sorted(Path(pdf_dir).rglob("*.pdf"))[:limit]:
+                try:
+                    texts.append(await pdf_extractor.extract_text(path))
+                except Exception as e:
+                    logger.warning(f"Skipping {path}: {e}")
+            pdf_extractor.close()
+        asyncio.run(read_pdfs())
+    return [text for text in texts if text.strip()]
+
+
+def spec_tables(text):
+    """Runs of two or more table-like lines."""
+    tables, run = [], []
+    for line in text.split("\n"):
+        line = line.strip()
+        if line and is_table_row(line):
+            run.append(line)
+            continue
+        if len(run) >= 2:
+            tables.append(run)
+        run = []
+    if len(run) >= 2:
+        tables.append(run)
+    return tables
+
+
+def benchmark(texts, mode, repeat):
+    timings, chunks = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = [split_text(text, str(i), mode=mode) for i, text in enumerate(texts)]
+        timings.append(time.perf_counter() - started)
+
+    flat_chunks = [chunk.text for document in chunks for chunk in document]
+    tokens = [count_tokens(chunk) for chunk in flat_chunks]
+    source_tokens = sum(count_tokens(text) for text in texts)
+    tables = cut = 0
+    for text, document in zip(texts, chunks):
+        for table in spec_tables(text):
+            tables += 1
+            if not any(all(row in chunk.text for row in table) for chunk in document):
+                cut += 1
+    return {
+        "mode": mode,
+        "seconds": min(timings),
+        "chunks": len(flat_chunks),
+        "mean_tokens": statistics.mean(tokens) if tokens else 0,
+        "overhead": sum(tokens) / source_tokens - 1 if source_tokens else 0,
+        "tables": tables,
+        "tables_cut": cut,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chunking modes on archived pages and manuals")
+    parser.add_argument("--limit", type=int, default=300, help="Max pages (and PDFs) to load")
+    parser.add_argument("--pdf-dir", help="Also chunk PDFs under this directory")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per mode (best is reported)")
+    parser.add_argument("--modes", nargs="+", default=[FLAT, STRUCTURED])
+    args = parser.parse_args()
+
+    texts = load_corpus(args.limit, args.pdf_dir)
+    if not texts:
+        logger.error("No texts to chunk (empty page archive?)")
+        sys.exit(1)
+    logger.info(f"Corpus: {len(texts)} documents, {sum(len(t) for t in texts) / 1e6:.1f}M chars")
+
+    for result in [benchmark(texts, mode, args.repeat) for mode in args.modes]:
+        logger.info(
+            f"{result['mode']:>12}: {result['seconds'] * 1000:8.1f} ms  {result['chunks']:6d} chunks  "
+            f"{result['mean_tokens']:6.0f} tokens/chunk  {result['overhead']:+6.1%} overlap  "
+            f"{result['tables_cut']}/{result['tables']} tables cut"
+        )
@@ -0,0 +1,45 @@
+"""
+Build compact (memory-mapped, exact-search) vector indexes from the per-brand
+Chroma partitions. Run after partition_vectors.py and after re-ingesting a brand.
+
+Usage:
+    python scripts/build_compact_index.py                  # every brand partition, int8
+    python scripts/build_compact_index.py --brand-id 3 --dtype float16
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.vector_db import list_brand_ids
+from app.services.compact_index import DTYPES, compact_index
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def build(brand_ids, dtype):
+    total = 0
+    started = time.time()
+    for brand_id in brand_ids:
+        try:
+            total += compact_index.build(brand_id, dtype=dtype)
+        except Exception as e:
+            logger.error(f"Brand {brand_id}: compact index build failed: {e}")
+    logger.info(f"Built compact indexes for {len(brand_ids)} brands ({total} chunks) in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build compact vector indexes from Chroma brand partitions")
+    parser.add_argument("--brand-id", type=int, help="Only this brand (default: every partition)")
+    parser.add_argument("--dtype", choices=DTYPES, default="int8")
+    args = parser.parse_args()
+    build([args.brand_id] if args.brand_id else list_brand_ids(), args.dtype)
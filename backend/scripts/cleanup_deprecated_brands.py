@@ -11,7 +11,7 @@ import asyncio
 import logging
 from app.core.database import Session, engine
 from app.models.sql_models import Brand, Document, Product, ProductFamily
-from app.core.vector_db import get_collection
+from app.services.vector_reconciler import vector_reconciler
 from sqlmodel import select
 
 # Setup logging
@@ -85,41 +85,12 @@ def cleanup_sql_database():
 
 
 def cleanup_chromadb():
-    """Remove brand data from ChromaDB."""
+    """Remove the dropped brands' chunks from ChromaDB (they are orphans once the SQL rows are gone)."""
     logger.info("Starting ChromaDB cleanup...")
     
     try:
-        collection = get_collection()
-        
-        for brand_name in BRANDS_TO_DROP:
-            # Get brand ID from database to filter in ChromaDB
-            with Session(engine) as session:
-                brand = session.exec(
-                    select(Brand).where(Brand.name == brand_name)
-                ).first()
-                
-                if not brand:
-                    logger.warning(f"Brand '{brand_name}' not found for ChromaDB cleanup")
-                    continue
-                
-                # Query and delete all documents with this brand_id from ChromaDB
-                try:
-                    results = collection.get(
-                        where={"brand_id": brand.id},
-                        include=[]
-                    )
-                    
-                    if results['ids']:
-                        collection.delete(ids=results['ids'])
-                        logger.info(
-                            f"✓ Removed {len(results['ids'])} vectors for '{brand_name}' from ChromaDB"
-                        )
-                    else:
-                        logger.info(f"No ChromaDB entries found for '{brand_name}'")
-                        
-                except Exception as e:
-                    logger.warning(f"Could not delete from ChromaDB for '{brand_name}': {e}")
-                    
+        report = vector_reconciler.reconcile()
+        logger.info(f"✓ Removed {sum(report['deleted'].values())} orphan vectors from ChromaDB {report['deleted']}")
     except Exception as e:
         logger.error(f"ChromaDB cleanup failed: {e}")
 
@@ -1,7 +1,5 @@
-import chromadb
-from chromadb.config import Settings
+from app.core.vector_db import client
 
-client = chromadb.PersistentClient(path="./chroma_db")
 collection = client.get_collection("support_docs")
 
 results = collection.query(
@@ -0,0 +1,82 @@
+"""
+Remove near-duplicate chunks already in the vector store.
+Ingestion skips near-duplicates of a brand's stored chunks as they arrive;
+this backfills chunks stored before that (or with the check disabled).
+Each brand partition is read in pages. A chunk close to one stored earlier
+for the same brand is deleted and recorded as a reference to it. The
+script then prints each brand's duplicate rate.
+
+Usage:
+    python scripts/dedupe_chunks.py                  # all brands
+    python scripts/dedupe_chunks.py --brand 3 --dry-run
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.compact_index import compact_index
+from app.services.near_duplicates import near_duplicates
+from app.services.vector_router import vector_router
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def dedupe_brand(brand_id, collection, dry_run=False, page_size=1000):
+    """Returns (chunks scanned, duplicates found)."""
+    # A dry run matches against a throwaway index, so nothing is written
+    index = near_duplicates.staging(brand_id) if dry_run else near_duplicates
+    offset = scanned = found = 0
+    while True:
+        batch = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+        if not batch["ids"]:
+            break
+        metadatas = [{"brand_id": brand_id, **(meta or {})} for meta in batch["metadatas"]]
+        plan = index.plan(batch["documents"], metadatas, batch["ids"], replace_references=False, verify=False)
+        if plan.duplicate_ids and not dry_run:
+            collection.delete(ids=plan.duplicate_ids)
+        index.commit(plan)
+        scanned += len(batch["ids"])
+        found += len(plan.duplicate_ids)
+        # Deleted rows shift the rest of the collection down
+        offset += len(batch["ids"]) - (0 if dry_run else len(plan.duplicate_ids))
+    return scanned, found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete near-duplicate chunks per brand and report duplicate rates")
+    parser.add_argument("--brand", type=int, help="Only this brand id")
+    parser.add_argument("--dry-run", action="store_true", help="Only count duplicates")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if not near_duplicates.enabled:
+        logger.error("NEAR_DUPLICATE_THRESHOLD is 0 (disabled)")
+        sys.exit(1)
+
+    partitions = vector_router.partitions()
+    if args.brand is not None:
+        partitions = {args.brand: vector_router.partition(args.brand)}
+    for brand_id, collection in sorted(partitions.items()):
+        scanned, found = dedupe_brand(brand_id, collection, args.dry_run, args.page_size)
+        action = "would delete" if args.dry_run else "deleted"
+        logger.info(f"Brand {brand_id}: {scanned} chunks, {action} {found} near-duplicates ({found / scanned if scanned else 0:.1%})")
+        # A compact snapshot would still return the deleted chunks
+        manifest = compact_index.manifest(brand_id) if found and not args.dry_run else None
+        if manifest:
+            compact_index.build(brand_id, dtype=manifest["dtype"])
+
+    if not args.dry_run:
+        for brand_id, row in near_duplicates.report().items():
+            logger.info(
+                f"  {row['brand'] or brand_id}: {row['stored_chunks']} stored, "
+                f"{row['duplicate_chunks']} referenced, {row['duplicate_rate']:.1%} duplicate"
+            )
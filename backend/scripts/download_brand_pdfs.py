@@ -3,7 +3,6 @@ import sys
 import os
 import json
 import asyncio
-import aiohttp
 import logging
 from pathlib import Path
 import hashlib
@@ -12,27 +11,13 @@ import hashlib
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.core.vector_db import get_collection
+from app.services.pdf_downloader import pdf_downloader
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 BRAND_DOCS_DIR = Path("data/brand_docs")
 
-async def download_file(session, url, dest_path):
-    try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                content = await response.read()
-                with open(dest_path, 'wb') as f:
-                    f.write(content)
-                return True
-            else:
-                logger.error(f"Failed to download {url}: Status {response.status}")
-                return False
-    except Exception as e:
-        logger.error(f"Error downloading {url}: {e}")
-        return False
-
 async def process_brand_pdfs(brand_name):
     logger.info(f"Processing PDFs for brand: {brand_name}")
     
@@ -96,14 +81,20 @@ async def process_brand_pdfs(brand_name):
 
     logger.info(f"Found {len(new_pdfs)} new PDFs to download")
     
-    async with aiohttp.ClientSession() as session:
-        for pdf in new_pdfs:
-            logger.info(f"Downloading: {pdf['url']}")
-            success = await download_file(session, pdf['url'], pdf['filepath'])
-            if success:
-                manifest.append(pdf)
-            else:
-                logger.warning(f"Skipping manifest entry for failed download: {pdf['url']}")
+    # Downloads run concurrently through the shared pool; identical files are stored once
+    async with pdf_downloader:
+        results = await pdf_downloader.fetch_many(pdf['url'] for pdf in new_pdfs)
+    results_by_url = {result.url: result for result in results}
+    
+    for pdf in new_pdfs:
+        result = results_by_url[pdf['url']]
+        if pdf_downloader.materialize(result, pdf['filepath']):
+            pdf['sha256'] = result.sha256
+            pdf['size'] = result.size
+            manifest.append(pdf)
+        else:
+            logger.warning(f"Skipping manifest entry for failed download: {pdf['url']} ({result.error})")
+    logger.info(f"PDF downloads: {pdf_downloader.get_stats()}")
     
     # Save updated manifest
     manifest_path.write_text(json.dumps(manifest, indent=2))
@@ -5,6 +5,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sqlmodel import Session, select
 from app.core.database import engine
 from app.models.sql_models import Brand, Product, Document
+from app.services.document_registry import document_registry
 
 def fix_missing():
     mapping = {
@@ -68,23 +69,24 @@ def fix_missing():
                 continue
             
             # Find the document by URL (it might be associated with the Group product)
-            doc = session.exec(select(Document).where(Document.url == url)).first()
-            if doc:
+            doc = document_registry.get(url, session)
+            if doc and doc.product_id:
+                # One document per URL, linked to one product
+                print(f"Document for {url} already belongs to product {doc.product_id}, not linking {prod_name}")
+            elif doc:
                 print(f"Associating {prod_name} with existing document for {url}")
-                # Create a new document entry for this product but with same content
-                new_doc = Document(
-                    title=doc.title,
-                    url=doc.url,
+                document_registry.upsert(
+                    doc.url,
+                    doc.title,
+                    brand.id,
+                    product_id=product.id,
                     content_hash=doc.content_hash,
                     last_updated=doc.last_updated,
-                    brand_id=brand.id,
-                    product_id=product.id
+                    force=True,
                 )
-                session.add(new_doc)
             else:
                 print(f"Document for {url} not found in DB. Need to ingest it.")
 
-        session.commit()
         print("Done fixing associations.")
 
 if __name__ == "__main__":
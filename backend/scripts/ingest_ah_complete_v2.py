@@ -14,6 +14,7 @@ from app.engines.ah_scraper import AllenHeathScraper
 from app.core.database import Session, engine
 from app.models.sql_models import Brand, Document
 from app.services.rag_service import ingest_document
+from app.services.document_registry import document_registry, normalize_url
 from sqlmodel import select
 from bs4 import BeautifulSoup
 
@@ -66,7 +67,7 @@ class AllenHeathIngestionManager:
             discovered_urls = await self.scraper.discover_urls()
             
             # Filter to unprocessed URLs
-            new_urls = [u for u in discovered_urls if u not in self.ingested_urls]
+            new_urls = [u for u in discovered_urls if normalize_url(u) not in self.ingested_urls]
             logger.info(f"\nDiscovered {len(discovered_urls)} total URLs")
             logger.info(f"New URLs to ingest: {len(new_urls)}")
             
@@ -142,18 +143,8 @@ class AllenHeathIngestionManager:
                     # Extract title
                     title = self._extract_title(html, url)
                     
-                    # Ingest into SQL database
-                    with Session(engine) as session:
-                        doc = Document(
-                            brand_id=brand.id,
-                            title=title,
-                            content=text_content,
-                            url=url
-                        )
-                        session.add(doc)
-                        session.commit()
-                        session.refresh(doc)
-                        doc_id = doc.id
+                    # Ingest into SQL database (keyed by normalized URL)
+                    doc_id = document_registry.upsert(url, title, brand.id).id
                     
                     # Ingest into vector DB (ChromaDB)
                     try:
@@ -171,7 +162,7 @@ class AllenHeathIngestionManager:
                         logger.warning(f"      ⚠ Vector DB ingestion warning: {str(ve)[:60]}")
                     
                     self.new_documents += 1
-                    self.ingested_urls.add(url)
+                    self.ingested_urls.add(normalize_url(url))
                     logger.info(f"      ✓ Ingested (doc_id={doc_id})")
                     
                 except Exception as e:
@@ -14,6 +14,7 @@ from playwright.async_api import async_playwright, Browser, Page
 from bs4 import BeautifulSoup
 from app.core.database import Session, engine
 from app.models.sql_models import Brand, Document
+from app.services.document_registry import document_registry, normalize_url
 from sqlmodel import select
 
 logging.basicConfig(
@@ -157,7 +158,8 @@ class SupportCenterIngester:
         ).all()
         self.ingested_urls = {doc.url for doc in existing_docs}
         
-        new_urls = [url for url in article_urls if url not in self.ingested_urls]
+        # Document URLs are stored normalized
+        new_urls = [url for url in article_urls if normalize_url(url) not in self.ingested_urls]
         logger.info(f"📝 PHASE 2: Ingesting {len(new_urls)} new articles for {self.brand_name}...")
         
         # Batch process
@@ -184,22 +186,13 @@ class SupportCenterIngester:
                     content_text = self._extract_text(str(content_div)) if content_div else ""
                     content_hash = hashlib.md5(content_text.encode()).hexdigest()
                     
-                    # Create and save document
-                    doc = Document(
-                        brand_id=brand.id,
-                        title=title,
-                        url=url,
-                        content=content_text,
-                        content_hash=content_hash,
-                    )
-                    self.session.add(doc)
-                    self.session.commit()
+                    # Create or update the document (keyed by normalized URL)
+                    document_registry.upsert(url, title, brand.id, content_hash=content_hash)
                     
                     logger.info(f"  ✓ Ingested: {title[:50]}")
                     
                 except Exception as e:
                     logger.error(f"Error ingesting {url}: {e}")
-                    self.session.rollback()
                     
             logger.info(f"  → Batch {i//batch_size + 1}: {min(batch_size, len(new_urls)-i)} articles")
             
@@ -19,6 +19,7 @@ from app.core.database import create_db_and_tables, engine
 from app.models.sql_models import Brand, Document, IngestLog, Product, ProductFamily
 from app.services.ingestion_tracker import tracker
 from app.services.rag_service import ingest_document
+from app.services.document_registry import document_registry, normalize_url
 
 # Configure logging
 logging.basicConfig(
@@ -301,7 +302,8 @@ class ComprehensiveIngester:
         logger.info(f"  Loaded {len(products_map)} products for linking")
         
         for idx, url in enumerate(urls):
-            if url in self.ingested_urls:
+            # Document URLs are stored normalized
+            if normalize_url(url) in self.ingested_urls:
                 continue
             
             try:
@@ -332,19 +334,15 @@ class ComprehensiveIngester:
                         product_id = products_map[p_name]
                         break
 
-                # Store document
-                with Session(engine) as session:
-                    doc = Document(
-                        brand_id=brand_id,
-                        title=title[:200],
-                        url=url,
-                        content_hash=content_hash,
-                        last_updated=datetime.utcnow(),
-                        product_id=product_id
-                    )
-                    session.add(doc)
-                    session.commit()
-                    session.refresh(doc)
+                # Store document (keyed by normalized URL)
+                doc = document_registry.upsert(
+                    url,
+                    title[:200],
+                    brand_id,
+                    product_id=product_id,
+                    content_hash=content_hash,
+                    last_updated=datetime.utcnow(),
+                )
                 
                 # Ingest into Vector DB
                 try:
@@ -361,7 +359,7 @@ class ComprehensiveIngester:
                 except Exception as ve:
                     logger.error(f"      Vector DB error: {ve}")
 
-                self.ingested_urls.add(url)
+                self.ingested_urls.add(normalize_url(url))
                 self.processed_hashes.add(content_hash)
                 ingested_count += 1
                 
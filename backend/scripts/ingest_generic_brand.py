@@ -9,23 +9,28 @@ import logging
 import sys
 import hashlib
 import re
-import io
-import aiohttp
 from datetime import datetime
 from pathlib import Path
 from typing import List, Set, Dict
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import Page
 from sqlmodel import Session, select
-from pypdf import PdfReader
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.core.database import engine
-from app.models.sql_models import Brand, Product, ProductFamily, Document
-from app.services.rag_service import ingest_document
+from app.models.sql_models import Brand
+from app.services.ingestion_pipeline import PipelineItem, ingestion_pipeline
 from app.services.ingestion_tracker import tracker
+from app.services.crawl_frontier import frontier, QUEUED, LEASED, FAILED
+from app.engines.browser_pool import browser_pool
+from app.services.pdf_downloader import pdf_downloader
+from app.services.page_archive import page_archive
+from app.services.catalog_writer import catalog_writer
+from app.services.document_registry import document_registry
+from app.services.pdf_extraction import pdf_extractor
+from app.engines.page_extractor import html_to_text
+from app.services.boilerplate import boilerplate
 
 # Configure logging
 logging.basicConfig(
@@ -47,6 +52,8 @@ class GenericIngester:
         self.brand_id = None
         self.processed_count = 0
         self.ingested_count = 0
+        # SHA-256 -> first URL, so a manual linked from many products is parsed once
+        self.pdf_hashes: Dict[str, str] = {}
         
         with Session(engine) as session:
             brand = session.exec(select(Brand).where(Brand.name == brand_name)).first()
@@ -66,43 +73,53 @@ class GenericIngester:
             logger.error(f"No base URL for {self.brand_name}. Skipping.")
             return
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-            page = await context.new_page()
-            
-            logger.info(f"Starting discovery for {self.brand_name} at {self.base_url}")
-            await self.discover_products(page, self.base_url)
-            
-            logger.info(f"Found {len(self.product_urls)} potential product pages and {len(self.pdf_urls)} PDFs for {self.brand_name}")
-            
-            tracker.update_urls(len(self.product_urls) + len(self.pdf_urls), 0, brand_name=self.brand_name)
+        async with browser_pool.page() as page:
+            if await asyncio.to_thread(frontier.has_pending, self.brand_id):
+                # A previous run was interrupted: continue from the persisted frontier
+                logger.info(f"Resuming {self.brand_name} from crawl frontier: {await asyncio.to_thread(frontier.stats, self.brand_id)}")
+            else:
+                logger.info(f"Starting discovery for {self.brand_name} at {self.base_url}")
+                await self.discover_products(page, self.base_url)
+                
+                logger.info(f"Found {len(self.product_urls)} potential product pages and {len(self.pdf_urls)} PDFs for {self.brand_name}")
+                
+                # Limit to 1000 products and 100 PDFs; product pages are leased first
+                await asyncio.to_thread(frontier.enqueue, self.brand_id, list(self.product_urls)[:1000], priority=1, requeue_done=True)
+                await asyncio.to_thread(frontier.enqueue, self.brand_id, list(self.pdf_urls)[:100], priority=0, requeue_done=True)
             
-            # Limit to 1000 products for generic ingestion (increased from 50)
-            to_process = list(self.product_urls)[:1000]
-            for url in to_process:
-                try:
-                    await self.ingest_product_page(page, url)
-                    self.processed_count += 1
-                    tracker.update_urls(len(self.product_urls) + len(self.pdf_urls), self.processed_count, brand_name=self.brand_name)
-                except Exception as e:
-                    logger.error(f"Error ingesting {url}: {e}")
+            stats = await asyncio.to_thread(frontier.stats, self.brand_id)
+            total = stats[QUEUED] + stats[LEASED] + stats[FAILED]
+            tracker.update_urls(total, 0, brand_name=self.brand_name)
             
-            # Process PDFs
-            for url in list(self.pdf_urls)[:100]:
-                try:
-                    await self.ingest_pdf(url)
-                    self.processed_count += 1
-                    tracker.update_urls(len(self.product_urls) + len(self.pdf_urls), self.processed_count, brand_name=self.brand_name)
-                except Exception as e:
-                    logger.error(f"Error ingesting PDF {url}: {e}")
+            try:
+                while True:
+                    batch = await asyncio.to_thread(frontier.lease, self.brand_id, limit=10)
+                    if not batch:
+                        break
+                    for url in batch:
+                        try:
+                            if url.lower().endswith(".pdf"):
+                                queued = await self.ingest_pdf(url)
+                            else:
+                                queued = await self.ingest_product_page(page, url)
+                            # Queued documents are marked done or failed once they leave the pipeline
+                            if not queued:
+                                await asyncio.to_thread(frontier.complete, url)
+                        except Exception as e:
+                            logger.error(f"Error ingesting {url}: {e}")
+                            await asyncio.to_thread(frontier.fail, url, str(e))
+                        self.processed_count += 1
+                        tracker.update_urls(total, self.processed_count, brand_name=self.brand_name)
+                # Wait for queued pages and manuals to be stored (they are still leased)
+                await ingestion_pipeline.drain()
+            finally:
+                await asyncio.to_thread(frontier.release, self.brand_id)
             
+            catalog_writer.flush()
+            boilerplate.flush()
+
             # Mark as complete
             tracker.update_brand_complete(self.brand_name, self.ingested_count)
-            
-            await browser.close()
 
     async def discover_products(self, page: Page, url: str, depth: int = 0):
         """Discovery with limited recursion for category pages"""
@@ -161,117 +178,102 @@ class GenericIngester:
         except Exception as e:
             logger.error(f"Discovery error at {url}: {e}")
 
-    async def ingest_pdf(self, url: str):
+    async def ingest_pdf(self, url: str) -> bool:
+        """Returns True if the manual was queued in the ingestion pipeline."""
         logger.info(f"Ingesting PDF: {url}")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to download PDF: {url}")
-                    return
-                
-                data = await response.read()
-                pdf_file = io.BytesIO(data)
-                reader = PdfReader(pdf_file)
-                
-                text_content = ""
-                for page in reader.pages:
-                    text_content += page.extract_text() + "\n"
-                
-                if len(text_content) < 200:
-                    logger.warning(f"PDF content too short for {url}, skipping.")
-                    return
-                
-                title = url.split("/")[-1]
-                await self._save_document(url, title, text_content, "pdf_manual")
+        result = await pdf_downloader.fetch(url)
+        if not result.ok:
+            raise RuntimeError(f"Failed to download PDF: {url} ({result.error})")
+        
+        if result.sha256 in self.pdf_hashes:
+            logger.info(f"Same PDF already ingested from {self.pdf_hashes[result.sha256]}, skipping {url}")
+            return False
+        self.pdf_hashes[result.sha256] = url
+        
+        # Parsed on the extraction pool, or read back from the extraction cache
+        text_content = await pdf_extractor.extract_text(result.path, sha256=result.sha256)
+        
+        if len(text_content) < 200:
+            logger.warning(f"PDF content too short for {url}, skipping.")
+            return False
+        
+        title = url.split("/")[-1]
+        await self._save_document(url, title, text_content, "pdf_manual")
+        return True
 
-    async def ingest_product_page(self, page: Page, url: str):
+    async def ingest_product_page(self, page: Page, url: str) -> bool:
         logger.info(f"Ingesting: {url}")
         await page.goto(url, wait_until="domcontentloaded", timeout=60000)
         await asyncio.sleep(2)
         
         content = await page.content()
-        soup = BeautifulSoup(content, "html.parser")
+        await asyncio.to_thread(page_archive.store, url, content, self.brand_id)
         
-        # Clean up
-        for tag in soup(["script", "style", "nav", "footer", "header"]):
-            tag.decompose()
-            
-        title = soup.title.string if soup.title else url.split("/")[-1]
-        text_content = soup.get_text(separator="\n", strip=True)
-        
-        if len(text_content) < 200:
-            logger.warning(f"Content too short for {url}, skipping.")
-            return
-
-        await self._save_document(url, title, text_content, "product_page")
+        # Parsing (cached by HTML hash), persisting and embedding run in the pipeline
+        item = self._document_item(url, "product_page")
+        item.html = content
+        item.extract = lambda html: html_to_text(html, url=url, learn=True)
+        await ingestion_pipeline.submit(item, stage="extract")
+        return True
 
     async def _save_document(self, url: str, title: str, text_content: str, doc_type: str):
+        item = self._document_item(url, doc_type)
+        item.title = title
+        item.text = text_content
+        await ingestion_pipeline.submit(item, stage="persist")
+
+    def _document_item(self, url: str, doc_type: str) -> PipelineItem:
+        return PipelineItem(
+            url=url,
+            metadata={"source": url, "brand": self.brand_name, "type": doc_type},
+            persist=lambda item: self._persist_document(item, doc_type),
+            on_complete=self._on_document_complete,
+        )
+
+    async def _on_document_complete(self, item: PipelineItem, error):
+        if error:
+            await asyncio.to_thread(frontier.fail, item.url, error)
+        else:
+            await asyncio.to_thread(frontier.complete, item.url)
+        if error is None and item.chunks:
+            logger.info(f"✅ RAG Ingested: {item.title} ({item.metadata.get('type')})")
+            self.ingested_count += 1
+            tracker.update_document_count(self.brand_name, self.ingested_count)
+
+    def _persist_document(self, item: PipelineItem, doc_type: str):
+        """Persist stage (runs in a thread). Returns chunk metadata, or None to skip embedding."""
+        url = item.url
+        text_content = item.text
+        title = item.title or url.split("/")[-1]
+
+        if doc_type == "product_page" and len(text_content) < 200:
+            logger.warning(f"Content too short for {url}, skipping.")
+            return None
+
         content_hash = hashlib.md5(text_content.encode()).hexdigest()
+        known = catalog_writer.document(self.brand_id, url)
+        if known and known[1] == content_hash:
+            logger.info(f"Already ingested and unchanged: {url}")
+            return None
         
-        with Session(engine) as session:
-            # Check if already exists
-            existing = session.exec(select(Document).where(Document.url == url)).first()
-            if existing and existing.content_hash == content_hash:
-                logger.info(f"Already ingested and unchanged: {url}")
-                return
-            
-            # Create or update product
-            product_name = title.split("|")[0].split("-")[0].strip()
-            # Try to find product by name
-            product = session.exec(select(Product).where(Product.name == product_name, Product.family_id.in_(
-                select(ProductFamily.id).where(ProductFamily.brand_id == self.brand_id)
-            ))).first()
-            
-            if not product:
-                # Get or create family
-                family = session.exec(select(ProductFamily).where(ProductFamily.brand_id == self.brand_id)).first()
-                if not family:
-                    family = ProductFamily(name="General", brand_id=self.brand_id)
-                    session.add(family)
-                    session.commit()
-                    session.refresh(family)
-                
-                product = Product(name=product_name, family_id=family.id)
-                session.add(product)
-                session.commit()
-                session.refresh(product)
+        # Get or create product (identity-mapped, batched with other catalog writes)
+        product_name = title.split("|")[0].split("-")[0].strip()
+        product_id = catalog_writer.product_id(self.brand_id, product_name)
 
-            if existing:
-                existing.title = title
-                existing.content_hash = content_hash
-                existing.last_updated = datetime.now()
-                doc = existing
-            else:
-                doc = Document(
-                    title=title,
-                    url=url,
-                    content_hash=content_hash,
-                    brand_id=self.brand_id,
-                    product_id=product.id,
-                    last_updated=datetime.now()
-                )
-                session.add(doc)
-            
-            session.commit()
-            session.refresh(doc)
-            
-            # RAG Ingestion
-            try:
-                await ingest_document(
-                    text=text_content,
-                    metadata={
-                        "source": url,
-                        "title": title,
-                        "brand": self.brand_name,
-                        "product": product_name,
-                        "type": doc_type
-                    }
-                )
-                logger.info(f"✅ RAG Ingested: {title} ({doc_type})")
-                self.ingested_count += 1
-                tracker.update_document_count(self.brand_name, self.ingested_count)
-            except Exception as e:
-                logger.error(f"RAG error for {url}: {e}")
+        result = document_registry.upsert(
+            url,
+            title,
+            self.brand_id,
+            product_id=product_id,
+            content_hash=content_hash,
+            last_updated=datetime.now(),
+        )
+        catalog_writer.record_document(self.brand_id, url, result.id, content_hash)
+        if not result.changed:
+            logger.info(f"Already ingested and unchanged: {url}")
+            return None
+        item.title = title
+        return {"title": title, "product": product_name, "doc_id": int(result.id)}
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -281,5 +283,13 @@ if __name__ == "__main__":
     brand_name = sys.argv[1]
     base_url = sys.argv[2] if len(sys.argv) > 2 else ""
     
-    ingester = GenericIngester(brand_name, base_url)
-    asyncio.run(ingester.run())
+    async def main():
+        try:
+            await GenericIngester(brand_name, base_url).run()
+        finally:
+            await ingestion_pipeline.stop()
+            await browser_pool.stop()
+            await pdf_downloader.close()
+            pdf_extractor.close()
+
+    asyncio.run(main())
@@ -12,13 +12,15 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.core.database import get_session
-from app.models.sql_models import Brand, Product, ProductFamily, Document
+from app.models.sql_models import Brand, Product, ProductFamily
 from app.services.scraper_service import BrandScraper
 from app.services.rag_service import ingest_document
+from app.services.document_registry import document_registry
 from app.services.ingestion_tracker import tracker
 from sqlmodel import select
 import logging
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from app.engines.browser_pool import browser_pool
 import hashlib
 from bs4 import BeautifulSoup
 from datetime import datetime
@@ -54,14 +56,7 @@ async def scrape_brand_products(brand: Brand, max_products: int = 1000):
     products_found = []
     
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            # Use a more realistic user agent
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-            )
-            page = await context.new_page()
-            
+        async with browser_pool.page() as page:
             logger.info(f"Loading {brand.website_url}")
             tracker.update_step(f"Loading brand page for {brand.name}", brand.name)
             
@@ -127,8 +122,6 @@ async def scrape_brand_products(brand: Brand, max_products: int = 1000):
                     logger.debug(f"Error processing link {i}: {e}")
                     continue
             
-            await browser.close()
-            
     except Exception as e:
         logger.error(f"Error scraping products for {brand.name}: {e}")
     
@@ -150,20 +143,14 @@ async def ingest_product_page(product_info: dict, brand: Brand, current_idx: int
     max_retries = 2
     for attempt in range(max_retries + 1):
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-                )
-                page = await context.new_page()
-                
+            # Lease a warm page from the shared pool instead of launching a browser per product
+            async with browser_pool.page() as page:
                 # Less strict timeout and wait condition
                 try:
                     await page.goto(product_info['url'], wait_until='domcontentloaded', timeout=40000)
                 except PlaywrightTimeoutError:
                     if attempt < max_retries:
                         logger.warning(f"  Retrying {product_info['name']} (Attempt {attempt+1})")
-                        await browser.close()
                         continue
                     else:
                         raise
@@ -191,7 +178,6 @@ async def ingest_product_page(product_info: dict, brand: Brand, current_idx: int
                 # --- STRICT VALIDATION BEFORE DB WRITE ---
                 if len(text_content) < 200:
                     logger.warning(f"  ⚠️ Content too short for {product_info['name']} ({len(text_content)} chars), skipping")
-                    await browser.close()
                     return False
                 
                 # Clean up the name - sometimes it has "Price" or other junk
@@ -205,25 +191,17 @@ async def ingest_product_page(product_info: dict, brand: Brand, current_idx: int
                 # If name is too short or just numbers, it's probably junk
                 if not clean_name or len(clean_name) < 3 or clean_name.isdigit():
                     logger.warning(f"  ⚠️ Invalid product name '{clean_name}', skipping")
-                    await browser.close()
                     return False
 
                 # Create content hash for deduplication
                 content_hash = hashlib.md5(text_content.encode()).hexdigest()
                 
                 # Check if already ingested
-                session = next(get_session())
-                existing = session.exec(
-                    select(Document).where(
-                        Document.url == product_info['url'],
-                        Document.brand_id == brand.id
-                    )
-                ).first()
+                existing = document_registry.get(product_info['url'])
                 
                 if existing and existing.content_hash == content_hash:
                     logger.debug(f"  ⏭️ Already indexed: {clean_name}")
                     tracker.update_urls(total_count, current_idx)
-                    await browser.close()
                     return False
                 
                 # Ingest into vector DB
@@ -240,25 +218,15 @@ async def ingest_product_page(product_info: dict, brand: Brand, current_idx: int
                 chunks_count = await ingest_document(text_content, metadata)
                 logger.info(f"  ✓ Ingested: {clean_name} ({chunks_count} chunks)")
                 
-                # Update or create document record
-                if existing:
-                    existing.content_hash = content_hash
-                    existing.last_updated = datetime.now()
-                    existing.title = clean_name
-                    session.add(existing)
-                else:
-                    doc = Document(
-                        title=clean_name,
-                        url=product_info['url'],
-                        content_hash=content_hash,
-                        brand_id=brand.id,
-                        last_updated=datetime.now()
-                    )
-                    session.add(doc)
-                
-                session.commit()
+                # Update or create document record (keyed by normalized URL); no hash if nothing was stored, so it's retried
+                document_registry.upsert(
+                    product_info['url'],
+                    clean_name,
+                    brand.id,
+                    content_hash=content_hash if chunks_count else None,
+                    last_updated=datetime.now(),
+                )
                 tracker.update_urls(total_count, current_idx)
-                await browser.close()
                 return True
                 
         except Exception as e:
@@ -342,15 +310,18 @@ async def main():
     success_count = 0
     fail_count = 0
     
-    for i, brand in enumerate(brands, 1):
-        logger.info(f"\n[{i}/{len(brands)}] Processing: {brand.name}")
-        is_priority = brand.name in PRIORITY_BRANDS
-        if await ingest_brand(brand, priority=is_priority):
-            success_count += 1
-        else:
-            fail_count += 1
-        
-        await asyncio.sleep(1)
+    try:
+        for i, brand in enumerate(brands, 1):
+            logger.info(f"\n[{i}/{len(brands)}] Processing: {brand.name}")
+            is_priority = brand.name in PRIORITY_BRANDS
+            if await ingest_brand(brand, priority=is_priority):
+                success_count += 1
+            else:
+                fail_count += 1
+            
+            await asyncio.sleep(1)
+    finally:
+        await browser_pool.stop()
     
     # Summary
     logger.info("\n" + "="*80)
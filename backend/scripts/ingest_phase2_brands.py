@@ -18,6 +18,7 @@ from sqlmodel import Session, select, SQLModel
 from app.core.database import create_db_and_tables, engine
 from app.models.sql_models import Brand, Document, IngestLog
 from app.services.rag_service import ingest_document
+from app.services.document_registry import document_registry, normalize_url
 from app.services.ingestion_tracker import tracker
 
 # Configure logging
@@ -212,7 +213,8 @@ class Phase2Ingester:
             new_count = 0
             
             for idx, url in enumerate(discovered_urls, 1):
-                if url in self.ingested_urls:
+                # Document URLs are stored normalized
+                if normalize_url(url) in self.ingested_urls:
                     continue
                     
                 if new_count >= config["target_docs"]:
@@ -225,20 +227,15 @@ class Phase2Ingester:
                     title, content = await self.extract_content(page)
                     
                     if content and len(content) > 100:
-                        # Create document in SQL DB
-                        doc = Document(
-                            brand_id=config['brand_id'],
-                            title=title[:200],
-                            url=url,
+                        # Create or update the document in SQL DB (keyed by normalized URL)
+                        doc = document_registry.upsert(
+                            url,
+                            title[:200],
+                            config['brand_id'],
                             content_hash=self.get_content_hash(content),
-                            last_updated=datetime.utcnow()
+                            last_updated=datetime.utcnow(),
                         )
                         
-                        with Session(engine) as session:
-                            session.add(doc)
-                            session.commit()
-                            session.refresh(doc)
-                        
                         # Ingest into Vector DB
                         try:
                             await ingest_document(
@@ -0,0 +1,56 @@
+"""
+Learn per-domain boilerplate from the page archive.
+Crawls update the models as they run; this bootstraps them for domains
+crawled before boilerplate stripping existed, so the next reprocess
+(scripts/reprocess_archive.py) strips cookie banners, menus and sign-up
+blocks right away. Models are saved under data/boilerplate/.
+
+Usage:
+    python scripts/learn_boilerplate.py
+    python scripts/learn_boilerplate.py --brand 3
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.engines.ingestion_engine import extract_text
+from app.services.boilerplate import boilerplate
+from app.services.page_archive import page_archive
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Learn boilerplate lines per domain from archived pages")
+    parser.add_argument("--brand", type=int, help="Only pages of this brand id")
+    args = parser.parse_args()
+
+    if not boilerplate.enabled:
+        logger.error("BOILERPLATE_SHARE is 0 (disabled)")
+        sys.exit(1)
+
+    snapshots = page_archive.latest_snapshots(args.brand)
+    logger.info(f"Learning from {len(snapshots)} archived pages")
+    for i, snapshot in enumerate(snapshots, 1):
+        try:
+            extract_text(page_archive.load(snapshot.sha256), snapshot.url, learn=True)
+        except Exception as e:
+            logger.warning(f"Skipping {snapshot.url}: {e}")
+        if i % 500 == 0:
+            logger.info(f"{i}/{len(snapshots)} pages")
+    boilerplate.flush()
+
+    for domain, stats in sorted(boilerplate.get_stats()["domains"].items()):
+        logger.info(
+            f"{domain}: {stats['learned_pages']} pages, {stats['boilerplate_lines']} boilerplate lines, "
+            f"{stats['stripped']:.1%} of text stripped so far"
+        )
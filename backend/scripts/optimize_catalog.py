@@ -19,6 +19,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.core.database import engine
 from app.models.sql_models import Brand, Product, ProductFamily, Document, IngestLog
+from app.services.vector_reconciler import vector_reconciler
 
 # Configure logging
 logging.basicConfig(
@@ -63,6 +64,10 @@ def optimize_catalog():
         
         session.commit()
         logger.info(f"✅ Removed {removed_count} duplicate documents")
+        if removed_count:
+            # Drop the removed documents' chunks in one batched pass
+            report = vector_reconciler.reconcile()
+            logger.info(f"✅ Removed {sum(report['deleted'].values())} orphan chunks from the vector store")
 
         # 2. Link Unlinked Documents
         logger.info("\n🔗 Linking orphaned documents...")
@@ -0,0 +1,70 @@
+"""
+Move chunks from the shared `support_docs` collection into per-brand partitions.
+Embeddings are copied as-is, so nothing is re-embedded. Chunks whose brand
+can't be resolved stay in the shared collection.
+
+Usage:
+    python scripts/partition_vectors.py                # move, then delete from support_docs
+    python scripts/partition_vectors.py --keep-source  # copy only
+    python scripts/partition_vectors.py --dry-run      # report per-brand counts
+"""
+
+import argparse
+import logging
+import os
+import sys
+from collections import Counter
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.vector_db import get_collection
+from app.services.vector_router import vector_router
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def partition(batch_size=500, keep_source=False, dry_run=False):
+    source = get_collection()
+    total = source.count()
+    logger.info(f"support_docs holds {total} chunks")
+
+    moved_ids, per_brand, unrouted = [], Counter(), 0
+    for offset in range(0, total, batch_size):
+        batch = source.get(limit=batch_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+        routed = [i for i, meta in enumerate(batch["metadatas"]) if vector_router.brand_id_for(meta or {}) is not None]
+        unrouted += len(batch["ids"]) - len(routed)
+        for i in routed:
+            per_brand[vector_router.brand_id_for(batch["metadatas"][i])] += 1
+        if routed and not dry_run:
+            vector_router.upsert(
+                documents=[batch["documents"][i] for i in routed],
+                metadatas=[batch["metadatas"][i] for i in routed],
+                ids=[batch["ids"][i] for i in routed],
+                embeddings=[batch["embeddings"][i] for i in routed],
+            )
+        moved_ids.extend(batch["ids"][i] for i in routed)
+        logger.info(f"Processed {min(offset + batch_size, total)}/{total}")
+
+    for brand_id, count in sorted(per_brand.items()):
+        logger.info(f"  brand_{brand_id}: {count} chunks")
+    logger.info(f"{len(moved_ids)} chunks routed to {len(per_brand)} partitions, {unrouted} left in support_docs")
+
+    # Delete only after the full pass: deleting while paging would shift the offsets
+    if moved_ids and not keep_source and not dry_run:
+        for start in range(0, len(moved_ids), batch_size):
+            source.delete(ids=moved_ids[start:start + batch_size])
+        logger.info(f"Deleted {len(moved_ids)} moved chunks from support_docs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split support_docs into per-brand Chroma collections")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--keep-source", action="store_true", help="Copy without deleting from support_docs")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would move")
+    args = parser.parse_args()
+    partition(args.batch_size, keep_source=args.keep_source, dry_run=args.dry_run)
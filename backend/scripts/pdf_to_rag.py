@@ -22,10 +22,13 @@ import asyncio
 # Add parent to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import pdfplumber
-from app.services.rag_service import ingest_document
+from app.services.rag_service import ingest_document_pages
+from app.services.pdf_extraction import pdf_extractor
+from app.services.chunking import STRUCTURED
+from app.core.config import settings
+from app.services.catalog_writer import catalog_writer
 from app.core.database import Session, engine
-from app.models.sql_models import Brand, Product, ProductFamily, Document
+from app.models.sql_models import Brand
 from sqlmodel import select
 
 logging.basicConfig(
@@ -38,24 +41,17 @@ BRAND_DOCS_DIR = Path("data/brand_docs")
 class PDFToRAGProcessor:
     def __init__(self, brand_name=None):
         self.brand_name = brand_name
+        self.brand_id = None
         self.processed_count = 0
         self.error_count = 0
         
-    def extract_text_from_pdf(self, pdf_path):
-        """Extract text from PDF file"""
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                text_parts = []
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-                
-                full_text = "\n\n".join(text_parts)
-                return full_text.strip()
-        except Exception as e:
-            logging.error(f"Error extracting text from {pdf_path}: {e}")
-            return None
+    def file_hash(self, pdf_path):
+        """SHA-256 of the PDF file (used as the document content hash)"""
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
     
     def get_or_create_brand(self, session, brand_name):
         """Get brand from DB or create if doesn't exist"""
@@ -76,115 +72,69 @@ class PDFToRAGProcessor:
         
         return brand
     
-    def get_or_create_product(self, session, brand_id, product_name):
-        """Get product from DB or create if doesn't exist"""
-        # First check if product exists
-        statement = select(Product).join(ProductFamily).where(
-            Product.name.ilike(product_name),
-            ProductFamily.brand_id == brand_id
-        )
-        product = session.exec(statement).first()
-        
-        if not product:
-            # Get or create default product family
-            family_statement = select(ProductFamily).where(
-                ProductFamily.brand_id == brand_id,
-                ProductFamily.name == "General"
-            )
-            family = session.exec(family_statement).first()
-            
-            if not family:
-                family = ProductFamily(
-                    name="General",
-                    brand_id=brand_id
-                )
-                session.add(family)
-                session.commit()
-                session.refresh(family)
-            
-            # Create product
-            product = Product(
-                name=product_name,
-                family_id=family.id
-            )
-            session.add(product)
-            session.commit()
-            session.refresh(product)
-            logging.info(f"Created new product: {product_name}")
-        
-        return product
+    def get_or_create_product(self, brand_id, product_name):
+        """Product id from the catalog identity map, creating the product if needed"""
+        return catalog_writer.product_id(brand_id, product_name, family_name="General")
     
     async def process_pdf(self, pdf_path, manifest_entry):
         """Process a single PDF: extract text and index in RAG"""
         logging.info(f"Processing: {pdf_path.name}")
         
-        # Extract text
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text or len(text) < 100:
-            logging.warning(f"  ⚠️ Insufficient text extracted ({len(text) if text else 0} chars)")
-            self.error_count += 1
-            return False
-        
         try:
-            with Session(engine) as session:
-                # Get or create brand
-                brand = self.get_or_create_brand(session, self.brand_name)
-                
-                # Get or create product
-                product_name = manifest_entry.get('product_name', 'Unknown')
-                product = self.get_or_create_product(session, brand.id, product_name)
-                
-                # Check if document already exists
-                content_hash = hashlib.md5(text.encode()).hexdigest()
-                doc_statement = select(Document).where(
-                    Document.url == manifest_entry['url'],
-                    Document.brand_id == brand.id
-                )
-                existing_doc = session.exec(doc_statement).first()
-                
-                if existing_doc:
-                    if existing_doc.content_hash == content_hash:
-                        logging.info(f"  ⏭️ Already indexed (unchanged)")
-                        return True
-                    else:
-                        logging.info(f"  🔄 Updating existing document")
-                
-                # Create document title
-                doc_type = manifest_entry.get('doc_type', 'other')
-                title = f"{product_name} - {doc_type.replace('_', ' ').title()}"
-                
-                # Create or update document record
-                if existing_doc:
-                    existing_doc.content_hash = content_hash
-                    existing_doc.last_updated = datetime.utcnow()
-                    session.add(existing_doc)
+            brand_id = self.brand_id
+            
+            # Get or create product
+            product_name = manifest_entry.get('product_name', 'Unknown')
+            product_id = self.get_or_create_product(brand_id, product_name)
+            
+            # Check if document already exists (file hash, known before extraction)
+            content_hash = manifest_entry.get('sha256') or self.file_hash(pdf_path)
+            existing_doc = catalog_writer.document(brand_id, manifest_entry['url'])
+            
+            if existing_doc:
+                if existing_doc[1] == content_hash:
+                    logging.info(f"  ⏭️ Already indexed (unchanged)")
+                    return True
                 else:
-                    doc = Document(
-                        title=title,
-                        url=manifest_entry['url'],
-                        content_hash=content_hash,
-                        last_updated=datetime.utcnow(),
-                        brand_id=brand.id,
-                        product_id=product.id
-                    )
-                    session.add(doc)
-                
-                session.commit()
-                
-                # Ingest into RAG (ChromaDB)
-                metadata = {
-                    "brand": self.brand_name,
-                    "product": product_name,
-                    "doc_type": doc_type,
-                    "source_url": manifest_entry['url'],
-                    "title": title
-                }
-                
-                await ingest_document(text=text, metadata=metadata)
-                
-                logging.info(f"  ✅ Indexed: {len(text)} chars")
-                self.processed_count += 1
-                return True
+                    logging.info(f"  🔄 Updating existing document")
+            
+            # Create document title
+            doc_type = manifest_entry.get('doc_type', 'other')
+            title = f"{product_name} - {doc_type.replace('_', ' ').title()}"
+            
+            # Ingest into RAG (ChromaDB), streaming pages from the extraction pool or cache
+            metadata = {
+                "brand": self.brand_name,
+                "product": product_name,
+                "doc_type": doc_type,
+                "source_url": manifest_entry['url'],
+                "title": title
+            }
+            
+            chunk_count = await ingest_document_pages(
+                pdf_extractor.iter_pages(pdf_path, sha256=content_hash),
+                metadata,
+                # Bookmarks only matter to the structured chunker
+                outline=await pdf_extractor.outline(pdf_path) if settings.CHUNKING_MODE == STRUCTURED else None,
+            )
+            if not chunk_count:
+                logging.warning(f"  ⚠️ Insufficient text extracted")
+                self.error_count += 1
+                return False
+            
+            # Create or update document record (buffered, written in batches)
+            catalog_writer.save_document(
+                brand_id,
+                manifest_entry['url'],
+                title,
+                content_hash=content_hash,
+                product_id=product_id,
+                last_updated=datetime.utcnow(),
+            )
+            
+            logging.info(f"  ✅ Indexed: {chunk_count} chunks")
+            self.processed_count += 1
+            return True
                 
         except Exception as e:
             logging.error(f"  ✗ Error processing: {e}")
@@ -211,12 +161,27 @@ class PDFToRAGProcessor:
         logging.info(f"Processing {brand_name}: {len(manifest)} PDFs")
         logging.info(f"{'='*80}\n")
         
+        with Session(engine) as session:
+            self.brand_id = self.get_or_create_brand(session, brand_name).id
+        
+        # Create every product in the manifest in one batched write
         for entry in manifest:
+            catalog_writer.add_product(self.brand_id, entry.get('product_name', 'Unknown'), family_name="General")
+        catalog_writer.flush()
+        
+        # Several PDFs in flight so small manuals still keep every extraction worker busy
+        semaphore = asyncio.Semaphore(pdf_extractor.max_workers)
+        
+        async def process_entry(entry):
             pdf_path = Path(entry['filepath'])
-            if pdf_path.exists():
-                await self.process_pdf(pdf_path, entry)
-            else:
+            if not pdf_path.exists():
                 logging.warning(f"PDF not found: {pdf_path}")
+                return
+            async with semaphore:
+                await self.process_pdf(pdf_path, entry)
+        
+        await asyncio.gather(*(process_entry(entry) for entry in manifest))
+        catalog_writer.flush()
         
         # Summary
         logging.info(f"\n{'='*80}")
@@ -244,13 +209,16 @@ class PDFToRAGProcessor:
 async def main():
     processor = PDFToRAGProcessor()
     
-    if len(sys.argv) > 1:
-        # Process specific brand
-        brand_name = sys.argv[1]
-        await processor.process_brand(brand_name)
-    else:
-        # Process all brands
-        await processor.process_all_brands()
+    try:
+        if len(sys.argv) > 1:
+            # Process specific brand
+            brand_name = sys.argv[1]
+            await processor.process_brand(brand_name)
+        else:
+            # Process all brands
+            await processor.process_all_brands()
+    finally:
+        pdf_extractor.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+"""
+Rebuild per-brand vector collections without downtime.
+Each brand gets a fresh collection built from the catalog and page archive,
+swapped in through its alias; the old collection is dropped afterwards.
+When the API server is running, prefer POST /api/ingestion/reindex so the
+rebuild runs inside the serving process.
+
+Usage:
+    python scripts/rebuild_index.py                 # every brand
+    python scripts/rebuild_index.py --brand-id 3 --workers 8
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.index_rebuilder import DROP_GRACE_SECONDS, index_rebuilder
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild vector collections and swap them in atomically")
+    parser.add_argument("--brand-id", type=int, help="Only this brand (default: every brand)")
+    parser.add_argument("--workers", type=int, default=index_rebuilder.workers, help="Embedding threads")
+    parser.add_argument("--drop-grace", type=float, default=DROP_GRACE_SECONDS, help="Seconds to keep old collections after the swap")
+    args = parser.parse_args()
+
+    index_rebuilder.workers = args.workers
+    started = time.time()
+    rebuilt = index_rebuilder.rebuild_all([args.brand_id] if args.brand_id else None, drop_grace=args.drop_grace)
+    failed = [b for b, s in index_rebuilder.status["brands"].items() if s["status"] == "failed"]
+    logger.info(f"Rebuilt {len(rebuilt)} brands ({sum(rebuilt.values())} chunks) in {time.time() - started:.1f}s; failed: {failed or 'none'}")
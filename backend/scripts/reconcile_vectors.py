@@ -0,0 +1,47 @@
+"""
+Reconcile the vector store with the SQL catalog.
+Deletes chunks of deleted documents and brands in batches and reports
+catalog documents that have no chunks (written to
+data/vector_reconcile_report.json). The worker also runs this incrementally;
+use this after bulk deletes (optimize_catalog.py, cleanup_deprecated_brands.py).
+
+Usage:
+    python scripts/reconcile_vectors.py                # delete orphans, report missing
+    python scripts/reconcile_vectors.py --dry-run      # report only
+    python scripts/reconcile_vectors.py --by-url       # also delete chunks whose URL has no Document row
+    python scripts/reconcile_vectors.py --requeue      # re-queue documents with no chunks for scraping
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.vector_reconciler import REPORT_FILE, vector_reconciler
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete orphan chunks and report documents missing from the vector store")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    parser.add_argument("--by-url", action="store_true", help="Also delete chunks without doc_id whose URL is not in the catalog")
+    parser.add_argument("--requeue", action="store_true", help="Queue documents with no chunks in the crawl frontier")
+    parser.add_argument("--page-size", type=int, default=vector_reconciler.page_size)
+    args = parser.parse_args()
+
+    vector_reconciler.page_size = args.page_size
+    report = vector_reconciler.reconcile(by_url=args.by_url, dry_run=args.dry_run, requeue=args.requeue)
+    logger.info(f"Orphans found: {report['orphans'] or 'none'}; deleted: {report['deleted'] or 'none'}")
+    for document in report["missing"][:20]:
+        logger.info(f"  no chunks: doc {document['doc_id']} {document['url']}")
+    if report["missing_documents"] > 20:
+        logger.info(f"  ... and {report['missing_documents'] - 20} more")
+    logger.info(f"Full report: {REPORT_FILE}")
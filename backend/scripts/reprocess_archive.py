@@ -0,0 +1,91 @@
+"""
+Reprocess archived pages offline.
+Rebuilds Document rows and Chroma chunks from the raw HTML page archive,
+without any network access. Pages are decompressed and parsed in parallel
+worker processes; rows and chunks are written by the ingestion pipeline.
+
+Usage:
+    python scripts/reprocess_archive.py                 # every archived URL
+    python scripts/reprocess_archive.py --brand-id 3    # one brand
+    python scripts/reprocess_archive.py --only-changed  # skip pages whose text hash is unchanged
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add parent to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.engines.ingestion_engine import IngestionEngine, extract_archived_page
+from app.services.ingestion_pipeline import ingestion_pipeline
+from app.services.page_archive import page_archive
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def reprocess(brand_id=None, workers=None, force=True):
+    snapshots = [s for s in page_archive.latest_snapshots(brand_id) if s.brand_id is not None]
+    logger.info(f"Reprocessing {len(snapshots)} archived pages" + (f" for brand {brand_id}" if brand_id else ""))
+    if not snapshots:
+        return
+
+    ingestion = IngestionEngine()
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    done = failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        # Submit in a bounded window so parsed text does not pile up ahead of the writer
+        window = (workers or os.cpu_count() or 2) * 4
+        pending = []
+        queue = list(snapshots)
+
+        while queue or pending:
+            while queue and len(pending) < window:
+                snapshot = queue.pop(0)
+                future = loop.run_in_executor(executor, extract_archived_page, snapshot.sha256, snapshot.url)
+                pending.append((snapshot, future))
+
+            snapshot, future = pending.pop(0)
+            try:
+                title, text = await future
+                await ingestion.save_extracted(
+                    snapshot.url,
+                    title or snapshot.url,
+                    text,
+                    snapshot.brand_id,
+                    snapshot.product_id,
+                    force=force,
+                    fetched_at=snapshot.fetched_at,
+                )
+                done += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to reprocess {snapshot.url}: {e}")
+
+            if (done + failed) % 100 == 0:
+                rate = (done + failed) / max(time.monotonic() - started, 1e-6)
+                logger.info(f"Progress: {done + failed}/{len(snapshots)} ({rate:.1f} pages/s)")
+
+    # Wait for queued pages to be persisted and embedded
+    await ingestion_pipeline.stop()
+    logger.info(f"Reprocessing complete: {done} rebuilt, {failed} failed in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild documents and chunks from the page archive")
+    parser.add_argument("--brand-id", type=int, default=None, help="Only reprocess this brand")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--only-changed", action="store_true", help="Skip pages whose extracted text is unchanged")
+    args = parser.parse_args()
+
+    asyncio.run(reprocess(brand_id=args.brand_id, workers=args.workers, force=not args.only_changed))
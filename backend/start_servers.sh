@@ -7,6 +7,12 @@ echo "=========================================="
 
 cd /workspaces/Support-Center-/backend
 
+echo ""
+echo "🚀 Starting Vector Store Service..."
+PYTHONPATH=. python vector_server.py &
+VECTOR_PID=$!
+sleep 3
+
 echo ""
 echo "🚀 Starting Backend Server on port 8000..."
 PYTHONPATH=. python -m uvicorn app.main:app --host 0.0.0.0 --port 8000 &
@@ -26,11 +32,12 @@ echo "=========================================="
 echo "Backend  (API):  http://localhost:8000"
 echo "Frontend (UI):   http://localhost:3000"
 echo ""
+echo "Vector   PID: $VECTOR_PID"
 echo "Backend  PID: $BACKEND_PID"
 echo "Frontend PID: $FRONTEND_PID"
 echo ""
 echo "To stop servers, run:"
-echo "  kill $BACKEND_PID $FRONTEND_PID"
+echo "  kill $BACKEND_PID $FRONTEND_PID $VECTOR_PID"
 echo ""
 echo "To monitor:"
 echo "  tail -f /tmp/backend.log"
@@ -0,0 +1,248 @@
+"""
+Vector Store Service - the one process that opens ./chroma_db
+
+Holds the Chroma client, the embedding model and the HNSW indexes once per
+host. The API, worker and scripts connect over a Unix socket through
+app/core/vector_store_client.py (picked automatically by app.core.vector_db
+while this service is running). Reads run on a thread pool; every write goes
+through a single writer thread that coalesces queued upserts for the same
+collection into one batch, so nothing else ever writes the SQLite/HNSW files.
+
+Usage:
+    python vector_server.py
+    python vector_server.py --socket /run/halilit/vectors.sock
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import chromadb
+from aiohttp import web
+from chromadb.utils import embedding_functions
+
+from app.core.config import settings
+from app.core.vector_store_client import _plain
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("vector-store")
+
+
+class VectorStoreService:
+    def __init__(self, path: str = settings.CHROMA_PATH, max_batch: int = settings.VECTOR_STORE_MAX_BATCH, batch_wait_ms: int = settings.VECTOR_STORE_BATCH_WAIT_MS):
+        self.client = chromadb.PersistentClient(path=path)
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait_ms / 1000
+        self.readers = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vector-read")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-write")
+        self.writes: Optional[asyncio.Queue] = None
+        self._collections: Dict[str, Any] = {}
+        self.stats = {"reads": 0, "write_requests": 0, "write_batches": 0, "chunks_written": 0, "write_seconds": 0.0}
+
+    def collection(self, name: str, create: bool = False):
+        if name not in self._collections:
+            if create:
+                self._collections[name] = self.client.get_or_create_collection(name=name, embedding_function=self.embedding_function)
+            else:
+                self._collections[name] = self.client.get_collection(name=name, embedding_function=self.embedding_function)
+        return self._collections[name]
+
+    async def read(self, func, *args):
+        self.stats["reads"] += 1
+        return await asyncio.get_running_loop().run_in_executor(self.readers, func, *args)
+
+    async def write(self, op: str, name: str, payload: Dict[str, Any]):
+        """Queue a write for the writer loop and wait until it is applied."""
+        if op == "upsert" and not payload.get("embeddings") and payload.get("documents"):
+            # Embed on the read pool, so the writer thread only writes
+            payload["embeddings"] = await self.read(self.embedding_function, payload["documents"])
+        future = asyncio.get_running_loop().create_future()
+        self.stats["write_requests"] += 1
+        await self.writes.put((op, name, payload, future))
+        return await future
+
+    async def writer_loop(self):
+        while True:
+            batch = [await self.writes.get()]
+            # Short window so concurrent clients' upserts land in the same batch
+            await asyncio.sleep(self.batch_wait)
+            while not self.writes.empty() and sum(len(item[2].get("ids") or []) for item in batch) < self.max_batch:
+                batch.append(self.writes.get_nowait())
+            for group in self._coalesce(batch):
+                futures = [item[3] for item in group]
+                try:
+                    await asyncio.get_running_loop().run_in_executor(self.writer, self._apply, group)
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(None)
+                except Exception as e:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _coalesce(self, batch: List[Tuple]) -> List[List[Tuple]]:
+        """Merge adjacent upserts to the same collection; keep every other write in order."""
+        groups: List[List[Tuple]] = []
+        for item in batch:
+            op, name = item[0], item[1]
+            if groups and op == "upsert" and groups[-1][0][0] == "upsert" and groups[-1][0][1] == name:
+                groups[-1].append(item)
+            else:
+                groups.append([item])
+        return groups
+
+    def _apply(self, group: List[Tuple]):
+        started = time.perf_counter()
+        op, name = group[0][0], group[0][1]
+        if op == "delete_collection":
+            self._collections.pop(name, None)
+            self.client.delete_collection(name)
+        elif op == "delete":
+            self.collection(name).delete(**group[0][2])
+        else:
+            # One upsert for the whole group; later ids win
+            rows: Dict[str, Tuple] = {}
+            for _, _, payload, _ in group:
+                ids = payload["ids"]
+                embeddings = payload.get("embeddings") or [None] * len(ids)
+                documents = payload.get("documents") or [None] * len(ids)
+                metadatas = payload.get("metadatas") or [None] * len(ids)
+                for row in zip(ids, documents, metadatas, embeddings):
+                    rows[row[0]] = row
+            ids, documents, metadatas, embeddings = (list(column) for column in zip(*rows.values()))
+            self.collection(name, create=True).upsert(
+                ids=ids,
+                documents=documents if any(d is not None for d in documents) else None,
+                metadatas=metadatas if any(m is not None for m in metadatas) else None,
+                embeddings=embeddings if all(e is not None for e in embeddings) else None,
+            )
+            self.stats["chunks_written"] += len(ids)
+        self.stats["write_batches"] += 1
+        self.stats["write_seconds"] += time.perf_counter() - started
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        batches = stats["write_batches"]
+        stats["avg_write_ms"] = round(1000 * stats.pop("write_seconds") / batches, 2) if batches else 0.0
+        stats["write_queue_depth"] = self.writes.qsize() if self.writes else 0
+        stats["collections_open"] = len(self._collections)
+        return stats
+
+
+def build_app(service: VectorStoreService) -> web.Application:
+    routes = web.RouteTableDef()
+
+    def ok(result=None):
+        return web.json_response({"result": _plain(result)})
+
+    @web.middleware
+    async def errors(request, handler):
+        try:
+            return await handler(request)
+        except web.HTTPException:
+            raise
+        except chromadb.errors.NotFoundError as e:
+            return web.json_response({"error": str(e)}, status=404)
+        except Exception as e:
+            logger.error(f"{request.method} {request.path} failed: {e}")
+            return web.json_response({"error": str(e)}, status=500)
+
+    @routes.get("/stats")
+    async def stats(request):
+        return ok(service.get_stats())
+
+    @routes.post("/embed")
+    async def embed(request):
+        texts = (await request.json())["texts"]
+        return ok(await service.read(service.embedding_function, texts))
+
+    @routes.get("/collections")
+    async def list_collections(request):
+        names = await service.read(lambda: [getattr(c, "name", c) for c in service.client.list_collections()])
+        return ok(names)
+
+    @routes.post("/collections/{name}")
+    async def get_or_create(request):
+        name = request.match_info["name"]
+        await service.read(service.collection, name, True)
+        return ok(name)
+
+    @routes.get("/collections/{name}")
+    async def get_collection(request):
+        name = request.match_info["name"]
+        await service.read(service.collection, name)
+        return ok(name)
+
+    @routes.delete("/collections/{name}")
+    async def delete_collection(request):
+        await service.write("delete_collection", request.match_info["name"], {})
+        return ok()
+
+    @routes.post("/collections/{name}/{op}")
+    async def collection_op(request):
+        name, op = request.match_info["name"], request.match_info["op"]
+        payload = await request.json() if request.can_read_body else {}
+        if op in ("upsert", "delete"):
+            await service.write(op, name, payload)
+            return ok()
+        collection = await service.read(service.collection, name)
+        if op == "count":
+            return ok(await service.read(collection.count))
+        if op == "get":
+            return ok(await service.read(lambda: collection.get(**payload)))
+        if op == "query":
+            return ok(await service.read(lambda: collection.query(**payload)))
+        return web.json_response({"error": f"Unknown operation {op}"}, status=400)
+
+    async def start_writer(app):
+        service.writes = asyncio.Queue()
+        app["writer"] = asyncio.create_task(service.writer_loop())
+
+    async def stop_writer(app):
+        # Let queued writes finish before shutting down
+        while service.writes.qsize():
+            await asyncio.sleep(0.05)
+        app["writer"].cancel()
+        service.writer.shutdown(wait=True)
+        service.readers.shutdown(wait=False)
+
+    app = web.Application(middlewares=[errors], client_max_size=256 * 1024 * 1024)
+    app.add_routes(routes)
+    app.on_startup.append(start_writer)
+    app.on_cleanup.append(stop_writer)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector store service (owns ./chroma_db)")
+    parser.add_argument("--socket", default=settings.VECTOR_STORE_SOCKET, help="Unix socket path")
+    args = parser.parse_args()
+
+    socket_path = Path(args.socket)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        socket_path.unlink()  # Stale socket from a previous run
+
+    service = VectorStoreService()
+    logger.info(f"Vector store serving {settings.CHROMA_PATH} on {socket_path}")
+    try:
+        web.run_app(build_app(service), path=str(socket_path), print=None, access_log=None)
+    finally:
+        if socket_path.exists():
+            socket_path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,11 @@ from app.core.database import engine
 from app.models.sql_models import Brand, Document
 from app.models.ingestion_status import IngestionStatus
 from app.services.pa_brands_scraper import PABrandsScraper
+from app.engines.browser_pool import browser_pool
+from app.core.db_writer import db_writer
+from app.services.ingestion_pipeline import ingestion_pipeline
+from app.services.vector_reconciler import vector_reconciler
+from app.core.config import settings
 
 # Setup logging
 logging.basicConfig(
@@ -32,6 +37,7 @@ logger = logging.getLogger(__name__)
 class ScraperWorker:
     def __init__(self):
         self.running = True
+        self.current_scraper = None
         
         # Setup signal handlers
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -41,6 +47,9 @@ class ScraperWorker:
         """Handle shutdown signals gracefully"""
         logger.info(f"📡 Received signal {signum}, shutting down gracefully...")
         self.running = False
+        # Stop leasing new URLs; unfinished ones stay in the crawl frontier for the next run
+        if self.current_scraper:
+            self.current_scraper.stop_requested = True
     
     async def update_brand_status(self, brand_id: int, status: str, progress: float = 0):
         """Update ingestion status in database"""
@@ -128,7 +137,15 @@ class ScraperWorker:
             logger.info(f"📥 Scraping {brand_name} (matched: {matched_brand['name']})")
             
             # Run the scraper
-            await scraper.run()
+            self.current_scraper = scraper
+            try:
+                await scraper.run()
+            finally:
+                self.current_scraper = None
+            
+            if scraper.stop_requested:
+                logger.info(f"⏸️  Stopped {brand_name} early, progress kept in crawl frontier")
+                return
             
             await self.update_brand_status(brand.id, "complete", 100)
             logger.info(f"✅ Completed scrape for {brand_name}")
@@ -142,6 +159,15 @@ class ScraperWorker:
                 if brand:
                     await self.update_brand_status(brand.id, "error", 0)
     
+    async def reconcile_vectors(self):
+        """One bounded step of the vector/SQL reconciler (orphan chunks from deleted documents)"""
+        if not settings.VECTOR_RECONCILE_STEP_CHUNKS:
+            return
+        try:
+            await asyncio.to_thread(vector_reconciler.step, settings.VECTOR_RECONCILE_STEP_CHUNKS)
+        except Exception as e:
+            logger.warning(f"⚠️ Vector reconcile step failed: {e}")
+    
     async def run_once(self, brand_name: str = None):
         """Run scraper once"""
         logger.info(f"�� Running worker in single-shot mode for {brand_name or 'next brand'}")
@@ -217,6 +243,7 @@ class ScraperWorker:
                 logger.info(f"   Reason: Docs={target_brand['doc_count']}, Status={target_brand['status']}, LastUpd={target_brand['last_updated']}")
                 
                 await self.scrape_brand(target_brand['name'])
+                await self.reconcile_vectors()
                 
                 if self.running:
                     logger.info(f"✅ Finished {target_brand['name']}, waiting {delay}s before next cycle...")
@@ -246,6 +273,10 @@ async def main():
     except Exception as e:
         logger.error(f"❌ Worker crashed: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        await ingestion_pipeline.stop()
+        await browser_pool.stop()
+        db_writer.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())